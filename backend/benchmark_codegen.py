@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: structure-to-scene scaling.
+Builds synthetic flowcharts of growing size (two edges per node) and times
+layout, edge routing, timeline planning, scene data generation and serialization, reporting
+time and peak traced memory per node so linear scaling is easy to see. The
+previous scan-per-endpoint edge lookup is timed alongside on the smaller sizes.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.prompt_parser import FlowchartStructure, FlowchartNode, FlowchartConnection, NodeType
+from services.layout import layered_layout
+from services.edge_router import route_edges
+from services.timeline import plan_timeline
+from services.manim_generator import ManimGenerator
+
+
+def synthetic_flowchart(node_count: int, edges_per_node: int = 2, seed: int = 0) -> FlowchartStructure:
+    """A connected chart: a main chain plus forward and backward (loop) edges."""
+    rng = random.Random(seed)
+    nodes = [
+        FlowchartNode(
+            id=f"node_{i}",
+            type=NodeType.DECISION if i % 7 == 3 else NodeType.PROCESS,
+            text=f"Step {i}",
+            narration=f"Then we do step {i}."
+        )
+        for i in range(node_count)
+    ]
+    nodes[0].type = NodeType.START
+    nodes[-1].type = NodeType.END
+
+    connections = [FlowchartConnection(f"node_{i}", f"node_{i + 1}") for i in range(node_count - 1)]
+    while len(connections) < node_count * edges_per_node:
+        source = rng.randrange(node_count)
+        # Mostly short forward jumps, some loops back
+        target = min(node_count - 1, max(0, source + rng.choice([2, 3, 5, -4])))
+        if target != source:
+            connections.append(FlowchartConnection(f"node_{source}", f"node_{target}", "yes" if source % 2 else ""))
+    return FlowchartStructure(nodes=nodes, connections=connections, title="Synthetic")
+
+
+def legacy_edge_lookup(flowchart: FlowchartStructure):
+    """The endpoint lookup this benchmark replaces: a scan of the node list per edge end."""
+    for edge in flowchart.connections:
+        next((n for n in flowchart.nodes if n.id == edge.from_node), None)
+        next((n for n in flowchart.nodes if n.id == edge.to_node), None)
+
+
+def measure(func):
+    """Wall time of one call, then its peak traced allocation in a second (slower) traced call."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_benchmark(sizes, legacy_limit: int):
+    generator = ManimGenerator.__new__(ManimGenerator)  # Scene data needs no services
+
+    print(f"{'nodes':>7} {'edges':>7} {'stage':>10} {'total':>10} {'per node':>10} {'peak/node':>10}")
+    for size in sizes:
+        flowchart = synthetic_flowchart(size)
+        edges = len(flowchart.connections)
+        timeline = None
+        stages = [
+            ("layout", lambda: layered_layout(flowchart)),
+            ("routing", lambda: route_edges(flowchart)),
+            ("timeline", lambda: plan_timeline(flowchart, {})),
+            ("scene", lambda: json.dumps(generator._build_scene_data(flowchart, timeline), separators=(",", ":"))),
+            ("to_dict", flowchart.to_dict),
+        ]
+        for stage, func in stages:
+            result, elapsed, peak = measure(func)
+            if stage == "timeline":
+                timeline = result
+            print(
+                f"{size:>7} {edges:>7} {stage:>10} {elapsed * 1e3:>8.1f}ms "
+                f"{elapsed / size * 1e6:>8.2f}us {peak / size:>9.0f}B"
+            )
+        if size <= legacy_limit:
+            start = time.perf_counter()
+            legacy_edge_lookup(flowchart)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>7} {edges:>7} {'legacy':>10} {elapsed * 1e3:>8.1f}ms {elapsed / size * 1e6:>8.2f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2500, 5000, 10000])
+    parser.add_argument(
+        "--legacy-limit", type=int, default=5000,
+        help="Largest chart to time the quadratic legacy edge lookup on"
+    )
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
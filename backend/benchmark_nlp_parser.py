@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt parsing throughput in prompts/sec.
+Compares the regex parser with the spaCy backend called one prompt at a time,
+in nlp.pipe batches, and through the async batcher with concurrent callers,
+over the prompts recorded in logs/*.json.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from benchmark_parser import load_prompts, LOGS_DIR
+from services.prompt_parser import PromptParser
+from services.nlp_parser import NLPPromptParser, SPACY_AVAILABLE
+from config import NLP_MODEL
+
+
+def throughput(func, prompts) -> float:
+    start = time.perf_counter()
+    func(prompts)
+    return len(prompts) / (time.perf_counter() - start)
+
+
+async def concurrent_throughput(parser: NLPPromptParser, prompts) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[parser.parse_prompt_async(prompt) for prompt in prompts])
+    return len(prompts) / (time.perf_counter() - start)
+
+
+def run_benchmark(prompts, model: str, batch_sizes):
+    print(f"{len(prompts)} prompts")
+    regex = PromptParser()
+    rate = throughput(lambda batch: [regex.parse_prompt(p) for p in batch], prompts)
+    print(f"{'regex':>24} {rate:>12.0f} prompts/s")
+
+    if not SPACY_AVAILABLE:
+        print("spaCy is not installed; skipping the NLP backend")
+        return
+    nlp_parser = NLPPromptParser(model=model)
+    load_start = time.perf_counter()
+    if not nlp_parser.warm_up():
+        print(f"Model {model} could not be loaded; skipping the NLP backend")
+        return
+    print(f"{'model load':>24} {time.perf_counter() - load_start:>11.2f}s (once per worker)")
+
+    try:
+        rate = throughput(lambda batch: [nlp_parser.parse_many([p]) for p in batch], prompts)
+        print(f"{'spacy, one at a time':>24} {rate:>12.0f} prompts/s")
+        for size in batch_sizes:
+            def batched(batch, size=size):
+                for i in range(0, len(batch), size):
+                    nlp_parser.parse_many(batch[i:i + size])
+            rate = throughput(batched, prompts)
+            print(f"{f'spacy, pipe x{size}':>24} {rate:>12.0f} prompts/s")
+
+        nlp_parser.batches = nlp_parser.prompts = 0
+        rate = asyncio.run(concurrent_throughput(nlp_parser, prompts))
+        stats = nlp_parser.get_stats()
+        print(
+            f"{'spacy, async batcher':>24} {rate:>12.0f} prompts/s "
+            f"({stats['average_batch_size']:.1f} prompts per batch, {stats['fallbacks']} fallbacks)"
+        )
+    finally:
+        nlp_parser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logs", type=Path, default=LOGS_DIR, help="Directory of generation logs")
+    parser.add_argument("--model", default=NLP_MODEL)
+    parser.add_argument("--repeat", type=int, default=50, help="Times the log corpus is replayed")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.logs) * args.repeat
+    if not prompts:
+        print(f"No prompts found in {args.logs}")
+        return
+    run_benchmark(prompts, args.model, [8, 32, 128])
+
+
+if __name__ == "__main__":
+    main()
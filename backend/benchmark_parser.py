@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt tokenizer and node classifier.
+Replays the prompts recorded in logs/*.json through the compiled single-pass
+tokenizer and keyword classifier, and through the previous separator-by-separator
+and substring-scan implementations, reporting time per prompt for each stage.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.prompt_parser import PromptParser, NodeType
+
+LOGS_DIR = Path(__file__).parent / "logs"
+
+
+def legacy_extract_steps(prompt: str):
+    """The tokenizer this benchmark replaces: first separator found wins."""
+    separators = ['->', '→', '➜', '-', '•', '1.', '2.', '3.', '4.', '5.']
+    steps = []
+    for sep in separators:
+        if sep in prompt:
+            steps = [part.strip() for part in prompt.split(sep) if part.strip()]
+            break
+    if not steps:
+        steps = [s.strip() for s in prompt.split('.') if s.strip()]
+    if not steps:
+        steps = [s.strip() for s in prompt.split(',') if s.strip()]
+    if len(steps) < 3:
+        steps = ["Start", prompt, "End"]
+    return steps
+
+
+def legacy_determine_node_type(node_keywords, step: str, index: int, total: int) -> NodeType:
+    """The classifier this benchmark replaces: one substring scan per keyword list."""
+    step_lower = step.lower()
+    if index == 0:
+        return NodeType.START
+    if index == total - 1:
+        return NodeType.END
+    if any(keyword in step_lower for keyword in node_keywords[NodeType.DECISION]):
+        return NodeType.DECISION
+    if any(keyword in step_lower for keyword in node_keywords[NodeType.INPUT_OUTPUT]):
+        return NodeType.INPUT_OUTPUT
+    return NodeType.PROCESS
+
+
+def load_prompts(logs_dir: Path):
+    prompts = []
+    for path in sorted(logs_dir.glob("*.json")):
+        try:
+            prompt = json.loads(path.read_text()).get("prompt")
+        except (OSError, ValueError):
+            continue
+        if prompt:
+            prompts.append(prompt)
+    return prompts
+
+
+def best_of(func, repeats: int, iterations: int) -> float:
+    """Best wall time of func over repeats, in seconds per call."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+def run_benchmark(prompts, repeats: int, iterations: int):
+    parser = PromptParser()
+    cleaned = [parser._clean_prompt(p) for p in prompts]
+    steps = [parser._extract_steps(p) for p in cleaned]
+
+    def legacy_tokenize():
+        for prompt in cleaned:
+            legacy_extract_steps(prompt)
+
+    def compiled_tokenize():
+        for prompt in cleaned:
+            parser._extract_steps(prompt)
+
+    def legacy_classify():
+        for prompt_steps in steps:
+            total = len(prompt_steps)
+            for i, step in enumerate(prompt_steps):
+                legacy_determine_node_type(parser.node_keywords, step, i, total)
+
+    def compiled_classify():
+        for prompt_steps in steps:
+            total = len(prompt_steps)
+            for i, step in enumerate(prompt_steps):
+                parser._determine_node_type(step, i, total)
+
+    def full_parse():
+        for prompt in prompts:
+            parser.parse_prompt(prompt)
+
+    count = len(prompts)
+    print(f"{count} prompts, {sum(len(s) for s in steps)} steps, best of {repeats} x {iterations} iterations")
+    print(f"{'stage':>10} {'legacy':>12} {'compiled':>12} {'speedup':>8}")
+    for stage, legacy, compiled in (
+        ("tokenize", legacy_tokenize, compiled_tokenize),
+        ("classify", legacy_classify, compiled_classify),
+    ):
+        old = best_of(legacy, repeats, iterations) / count
+        new = best_of(compiled, repeats, iterations) / count
+        print(f"{stage:>10} {old * 1e6:>10.2f}us {new * 1e6:>10.2f}us {old / new:>7.1f}x")
+    print(f"{'parse':>10} {'':>12} {best_of(full_parse, repeats, iterations) / count * 1e6:>10.2f}us")
+
+    changed = [
+        (prompt, legacy_extract_steps(c), s)
+        for prompt, c, s in zip(prompts, cleaned, steps)
+        if legacy_extract_steps(c) != s
+    ]
+    if changed:
+        print(f"\n{len(changed)} prompts tokenize differently:")
+        for prompt, old_steps, new_steps in changed:
+            print(f"  {prompt!r}\n    legacy:   {old_steps}\n    compiled: {new_steps}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logs", type=Path, default=LOGS_DIR, help="Directory of generation logs")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.logs)
+    if not prompts:
+        print(f"No prompts found in {args.logs}")
+        return
+    run_benchmark(prompts, args.repeats, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gTTS engine script length vs latency.
+Runs the pooled gTTS engine against a local stand-in for the TTS endpoint that
+adds a fixed per-request delay, comparing sequential and concurrent chunk fetching.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.tts_engines import GTTSEngine
+from test_tts_engines import start_stub_server
+
+SENTENCE = "Then we validate the user's input and store the result in the database. "
+
+
+def run_benchmark(delay: float, sentence_counts, repeats: int):
+    server = start_stub_server(delay=delay)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    engines = {
+        "sequential": GTTSEngine(base_url=base_url, concurrency=1),
+        "concurrent": GTTSEngine(base_url=base_url, concurrency=8),
+    }
+
+    print(f"Stub endpoint {base_url}, {delay * 1000:.0f} ms per request")
+    print(f"{'sentences':>10} {'chars':>7} {'chunks':>7} {'sequential':>12} {'concurrent':>12} {'speedup':>8}")
+
+    try:
+        for count in sentence_counts:
+            text = SENTENCE * count
+            chunks = len(GTTSEngine.chunk_text(text))
+            timings = {}
+            for name, engine in engines.items():
+                best = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    engine.fetch_mp3(text)
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = best
+            print(
+                f"{count:>10} {len(text):>7} {chunks:>7} "
+                f"{timings['sequential']:>11.3f}s {timings['concurrent']:>11.3f}s "
+                f"{timings['sequential'] / timings['concurrent']:>7.1f}x"
+            )
+    finally:
+        for engine in engines.values():
+            engine.close()
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub latency per request in seconds")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.delay, [1, 5, 10, 20, 40], args.repeats)
+
+
+if __name__ == "__main__":
+    main()
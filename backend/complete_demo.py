@@ -21,14 +21,15 @@ async def create_complete_demo():
     print()
     
     try:
-        from services.audio_generator import AudioGenerator
-        print("✅ AudioGenerator loaded")
+        from services.manim_generator import ManimGenerator
+        from services.structured_input import parse_json_structure
+        print("✅ ManimGenerator loaded")
     except ImportError as e:
-        print(f"❌ AudioGenerator error: {e}")
+        print(f"❌ ManimGenerator error: {e}")
         return False
     
-    # Define a sample flowchart manually (since prompt parser has issues)
-    flowchart_data = {
+    # Define a sample flowchart manually; nodes are laid out and edges routed on parsing
+    flowchart = parse_json_structure({
         'title': 'Customer Support Ticket Process',
         'nodes': [
             {'id': 'start', 'text': 'Ticket Received', 'type': 'start'},
@@ -41,123 +42,44 @@ async def create_complete_demo():
             {'id': 'end', 'text': 'Close Ticket', 'type': 'end'}
         ],
         'connections': [
-            {'from': 'start', 'to': 'categorize'},
-            {'from': 'categorize', 'to': 'urgent'},
-            {'from': 'urgent', 'to': 'escalate', 'condition': 'Yes'},
-            {'from': 'urgent', 'to': 'assign', 'condition': 'No'},
-            {'from': 'escalate', 'to': 'resolve'},
-            {'from': 'assign', 'to': 'resolve'},
-            {'from': 'resolve', 'to': 'followup'},
-            {'from': 'followup', 'to': 'end'}
+            {'from_node': 'start', 'to_node': 'categorize'},
+            {'from_node': 'categorize', 'to_node': 'urgent'},
+            {'from_node': 'urgent', 'to_node': 'escalate', 'label': 'Yes'},
+            {'from_node': 'urgent', 'to_node': 'assign', 'label': 'No'},
+            {'from_node': 'escalate', 'to_node': 'resolve'},
+            {'from_node': 'assign', 'to_node': 'resolve'},
+            {'from_node': 'resolve', 'to_node': 'followup'},
+            {'from_node': 'followup', 'to_node': 'end'}
         ]
-    }
+    })
     
     # Generate unique ID
     demo_id = f"customer_support_demo_{str(uuid.uuid4())[:8]}"
+    output_path = Path(f"videos/{demo_id}.mp4")
     
-    # Initialize audio generator
-    audio_gen = AudioGenerator()
+    generator = ManimGenerator()
     
     try:
-        print("🎵 Step 1: Generating AI narration...")
-        
-        # Generate narration script
-        script = await audio_gen.generate_narration_script(flowchart_data)
-        print(f"📝 Script preview: {script[:100]}...")
-        
-        # Generate timed segments for 25-second video
-        timed_script, segments = await audio_gen.create_timed_narration(
-            flowchart_data, 
-            total_video_duration=25.0
-        )
-        
-        print(f"⏱️  Created {len(segments)} timed segments")
-        
-        # Generate audio file
-        print("🔊 Step 2: Converting text to speech...")
-        audio_file = await audio_gen.generate_audio(
-            timed_script, 
-            engine='gtts',
-            voice_settings={'lang': 'en', 'tld': 'com', 'slow': False}
-        )
-        
-        duration = audio_gen.get_audio_duration(audio_file)
-        print(f"✅ Audio generated: {duration:.1f} seconds, {audio_file.stat().st_size/1024:.1f} KB")
-        
-        # Save audio to videos folder
-        import shutil
-        final_audio = Path(f"videos/{demo_id}.wav")
-        shutil.copy2(audio_file, final_audio)
-        print(f"📁 Audio saved as: {final_audio}")
-        
-        print("\n🎬 Step 3: Creating Manim animation code...")
-        
-        # Generate Manim code for this flowchart
-        manim_code = generate_manim_code(flowchart_data, demo_id, segments)
-        
-        # Save Manim script
-        script_file = Path(f"temp/{demo_id}_scene.py")
-        script_file.parent.mkdir(exist_ok=True)
-        script_file.write_text(manim_code)
-        print(f"📄 Manim script saved: {script_file}")
-        
-        print("\n🎥 Step 4: Rendering video with Manim...")
-        
-        # Run Manim command
-        import subprocess
-        scene_name = f"CustomerSupportDemo_{demo_id.replace('-', '_')}"
-        
-        cmd = [
-            "python", "-m", "manim",
-            str(script_file),
-            scene_name,
-            "--media_dir", "videos",
-            "-q", "m",  # medium quality
-            "--format", "mp4",
-            "--disable_caching"
-        ]
-        
-        print(f"🔧 Running: {' '.join(cmd)}")
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=Path.cwd()
+        # One narration clip per node is synthesized and leveled, placed at
+        # the node's reveal and mixed into the render
+        print("🎵 Generating narration and rendering the video with Manim...")
+        result = await generator.generate_video_with_audio(
+            flowchart,
+            demo_id,
+            include_audio=True,
+            voice_settings={'language': 'en', 'tld': 'com', 'slow': False},
+            output_path=output_path
         )
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            print("✅ Video rendered successfully!")
-            
-            # Find the generated video
-            import os
-            for root, dirs, files in os.walk("videos"):
-                for file in files:
-                    if scene_name in file and file.endswith('.mp4'):
-                        video_path = Path(root) / file
-                        print(f"📹 Video file: {video_path}")
-                        
-                        # Combine video with audio
-                        print("\n🎵 Step 5: Combining video with audio...")
-                        final_video = await combine_video_audio(video_path, final_audio, demo_id)
-                        
-                        if final_video:
-                            print(f"🎉 COMPLETE! Final video with audio: {final_video}")
-                            print(f"📏 File size: {final_video.stat().st_size / (1024*1024):.1f} MB")
-                            return True
-                        else:
-                            print("⚠️  Video/audio combination failed, but video was created")
-                            return True
-            
-            print("⚠️  Video file not found in expected location")
-            return False
-        else:
-            print(f"❌ Manim rendering failed:")
-            print(f"STDOUT: {stdout.decode()}")
-            print(f"STDERR: {stderr.decode()}")
+        if not result.success:
+            print(f"❌ Video generation failed: {result.error_message}")
             return False
+        
+        print(f"🎉 COMPLETE! Final video with audio: {result.video_path}")
+        print(f"🔊 Audio tracks: {result.audio_tracks or 'none'}")
+        print(f"📏 File size: {output_path.stat().st_size / (1024*1024):.1f} MB")
+        print(f"⏱️  Generated in {result.generation_time:.1f} seconds")
+        return True
             
     except Exception as e:
         print(f"❌ Error during demo: {e}")
@@ -167,174 +89,8 @@ async def create_complete_demo():
     
     finally:
         # Cleanup
-        audio_gen.cleanup()
-
-def generate_manim_code(flowchart_data, demo_id, segments):
-    """Generate Manim code for the flowchart."""
-    
-    code = f'''"""
-Generated Manim scene for Customer Support Demo
-"""
-from manim import *
-
-class CustomerSupportDemo_{demo_id.replace("-", "_")}(Scene):
-    def construct(self):
-        # Scene configuration
-        self.camera.background_color = WHITE
-        
-        # Title
-        title = Text("{flowchart_data['title']}", font_size=32, color=BLACK)
-        title.to_edge(UP, buff=0.5)
-        
-        self.play(Write(title))
-        self.wait(1)
-        self.play(FadeOut(title))
-        
-        # Create nodes
-        nodes = {{}}
-        
-        # Start node
-        start_circle = Circle(radius=0.6, color=GREEN, fill_opacity=0.3)
-        start_text = Text("Ticket\\nReceived", font_size=16, color=BLACK)
-        start_group = VGroup(start_circle, start_text)
-        start_group.move_to([0, 2.5, 0])
-        nodes["start"] = start_group
-        
-        # Process nodes
-        categorize_rect = Rectangle(width=1.8, height=0.8, color=BLUE, fill_opacity=0.3)
-        categorize_text = Text("Categorize\\nIssue", font_size=14, color=BLACK)
-        categorize_group = VGroup(categorize_rect, categorize_text)
-        categorize_group.move_to([0, 1.5, 0])
-        nodes["categorize"] = categorize_group
-        
-        # Decision node
-        urgent_diamond = Polygon(
-            [-0.8, 0.4, 0], [0.8, 0.4, 0], [1.0, 0, 0], [0.8, -0.4, 0], 
-            [-0.8, -0.4, 0], [-1.0, 0, 0], color=YELLOW, fill_opacity=0.3
-        )
-        urgent_text = Text("Is Urgent?", font_size=12, color=BLACK)
-        urgent_group = VGroup(urgent_diamond, urgent_text)
-        urgent_group.move_to([0, 0.5, 0])
-        nodes["urgent"] = urgent_group
-        
-        # Escalate path
-        escalate_rect = Rectangle(width=1.8, height=0.8, color=RED, fill_opacity=0.3)
-        escalate_text = Text("Escalate to\\nManager", font_size=12, color=BLACK)
-        escalate_group = VGroup(escalate_rect, escalate_text)
-        escalate_group.move_to([-2.5, -0.5, 0])
-        nodes["escalate"] = escalate_group
-        
-        # Assign path
-        assign_rect = Rectangle(width=1.8, height=0.8, color=BLUE, fill_opacity=0.3)
-        assign_text = Text("Assign to\\nAgent", font_size=12, color=BLACK)
-        assign_group = VGroup(assign_rect, assign_text)
-        assign_group.move_to([2.5, -0.5, 0])
-        nodes["assign"] = assign_group
-        
-        # Resolve node
-        resolve_rect = Rectangle(width=1.8, height=0.8, color=BLUE, fill_opacity=0.3)
-        resolve_text = Text("Resolve\\nIssue", font_size=14, color=BLACK)
-        resolve_group = VGroup(resolve_rect, resolve_text)
-        resolve_group.move_to([0, -1.5, 0])
-        nodes["resolve"] = resolve_group
-        
-        # Follow up node
-        followup_rect = Rectangle(width=1.8, height=0.8, color=BLUE, fill_opacity=0.3)
-        followup_text = Text("Follow Up", font_size=14, color=BLACK)
-        followup_group = VGroup(followup_rect, followup_text)
-        followup_group.move_to([0, -2.5, 0])
-        nodes["followup"] = followup_group
-        
-        # End node
-        end_circle = Circle(radius=0.6, color=RED, fill_opacity=0.3)
-        end_text = Text("Close\\nTicket", font_size=16, color=BLACK)
-        end_group = VGroup(end_circle, end_text)
-        end_group.move_to([0, -3.5, 0])
-        nodes["end"] = end_group
-        
-        # Create arrows
-        arrow1 = Arrow(start=[0, 1.9, 0], end=[0, 1.3, 0], color=BLACK, buff=0.1)
-        arrow2 = Arrow(start=[0, 0.9, 0], end=[0, 0.9, 0], color=BLACK, buff=0.1)
-        arrow3 = Arrow(start=[-0.5, 0.2, 0], end=[-2.0, -0.2, 0], color=BLACK, buff=0.1)
-        arrow4 = Arrow(start=[0.5, 0.2, 0], end=[2.0, -0.2, 0], color=BLACK, buff=0.1)
-        arrow5 = Arrow(start=[-2.5, -0.9, 0], end=[-0.5, -1.2, 0], color=BLACK, buff=0.1)
-        arrow6 = Arrow(start=[2.5, -0.9, 0], end=[0.5, -1.2, 0], color=BLACK, buff=0.1)
-        arrow7 = Arrow(start=[0, -1.9, 0], end=[0, -2.1, 0], color=BLACK, buff=0.1)
-        arrow8 = Arrow(start=[0, -2.9, 0], end=[0, -3.1, 0], color=BLACK, buff=0.1)
-        
-        # Labels
-        yes_label = Text("Yes", font_size=12, color=RED).next_to(arrow3, UP, buff=0.1)
-        no_label = Text("No", font_size=12, color=GREEN).next_to(arrow4, UP, buff=0.1)
-        
-        # Animation sequence
-        self.play(FadeIn(nodes["start"]), run_time=1)
-        self.wait(0.5)
-        
-        self.play(Create(arrow1), run_time=0.5)
-        self.play(FadeIn(nodes["categorize"]), run_time=1)
-        self.wait(0.5)
-        
-        self.play(Create(arrow2), run_time=0.5)
-        self.play(FadeIn(nodes["urgent"]), run_time=1)
-        self.wait(0.5)
-        
-        self.play(Create(arrow3), Create(arrow4), run_time=0.8)
-        self.play(Write(yes_label), Write(no_label), run_time=0.5)
-        self.play(FadeIn(nodes["escalate"]), FadeIn(nodes["assign"]), run_time=1)
-        self.wait(1)
-        
-        self.play(Create(arrow5), Create(arrow6), run_time=0.8)
-        self.play(FadeIn(nodes["resolve"]), run_time=1)
-        self.wait(0.5)
-        
-        self.play(Create(arrow7), run_time=0.5)
-        self.play(FadeIn(nodes["followup"]), run_time=1)
-        self.wait(0.5)
-        
-        self.play(Create(arrow8), run_time=0.5)
-        self.play(FadeIn(nodes["end"]), run_time=1)
-        
-        # Hold final state
-        self.wait(3)
-        
-        # Fade out
-        self.play(FadeOut(*self.mobjects), run_time=1.5)
-'''
-    
-    return code
-
-async def combine_video_audio(video_path, audio_path, demo_id):
-    """Combine video and audio using ffmpeg."""
-    try:
-        output_path = Path(f"videos/{demo_id}_complete.mp4")
-        
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", str(video_path),
-            "-i", str(audio_path),
-            "-c:v", "copy",
-            "-c:a", "aac",
-            "-shortest",
-            str(output_path)
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode == 0:
-            return output_path
-        else:
-            print(f"FFmpeg error: {stderr.decode()}")
-            return None
-            
-    except Exception as e:
-        print(f"Error combining video and audio: {e}")
-        return None
+        if generator.audio_generator:
+            generator.audio_generator.close()
 
 async def main():
     """Main demo function."""
@@ -342,10 +98,10 @@ async def main():
     print("=" * 60)
     print("This demo creates a professional flowchart video with AI narration!")
     print("Features demonstrated:")
-    print("• Natural language script generation")
+    print("• Per-node narration clips")
     print("• Text-to-speech conversion")
     print("• Animated flowchart creation with Manim")
-    print("• Video + audio synchronization")
+    print("• Narration placed at each node's reveal")
     print()
     
     success = await create_complete_demo()
@@ -355,10 +111,8 @@ async def main():
         print("🎉 SUCCESS! Complete audio + video demo finished!")
         print()
         print("✨ What was created:")
-        print("   • AI-generated narration script")
-        print("   • Professional text-to-speech audio")
-        print("   • Animated flowchart video")
-        print("   • Combined video with synchronized audio")
+        print("   • Professional text-to-speech narration")
+        print("   • Animated flowchart video with synchronized audio")
         print()
         print("📁 Check the 'videos' folder for all generated files!")
         print("🚀 Your system is ready for audio-enabled flowchart videos!")
@@ -1,6 +1,7 @@
 """
 Configuration settings for the Flowchart Video Generator API.
 """
+import os
 from pathlib import Path
 
 # API Configuration
@@ -13,15 +14,52 @@ BASE_DIR = Path(__file__).parent
 VIDEOS_DIR = BASE_DIR / "videos"
 TEMP_DIR = BASE_DIR / "temp"
 LOGS_DIR = BASE_DIR / "logs"
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))  # Runtime databases, kept out of the source tree
+INDEX_DB_PATH = DATA_DIR / "video_index.db"
+AUDIO_TEMP_DIR = TEMP_DIR / "audio"
+MANIM_SCRATCH_DIR = TEMP_DIR / "manim_jobs"  # Per-job Manim media dirs
+MANIM_SHARED_CACHE_DIR = TEMP_DIR / "manim_cache"  # Text/LaTeX caches shared by all jobs
+TTS_CACHE_DIR = TEMP_DIR / "tts_cache"  # Compressed narration segments shared by all jobs
+OUTLINE_SPOOL_DIR = TEMP_DIR / "outlines"  # Parsed pages and rendered chapters of outline jobs
 
 # Create directories if they don't exist
 VIDEOS_DIR.mkdir(exist_ok=True)
 TEMP_DIR.mkdir(exist_ok=True)
 LOGS_DIR.mkdir(exist_ok=True)
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+AUDIO_TEMP_DIR.mkdir(exist_ok=True)
+MANIM_SCRATCH_DIR.mkdir(exist_ok=True)
+MANIM_SHARED_CACHE_DIR.mkdir(exist_ok=True)
+TTS_CACHE_DIR.mkdir(exist_ok=True)
+OUTLINE_SPOOL_DIR.mkdir(exist_ok=True)
 
 # Request limits
 MAX_PROMPT_LENGTH = 2000
 MAX_CONCURRENT_GENERATIONS = 3
+MAX_STRUCTURED_INPUT_LENGTH = 200_000  # Mermaid/DOT/JSON flowchart definitions
+MAX_STRUCTURED_NODES = 500
+INPUT_FORMATS = ["text", "mermaid", "dot", "json"]
+
+# Prompt parsing backend: "regex" heuristics, or "spacy" dependency parsing
+# with a model loaded once per worker and concurrent prompts batched through nlp.pipe
+PROMPT_PARSER_BACKEND = os.getenv("PROMPT_PARSER_BACKEND", "regex")
+NLP_MODEL = os.getenv("NLP_MODEL", "en_core_web_sm")
+NLP_BATCH_SIZE = 64  # Prompts per nlp.pipe call
+NLP_BATCH_WINDOW_SECONDS = 0.005  # How long the first prompt waits for others to join its batch
+
+# Parsed structures (with their layout) memoized per normalized input and parser version
+PARSE_CACHE_SIZE = 2048  # Structures kept in memory
+PARSE_CACHE_PERSIST = os.getenv("PARSE_CACHE_PERSIST", "true").lower() == "true"
+PARSE_CACHE_DB_PATH = DATA_DIR / "parse_cache.db"  # Survives restarts, shared by workers
+PARSE_CACHE_PERSISTED_MAX = 50_000  # Rows kept on disk
+
+# Outline uploads: streamed documents split into one flowchart page per section
+OUTLINE_FORMATS = ["markdown", "ndjson"]
+MAX_OUTLINE_BYTES = 20 * 1024 * 1024
+MAX_OUTLINE_PAGES = 200
+OUTLINE_MAX_STEPS_PER_PAGE = 12  # Longer sections continue on another page
+OUTLINE_MAX_LINE_LENGTH = 4000  # Longer lines are truncated while streaming
+OUTLINE_RENDER_CONCURRENCY = int(os.getenv("OUTLINE_RENDER_CONCURRENCY", str(MAX_CONCURRENT_GENERATIONS)))
 
 # CORS settings
 ALLOWED_ORIGINS = [
@@ -38,18 +76,118 @@ DEFAULT_VIDEO_FORMAT = "mp4"
 SUPPORTED_QUALITIES = ["low_quality", "medium_quality", "high_quality", "fourk_quality"]
 SUPPORTED_FORMATS = ["mp4", "mov", "avi"]
 
+# Layered layout of structured flowcharts (scene units)
+LAYOUT_NODE_SPACING = 3.0  # Between neighbours in a layer
+LAYOUT_LAYER_SPACING = 2.0  # Between consecutive layers
+LAYOUT_ORDERING_SWEEPS = 4  # Barycenter passes that reduce edge crossings
+
+# Orthogonal edge routing around node boxes (scene units)
+ROUTE_CLEARANCE = 0.3  # Gap kept between edges and boxes, and length of the stub leaving a port
+ROUTE_CHANNEL_PROBES = 8  # Alternative channels tried on each side before accepting a crossing
+ROUTE_GRID_CELL = 2.0  # Cell size of the spatial index over node and label boxes
+LABEL_CHAR_WIDTH = 0.11  # Approximate width of one edge label character (font size 16)
+LABEL_HEIGHT = 0.3
+
 # Audio settings
 DEFAULT_VOICE = "alloy"
+DEFAULT_NARRATION_VOICE_SETTINGS = {"lang": "en", "tld": "com"}  # Primary narration track
 SUPPORTED_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 DEFAULT_AUDIO_SPEED = 1.0
+TTS_SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", "4"))  # Segments synthesized at once
+TTS_SEGMENT_RETRIES = 2  # Retries per failed narration segment
+
+# In-memory narration audio
+AUDIO_SAMPLE_RATE = 24000  # Every clip is decoded/resampled to this rate (mono)
+AUDIO_PEAK_HEADROOM_DB = 0.1  # Peak normalization target below full scale
+AUDIO_OUTPUT_SAMPLE_RATE = 48000  # Sample rate of the encoded audio track
+
+# EBU R128 loudness normalization applied in the final encode
+LOUDNESS_TARGET_I = -16.0  # Integrated loudness, LUFS
+LOUDNESS_TARGET_TP = -1.5  # True peak, dBTP
+LOUDNESS_TARGET_LRA = 11.0  # Loudness range, LU
+LOUDNESS_STATS_CACHE_SIZE = 1024  # Measured narration segments kept in memory
+
+# Narration clips are encoded once, in the codec of the target container
+AUDIO_CODECS = {
+    # codec: (ffmpeg encoder, muxer, file extension, bitrate)
+    "aac": ("aac", "adts", "aac", "96k"),
+    "opus": ("libopus", "ogg", "opus", "48k")
+}
+AUDIO_CODEC_BY_FORMAT = {"mp4": "aac", "mov": "aac", "webm": "opus"}
+AUDIO_CLIP_CODEC = AUDIO_CODEC_BY_FORMAT.get(DEFAULT_VIDEO_FORMAT, "aac")
+
+# gTTS engine settings
+GTTS_BASE_URL = os.getenv("GTTS_BASE_URL")  # Override the translate.google.<tld> endpoint
+GTTS_CHUNK_CONCURRENCY = 4  # Text chunks fetched in parallel per call
+GTTS_CONNECT_TIMEOUT = 5.0
+GTTS_READ_TIMEOUT = 15.0
+GTTS_MAX_RETRIES = 2
+
+# Cloud TTS engine settings; endpoints can point at local stub servers
+AZURE_SPEECH_ENDPOINT = os.getenv("AZURE_SPEECH_ENDPOINT")
+AZURE_TTS_MAX_CONCURRENCY = 4
+GOOGLE_TTS_ENDPOINT = os.getenv("GOOGLE_TTS_ENDPOINT")
+GOOGLE_TTS_INSECURE = os.getenv("GOOGLE_TTS_INSECURE", "false").lower() == "true"
+GOOGLE_TTS_MAX_CONCURRENCY = 8
+
+# Offline (pyttsx3) TTS worker pool
+OFFLINE_TTS_WORKERS = int(os.getenv("OFFLINE_TTS_WORKERS", "2"))  # One engine per process, in every API worker
+OFFLINE_TTS_WARM_UP = os.getenv("OFFLINE_TTS_WARM_UP", "true").lower() == "true"  # Start them in the background at startup
+OFFLINE_TTS_TASKS_PER_WORKER = 200  # Calls before a worker process is recycled
+OFFLINE_TTS_RATE = 160  # Speaking rate (words per minute)
+OFFLINE_TTS_VOLUME = 0.9
+
+# TTS engine routing
+TTS_ROUTER_WINDOW = 50  # Recent calls per engine used for latency/error rate
+TTS_ENGINE_PRIOR_LATENCY = {  # Assumed latency (seconds) before an engine has been measured
+    "azure": 1.0,
+    "google_cloud": 1.0,
+    "gtts": 2.0,
+    "pyttsx3": 3.0
+}
+TTS_BREAKER_FAILURE_THRESHOLD = 3  # Consecutive failures that open an engine's circuit
+TTS_BREAKER_RESET_SECONDS = 30.0  # Time before a tripped engine gets a trial call
+TTS_CALL_DEADLINE_SECONDS = 20.0  # Hard limit for a single engine call
+TTS_HEDGE_AFTER_SECONDS = 4.0  # Start the next engine if a call takes longer than this
 
 # File size limits (in MB)
 MAX_VIDEO_SIZE_MB = 100
 MAX_AUDIO_SIZE_MB = 10
 
+# Storage settings
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")  # local, s3
+S3_BUCKET = os.getenv("S3_BUCKET", "flowchart-videos")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PREFIX = os.getenv("S3_PREFIX", "videos/")
+S3_MULTIPART_CHUNK_MB = 8
+PRESIGNED_URL_EXPIRY_SECONDS = 3600
+
 # Cleanup settings
 CLEANUP_TEMP_FILES_AFTER_HOURS = 24
 CLEANUP_OLD_VIDEOS_AFTER_DAYS = 7
+CLEANUP_INTERVAL_MINUTES = 30
+# The JSON logs in LOGS_DIR are the prompt corpus of benchmark_parser.py, so
+# they are only swept when a retention is set
+GENERATION_LOG_RETENTION_DAYS = float(os.environ["GENERATION_LOG_RETENTION_DAYS"]) if os.getenv("GENERATION_LOG_RETENTION_DAYS") else None
+
+# Time-to-live per artifact class, in hours
+CLEANUP_TTLS_HOURS = {
+    "job_temp_files": 1,  # Scratch media dirs of finished jobs
+    "manim_scratch": 6,  # Scratch media dirs left behind by crashed workers
+    "partial_movie_files": 1,  # Manim partial_movie_files trees
+    "audio_temp": 6,  # Narration audio in per-worker temp dirs
+    "tts_cache": 7 * 24,  # Cached narration segments not used for a week
+    "outline_spool": 24,  # Pages and chapters of outline jobs that never finished
+    "temp_files": CLEANUP_TEMP_FILES_AFTER_HOURS  # Anything else left in TEMP_DIR
+}
+if GENERATION_LOG_RETENTION_DAYS is not None:
+    CLEANUP_TTLS_HOURS["generation_logs"] = GENERATION_LOG_RETENTION_DAYS * 24  # Legacy JSON logs in LOGS_DIR
+
+# Disk quota for rendered videos; least recently accessed videos are evicted
+# and re-rendered on demand from their saved flowchart structure
+VIDEO_DISK_QUOTA_MB = int(os.getenv("VIDEO_DISK_QUOTA_MB", "5120"))
+VIDEO_QUOTA_LOW_WATERMARK = 0.9  # Evict down to this fraction of the quota
 
 # Manim settings
 MANIM_CONFIG = {
@@ -64,6 +202,23 @@ MANIM_CONFIG = {
     "leave_progress_bars": False
 }
 
+# Render slots: Manim subprocesses running at once. A job only takes one after
+# its scene data passes pre-flight checks, so doomed jobs fail without waiting
+MAX_CONCURRENT_RENDERS = int(os.getenv("MAX_CONCURRENT_RENDERS", str(MAX_CONCURRENT_GENERATIONS)))
+SCENE_MAX_NODES = 10_000
+SCENE_MAX_TEXT_LENGTH = MAX_PROMPT_LENGTH  # Per node label, edge label and title
+SCENE_FRAME_WIDTH = 14.222  # Manim's default frame, in scene units
+SCENE_FRAME_HEIGHT = 8.0
+# Also construct the scene with `manim render --dry_run` (no frames) before rendering
+PREFLIGHT_DRY_RUN = os.getenv("PREFLIGHT_DRY_RUN", "false").lower() == "true"
+PREFLIGHT_DRY_RUN_TIMEOUT = 120  # Seconds
+
+# Camera-follow for charts larger than one frame: the camera pans to each element
+# as it is revealed and only what the frame passes over is rasterized.
+# "auto" follows only charts that don't fit the frame; "always" and "never" force it
+CAMERA_FOLLOW = os.getenv("CAMERA_FOLLOW", "auto").lower()
+CAMERA_FOLLOW_MARGIN = 1.0  # Scene units kept between a revealed element and the frame edge
+
 # Manim quality settings
 MANIM_QUALITIES = {
     "low_quality": {
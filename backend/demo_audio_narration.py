@@ -56,32 +56,34 @@ async def create_audio_demo():
     }
     
     try:
-        print("📝 Generating narration script...")
-        # Generate narration script
-        script = await audio_gen.generate_narration_script(sample_flowchart)
-        print(f"📄 Generated Script ({len(script)} characters):")
-        print("-" * 30)
-        print(script)
-        print("-" * 30)
-        
-        print("\n⏱️  Creating timed narration segments...")
-        # Generate timed narration for 20-second video
-        timed_script, segments = await audio_gen.create_timed_narration(
-            sample_flowchart, 
-            total_video_duration=20.0
+        print("🎙️  Synthesizing one narration clip per node...")
+        # The same per-node clips the video pipeline places at each node's reveal
+        segments = [{'id': node['id'], 'text': node['text']} for node in sample_flowchart['nodes']]
+        clips = await audio_gen.generate_clips(
+            segments,
+            engine='gtts',
+            voice_settings={
+                'language': 'en',
+                'tld': 'com',
+                'slow': False
+            }
         )
         
-        print(f"🎬 Generated {len(segments)} timed segments:")
+        print(f"🎬 Generated {len(clips)} narration clips:")
         for i, segment in enumerate(segments, 1):
-            print(f"  {i}. {segment['start_time']:.1f}s-{segment['start_time']+segment['duration']:.1f}s: {segment['text'][:60]}...")
+            clip = clips.get(segment['id'])
+            if clip:
+                print(f"  {i}. {clip['duration']:.1f}s: {segment['text']}")
+        if not clips:
+            raise RuntimeError("No narration clips were synthesized")
         
-        print("\n🔊 Generating audio file...")
+        print("\n🔊 Generating audio file for the title...")
         # Generate audio using Google TTS
         audio_file = await audio_gen.generate_audio(
-            timed_script, 
+            f"Welcome to this {sample_flowchart['title']} explanation.",
             engine='gtts',
             voice_settings={
-                'lang': 'en',
+                'language': 'en',
                 'tld': 'com',
                 'slow': False
             }
@@ -90,14 +92,11 @@ async def create_audio_demo():
         print(f"✅ Audio generated successfully!")
         print(f"📁 Audio file: {audio_file}")
         print(f"📏 File size: {audio_file.stat().st_size / 1024:.1f} KB")
-        
-        # Get audio duration
-        duration = audio_gen.get_audio_duration(audio_file)
-        print(f"⏱️  Audio duration: {duration:.1f} seconds")
+        print(f"⏱️  Narration duration: {sum(clip['duration'] for clip in clips.values()):.1f} seconds")
         
         # Copy audio to videos folder with descriptive name
         import shutil
-        dest_audio = Path("videos/online_shopping_narration_demo.wav")
+        dest_audio = Path(f"videos/online_shopping_narration_demo{audio_file.suffix}")
         shutil.copy2(audio_file, dest_audio)
         print(f"📁 Audio also saved as: {dest_audio}")
         
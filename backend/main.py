@@ -3,14 +3,18 @@ FastAPI backend server for Flowchart Video Generator.
 Generates animated flowchart videos from text prompts using Manim.
 """
 import asyncio
+import json
+import time
 import uuid
+import shutil
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, status, BackgroundTasks, Depends
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, status, BackgroundTasks, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 import uvicorn
@@ -18,12 +22,19 @@ import uvicorn
 # Import local modules
 from config import (
     API_TITLE, API_VERSION, API_DESCRIPTION, VIDEOS_DIR, 
-    MAX_PROMPT_LENGTH, ALLOWED_ORIGINS
+    MAX_PROMPT_LENGTH, ALLOWED_ORIGINS, DEFAULT_NARRATION_VOICE_SETTINGS,
+    MAX_STRUCTURED_INPUT_LENGTH, INPUT_FORMATS, OUTLINE_SPOOL_DIR, OUTLINE_FORMATS,
+    MAX_OUTLINE_BYTES, MAX_OUTLINE_PAGES, OUTLINE_RENDER_CONCURRENCY, PROMPT_PARSER_BACKEND,
+    SUPPORTED_QUALITIES, OFFLINE_TTS_WARM_UP
 )
 
 # Try to import services, but handle missing dependencies gracefully
 try:
-    from services.prompt_parser import PromptParser
+    from services.prompt_parser import PromptParser, FlowchartStructure, PARSER_VERSION
+    from services.structured_input import parse_structured, StructuredInputError, STRUCTURED_PARSER_VERSION
+    from services.outline import OutlineReader, OutlineError
+    from services.nlp_parser import NLPPromptParser
+    from services.parse_cache import ParseCache
     PROMPT_PARSER_AVAILABLE = True
 except ImportError:
     PROMPT_PARSER_AVAILABLE = False
@@ -43,6 +54,23 @@ except ImportError:
     VIDEO_PROCESSOR_AVAILABLE = False
     print("⚠️  Video processor not available")
 
+try:
+    from services.storage import get_storage, video_key
+    from services.subtitles import subtitles_key, track_languages
+    STORAGE_AVAILABLE = True
+except ImportError:
+    STORAGE_AVAILABLE = False
+    print("⚠️  Artifact storage not available")
+
+try:
+    from services.video_index import get_video_index
+    from services.quota_manager import DiskQuotaManager
+    from services.cleanup import CleanupService
+    VIDEO_INDEX_AVAILABLE = True
+except ImportError:
+    VIDEO_INDEX_AVAILABLE = False
+    print("⚠️  Video index not available")
+
 try:
     from middleware import setup_middleware, validate_prompt, validate_video_id
     MIDDLEWARE_AVAILABLE = True
@@ -54,7 +82,7 @@ try:
     from utils import (
         generate_video_id, ensure_directories, format_error_response,
         format_success_response, save_generation_log, get_system_stats,
-        validate_prompt_complexity, async_cleanup_task
+        validate_prompt_complexity
     )
     UTILS_AVAILABLE = True
 except ImportError:
@@ -86,9 +114,24 @@ async def lifespan(app: FastAPI):
     
     logger.info(f"Available features: {', '.join(features) if features else 'basic API only'}")
     
-    # Start background cleanup task if available
-    if UTILS_AVAILABLE:
-        asyncio.create_task(async_cleanup_task())
+    # Start recurring background cleanup if available
+    if VIDEO_INDEX_AVAILABLE:
+        cleanup_service.start()
+    
+    # Load the NLP model once, before the first prompt arrives
+    if PROMPT_PARSER_AVAILABLE and isinstance(prompt_parser, NLPPromptParser):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, prompt_parser.warm_up)
+    
+    # Start offline TTS worker processes without holding up startup
+    if MANIM_AVAILABLE and manim_generator.audio_generator and OFFLINE_TTS_WARM_UP:
+        asyncio.get_event_loop().run_in_executor(None, manim_generator.audio_generator.warm_up)
+    
+    # Drop persisted parses made by other parser versions
+    if PROMPT_PARSER_AVAILABLE:
+        parse_cache.retain_versions({
+            input_format: parse_version(input_format) for input_format in INPUT_FORMATS + ["outline"]
+        })
     
     logger.info("API startup complete")
     
@@ -96,6 +139,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Flowchart Video Generator API...")
+    if VIDEO_INDEX_AVAILABLE:
+        await cleanup_service.stop()
+    if MANIM_AVAILABLE and manim_generator.audio_generator:
+        manim_generator.audio_generator.close()
+    if PROMPT_PARSER_AVAILABLE:
+        parse_cache.close()
+        if isinstance(prompt_parser, NLPPromptParser):
+            prompt_parser.close()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -123,11 +174,14 @@ else:
 
 # Initialize services if available
 if PROMPT_PARSER_AVAILABLE:
-    prompt_parser = PromptParser()
+    prompt_parser = NLPPromptParser() if PROMPT_PARSER_BACKEND == "spacy" else PromptParser()
+    parse_cache = ParseCache()
 if MANIM_AVAILABLE:
     manim_generator = ManimGenerator()
 if VIDEO_PROCESSOR_AVAILABLE:
     video_processor = VideoProcessor()
+if STORAGE_AVAILABLE:
+    storage = get_storage()
 
 # Ensure required directories exist
 if UTILS_AVAILABLE:
@@ -136,18 +190,26 @@ else:
     # Basic directory creation
     VIDEOS_DIR.mkdir(exist_ok=True)
 
-# Mount static files for video serving if directory exists
-if VIDEOS_DIR.exists():
+# Mount static files for video serving when videos are kept on local disk
+if VIDEOS_DIR.exists() and (not STORAGE_AVAILABLE or storage.name == "local"):
     app.mount("/static/videos", StaticFiles(directory=str(VIDEOS_DIR)), name="videos")
 
 # Pydantic models
 class VideoGenerationRequest(BaseModel):
     """Request model for video generation."""
-    prompt: str = Field(
-        ..., 
-        min_length=1, 
-        max_length=MAX_PROMPT_LENGTH,
-        description="Text prompt describing the flowchart to generate"
+    prompt: Optional[str] = Field(
+        None,
+        max_length=MAX_STRUCTURED_INPUT_LENGTH,
+        description="Text prompt describing the flowchart to generate, or its Mermaid/DOT/JSON "
+                    "definition when input_format says so"
+    )
+    input_format: Optional[str] = Field(
+        "text",
+        description="How to read the input: text (natural language), mermaid, dot or json"
+    )
+    structure: Optional[Dict[str, Any]] = Field(
+        None,
+        description="FlowchartStructure payload (nodes, connections, title) for input_format=json"
     )
     quality: Optional[str] = Field(
         "medium_quality",
@@ -165,11 +227,124 @@ class VideoGenerationRequest(BaseModel):
         None,
         description="Voice settings for TTS: language, voice, rate, etc."
     )
+    additional_narrations: Optional[List[Dict]] = Field(
+        None,
+        description="Voice settings for alternate narration tracks (e.g. other languages), "
+                    "optionally with translated 'texts' per element id; rendered once, muxed as extra audio streams"
+    )
 
 
 # Global storage for generation status
 generation_status: Dict[str, str] = {}
 
+
+
+def note_evicted(video_id: str):
+    """
+    Quota manager callback, run in its worker thread once a video is indexed as evicted.
+
+    The index is already updated, so only the in-memory status follows it, and
+    only from completed: a re-render queued meanwhile is left alone.
+    """
+    if generation_status.get(video_id) == "completed":
+        generation_status[video_id] = "evicted"
+
+
+if VIDEO_INDEX_AVAILABLE:
+    video_index = get_video_index()
+    quota_manager = DiskQuotaManager(on_evicted=note_evicted)
+    cleanup_service = CleanupService(quota_manager=quota_manager)
+
+
+async def register_job(video_id: str, prompt: str, quality: Optional[str], format: Optional[str]):
+    """Record a newly submitted job in memory and in the persistent video index."""
+    generation_status[video_id] = "processing"
+    if VIDEO_INDEX_AVAILABLE:
+        await run_in_threadpool(video_index.record_job, video_id, prompt, quality, format)
+
+
+async def set_generation_status(video_id: str, status: str):
+    """
+    Update a job's status in memory and in the persistent video index.
+
+    Every status change goes through here: the index is the source of truth
+    after a restart. SQLite calls run in the threadpool, off the event loop.
+    """
+    generation_status[video_id] = status
+    if VIDEO_INDEX_AVAILABLE:
+        try:
+            await run_in_threadpool(video_index.update_status, video_id, status)
+        except Exception as e:
+            logger.warning(f"Failed to index status for {video_id}: {e}")
+
+async def stored_size(key: Optional[str]) -> int:
+    """Size in bytes of a stored artifact, 0 if unknown. The lookup (an S3 HEAD) runs in the threadpool."""
+    if not STORAGE_AVAILABLE or key is None:
+        return 0
+    return await run_in_threadpool(storage.size, key) or 0
+
+def parse_version(input_format: str) -> str:
+    """Version of the parser that reads an input format."""
+    if input_format == "text":
+        return prompt_parser.version
+    if input_format == "outline":
+        return PARSER_VERSION
+    return STRUCTURED_PARSER_VERSION
+
+
+async def parse_input(input_format: str, source: Any) -> Tuple["FlowchartStructure", bool]:
+    """
+    Parse a prompt, a flowchart definition or an outline page through the shared parse cache.
+    
+    Returns the structure and whether it came from the cache. Raises
+    StructuredInputError for invalid definitions; those are not cached.
+    """
+    version = parse_version(input_format)
+    key = parse_cache.key(input_format, source, version)
+    flowchart = parse_cache.get(key)
+    if flowchart is not None:
+        return flowchart, True
+    
+    if input_format == "text":
+        flowchart = await prompt_parser.parse_prompt_async(source)
+    elif input_format == "outline":
+        flowchart = prompt_parser.parse_steps(source["steps"], source["title"])
+    else:
+        flowchart = parse_structured(input_format, source)
+    
+    if parse_version(input_format) != version:
+        # The NLP model failed to load during this parse: file it under the regex parser
+        version = parse_version(input_format)
+        key = parse_cache.key(input_format, source, version)
+    parse_cache.put(key, input_format, version, flowchart)
+    return flowchart, False
+
+
+def read_request_input(request: "VideoGenerationRequest") -> Tuple[str, str, Any]:
+    """Validate a request's input. Returns its format, cleaned prompt and the source to parse."""
+    input_format = (request.input_format or "text").lower()
+    if input_format not in INPUT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported input format. Use one of: {', '.join(INPUT_FORMATS)}"
+        )
+    
+    if input_format == "text":
+        if MIDDLEWARE_AVAILABLE:
+            clean_prompt = validate_prompt(request.prompt)
+        else:
+            clean_prompt = simple_validate_prompt(request.prompt)
+        return input_format, clean_prompt, clean_prompt
+    
+    source = request.structure if input_format == "json" and request.structure else request.prompt
+    if not source:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A {input_format} flowchart definition is required"
+        )
+    return input_format, request.prompt.strip() if request.prompt else "", source
+
+
 # Simple utility functions for when utils module is not available
 def simple_generate_video_id() -> str:
     """Simple video ID generation."""
@@ -210,7 +385,7 @@ async def health_check():
     try:
         # Check system stats if available
         if UTILS_AVAILABLE:
-            stats = get_system_stats()
+            stats = await run_in_threadpool(get_system_stats)
             dependencies = stats.get("dependencies", {})
         else:
             # Basic dependency check
@@ -250,6 +425,29 @@ async def health_check():
         }
 
 
+@app.post("/api/preview")
+async def preview_flowchart(request: VideoGenerationRequest):
+    """Parse and lay out a prompt or flowchart definition without rendering it."""
+    if not PROMPT_PARSER_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prompt parsing not available"
+        )
+    input_format, _, source = read_request_input(request)
+    try:
+        flowchart, cached = await parse_input(input_format, source)
+    except StructuredInputError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "success": True,
+        "input_format": input_format,
+        "structure": flowchart.to_dict(),
+        "structure_hash": flowchart.content_hash(),
+        "cached": cached
+    }
+
+
 @app.post("/api/generate-video")
 async def generate_video(
     request: VideoGenerationRequest,
@@ -257,11 +455,22 @@ async def generate_video(
 ):
     """Generate an animated flowchart video from text prompt with optional audio narration."""
     try:
-        # Validate prompt
-        if MIDDLEWARE_AVAILABLE:
-            clean_prompt = validate_prompt(request.prompt)
-        else:
-            clean_prompt = simple_validate_prompt(request.prompt)
+        input_format, clean_prompt, source = read_request_input(request)
+        
+        # Structured definitions are parsed up front: errors are reported to the
+        # caller right away and the background task skips prompt parsing
+        flowchart = None
+        if input_format != "text":
+            if not PROMPT_PARSER_AVAILABLE:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Structured input parsing not available"
+                )
+            try:
+                flowchart, _ = await parse_input(input_format, source)
+            except StructuredInputError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            clean_prompt = clean_prompt or flowchart.title
         
         # Check if video generation is available
         if not MANIM_AVAILABLE:
@@ -274,7 +483,7 @@ async def generate_video(
         
         # Analyze prompt complexity if available
         complexity_analysis = None
-        if UTILS_AVAILABLE:
+        if UTILS_AVAILABLE and flowchart is None:
             complexity_analysis = validate_prompt_complexity(clean_prompt)
         
         # Generate unique video ID
@@ -284,7 +493,7 @@ async def generate_video(
             video_id = simple_generate_video_id()
         
         # Set initial status
-        generation_status[video_id] = "processing"
+        await register_job(video_id, clean_prompt, request.quality, request.format)
         
         # Start background video generation with audio
         background_tasks.add_task(
@@ -294,7 +503,9 @@ async def generate_video(
             request.quality,
             request.format,
             request.include_audio,
-            request.voice_settings
+            request.voice_settings,
+            request.additional_narrations,
+            flowchart
         )
         
         logger.info(f"Started video generation {'with audio' if request.include_audio else 'without audio'} for ID: {video_id}")
@@ -305,7 +516,9 @@ async def generate_video(
             "status": "processing",
             "message": f"Video generation started {'with audio narration' if request.include_audio else 'without audio'}",
             "complexity_analysis": complexity_analysis,
-            "audio_enabled": request.include_audio
+            "audio_enabled": request.include_audio,
+            "input_format": input_format,
+            "structure_hash": flowchart.content_hash() if flowchart else None
         }
         
     except HTTPException:
@@ -320,6 +533,195 @@ async def generate_video(
         }
 
 
+@app.post("/api/upload-outline")
+async def upload_outline(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: str = "markdown",
+    quality: str = "medium_quality",
+    include_audio: bool = True
+):
+    """
+    Stream a Markdown or NDJSON outline and render it as one chaptered video.
+    
+    The request body is the raw document. It is parsed while it is received,
+    one flowchart page per section, and each page is spooled to disk as soon
+    as it is complete, so memory stays bounded whatever the document size.
+    Pages are rendered in parallel and joined with a chapter per page.
+    """
+    try:
+        if not MANIM_AVAILABLE or not PROMPT_PARSER_AVAILABLE:
+            return {
+                "success": False,
+                "error": "Video generation not available",
+                "message": "Manim is not installed. Please install Manim to enable video generation.",
+                "status": "unavailable"
+            }
+        
+        outline_format = format.lower()
+        if outline_format not in OUTLINE_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported outline format. Use one of: {', '.join(OUTLINE_FORMATS)}"
+            )
+        if quality not in SUPPORTED_QUALITIES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported quality. Use one of: {', '.join(SUPPORTED_QUALITIES)}"
+            )
+        
+        video_id = generate_video_id() if UTILS_AVAILABLE else simple_generate_video_id()
+        spool_dir = OUTLINE_SPOOL_DIR / video_id
+        spool_dir.mkdir(parents=True)
+        
+        loop = asyncio.get_event_loop()
+        reader = OutlineReader(outline_format)
+        titles: List[str] = []
+        
+        async def spool(pages):
+            for page in pages:
+                if len(titles) >= MAX_OUTLINE_PAGES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Outline too long (max {MAX_OUTLINE_PAGES} pages)"
+                    )
+                flowchart, _ = await parse_input("outline", {"title": page.title, "steps": page.steps})
+                page_path = spool_dir / f"page_{page.index:04d}.json"
+                await loop.run_in_executor(None, page_path.write_text, json.dumps(flowchart.to_dict()))
+                titles.append(page.title)
+        
+        try:
+            received = 0
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > MAX_OUTLINE_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Outline too large (max {MAX_OUTLINE_BYTES // (1024 * 1024)} MB)"
+                    )
+                await spool(reader.feed(chunk))
+            await spool(reader.close())
+            if not titles:
+                raise OutlineError("Outline contains no steps")
+        except OutlineError as e:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except BaseException:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            raise
+        
+        await register_job(video_id, titles[0], quality, "mp4")
+        
+        background_tasks.add_task(
+            generate_outline_video_background,
+            video_id,
+            spool_dir,
+            titles,
+            include_audio,
+            quality
+        )
+        
+        logger.info(f"Started outline video generation for ID: {video_id} ({len(titles)} pages, {received} bytes)")
+        
+        return {
+            "success": True,
+            "video_id": video_id,
+            "status": "processing",
+            "message": f"Outline video generation started: {len(titles)} chapters",
+            "pages": len(titles),
+            "chapters": titles,
+            "audio_enabled": include_audio
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting outline video generation: {e}")
+        return {
+            "success": False,
+            "video_id": "",
+            "status": "error",
+            "message": f"Failed to start outline video generation: {str(e)}"
+        }
+
+
+async def generate_outline_video_background(
+    video_id: str,
+    spool_dir: Path,
+    titles: List[str],
+    include_audio: bool = True,
+    quality: Optional[str] = None
+):
+    """Render every spooled outline page in parallel at one quality, then join them as chapters."""
+    loop = asyncio.get_event_loop()
+    try:
+        start_time = time.time()
+        await set_generation_status(video_id, "generating")
+        semaphore = asyncio.Semaphore(OUTLINE_RENDER_CONCURRENCY)
+        
+        async def render_page(index: int) -> str:
+            async with semaphore:
+                page_path = spool_dir / f"page_{index:04d}.json"
+                data = await loop.run_in_executor(None, page_path.read_text)
+                flowchart = FlowchartStructure.from_dict(json.loads(data))
+                chapter_path = spool_dir / f"chapter_{index:04d}.mp4"
+                result = await manim_generator.generate_video_with_audio(
+                    flowchart,
+                    f"{video_id}_p{index:04d}",
+                    include_audio=include_audio,
+                    output_path=chapter_path,
+                    quality=quality
+                )
+                if not result.success:
+                    raise RuntimeError(f"Page {index + 1} ({titles[index]}) failed: {result.error_message}")
+                return str(chapter_path)
+        
+        tasks = [asyncio.ensure_future(render_page(index)) for index in range(len(titles))]
+        try:
+            chapter_paths = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        joined_path = spool_dir / "joined.mp4"
+        processor = manim_generator.video_processor
+        joined = await processor.concatenate_chapters(list(zip(titles, chapter_paths)), str(joined_path))
+        if not joined.success:
+            raise RuntimeError(joined.error_message)
+        
+        published = await processor.publish(str(joined_path), video_key(video_id))
+        if not published.success:
+            raise RuntimeError(published.error_message)
+        
+        await set_generation_status(video_id, "completed")
+        if UTILS_AVAILABLE:
+            await run_in_threadpool(save_generation_log, video_id, {
+                "prompt": titles[0],
+                "success": True,
+                "bytes": int(published.file_size_mb * 1024 * 1024),
+                "duration": joined.duration,
+                "has_audio": include_audio,
+                "timings": {"generate": time.time() - start_time}
+            })
+        
+        await enforce_video_quota()
+        logger.info(f"Outline video completed for {video_id}: {len(titles)} chapters, {joined.duration:.1f}s")
+        
+    except Exception as e:
+        await set_generation_status(video_id, "failed")
+        if UTILS_AVAILABLE:
+            await run_in_threadpool(save_generation_log, video_id, {
+                "prompt": titles[0] if titles else "",
+                "success": False,
+                "error": str(e)
+            })
+        logger.error(f"Outline generation error for {video_id}: {e}")
+    
+    finally:
+        await loop.run_in_executor(None, lambda: shutil.rmtree(spool_dir, ignore_errors=True))
+
+
 async def generate_video_background(
     video_id: str, 
     prompt: str, 
@@ -331,51 +733,61 @@ async def generate_video_background(
         logger.info(f"Starting background generation for {video_id}")
         
         if not MANIM_AVAILABLE or not PROMPT_PARSER_AVAILABLE:
-            generation_status[video_id] = "failed"
+            await set_generation_status(video_id, "failed")
             logger.error(f"Required components not available for {video_id}")
             return
         
         # Update status
-        generation_status[video_id] = "parsing"
+        await set_generation_status(video_id, "parsing")
         
         # Parse prompt into flowchart structure
-        flowchart = prompt_parser.parse_prompt(prompt)
+        flowchart, _ = await parse_input("text", prompt)
         logger.info(f"Parsed flowchart with {len(flowchart.nodes)} nodes")
         
         # Update status
-        generation_status[video_id] = "generating"
+        await set_generation_status(video_id, "generating")
         
         # Generate video with Manim
         result = await manim_generator.generate_video(flowchart, video_id)
         
         if result.success:
             # Update status
-            generation_status[video_id] = "completed"
+            await set_generation_status(video_id, "completed")
             
             # Log successful generation
             if UTILS_AVAILABLE:
-                save_generation_log(
-                    video_id, {
+                await run_in_threadpool(
+                    save_generation_log, video_id, {
                         "prompt": prompt,
                         "success": True,
-                        "generation_time": result.generation_time,
-                        "video_path": result.video_path,
-                        "has_audio": result.has_audio
+                        "structure_hash": flowchart.content_hash(),
+                        "bytes": await stored_size(result.storage_key),
+                        "duration": result.duration,
+                        "has_audio": result.has_audio,
+                        "timings": {"total": result.generation_time}
                     }
                 )
             
             logger.info(f"Video generation completed for {video_id}")
             
         else:
-            generation_status[video_id] = "failed"
+            await set_generation_status(video_id, "failed")
             if UTILS_AVAILABLE:
-                save_generation_log(video_id, prompt, False, error=result.error_message)
+                await run_in_threadpool(save_generation_log, video_id, {
+                    "prompt": prompt,
+                    "success": False,
+                    "error": result.error_message
+                })
             logger.error(f"Video generation failed for {video_id}: {result.error_message}")
             
     except Exception as e:
-        generation_status[video_id] = "failed"
+        await set_generation_status(video_id, "failed")
         if UTILS_AVAILABLE:
-            save_generation_log(video_id, prompt, False, error=str(e))
+            await run_in_threadpool(save_generation_log, video_id, {
+                "prompt": prompt,
+                "success": False,
+                "error": str(e)
+            })
         logger.error(f"Background generation error for {video_id}: {e}")
 
 
@@ -385,27 +797,47 @@ async def generate_video_with_audio_background(
     quality: str, 
     format: str,
     include_audio: bool = True,
-    voice_settings: Optional[Dict] = None
+    voice_settings: Optional[Dict] = None,
+    additional_narrations: Optional[List[Dict]] = None,
+    flowchart: Optional["FlowchartStructure"] = None
 ):
-    """Background task for video generation with audio narration."""
+    """Background task for video generation with audio narration.
+    
+    A flowchart parsed from structured input skips prompt parsing.
+    """
     try:
         logger.info(f"Starting background generation {'with audio' if include_audio else 'without audio'} for {video_id}")
         
         if not MANIM_AVAILABLE or not PROMPT_PARSER_AVAILABLE:
-            generation_status[video_id] = "failed"
+            await set_generation_status(video_id, "failed")
             logger.error(f"Required components not available for {video_id}")
             return
         
         # Update status
-        generation_status[video_id] = "parsing"
+        await set_generation_status(video_id, "parsing")
         
         # Parse prompt into flowchart structure
-        flowchart = prompt_parser.parse_prompt(prompt)
+        parse_start = time.time()
+        if flowchart is None:
+            flowchart, cached = await parse_input("text", prompt)
+            if cached:
+                logger.info(f"Reused the cached parse of this prompt for {video_id}")
+        parse_time = time.time() - parse_start
         logger.info(f"Parsed flowchart with {len(flowchart.nodes)} nodes")
         
+        # Keep the parsed structure so the video can be re-rendered if evicted
+        if VIDEO_INDEX_AVAILABLE:
+            await run_in_threadpool(video_index.save_job_spec, video_id, flowchart.to_dict(), {
+                "quality": quality,
+                "format": format,
+                "include_audio": include_audio,
+                "voice_settings": voice_settings,
+                "additional_narrations": additional_narrations
+            })
+        
         # Update status
         status_msg = "generating_audio" if include_audio else "generating"
-        generation_status[video_id] = status_msg
+        await set_generation_status(video_id, status_msg)
         
         # Generate video with Manim (with or without audio)
         if include_audio:
@@ -413,36 +845,36 @@ async def generate_video_with_audio_background(
                 flowchart, 
                 video_id,
                 include_audio=True,
-                voice_settings=voice_settings
+                voice_settings=voice_settings,
+                additional_narrations=additional_narrations
             )
         else:
             result = await manim_generator.generate_video(flowchart, video_id)
         
         if result.success:
             # Update status
-            generation_status[video_id] = "optimizing"
-            
-            # Optimize video if processor is available
-            if VIDEO_PROCESSOR_AVAILABLE:
-                video_path = Path(result.video_path)
-                optimized_path = await video_processor.optimize_video(video_path)
-            
-            # Update status
-            generation_status[video_id] = "completed"
+            await set_generation_status(video_id, "completed")
             
             # Log successful generation
             if UTILS_AVAILABLE:
-                save_generation_log(
-                    video_id, prompt, True, result.generation_time,
-                    extra_data={"has_audio": getattr(result, 'has_audio', False)}
-                )
+                await run_in_threadpool(save_generation_log, video_id, {
+                    "prompt": prompt,
+                    "success": True,
+                    "structure_hash": flowchart.content_hash(),
+                    "bytes": await stored_size(result.storage_key),
+                    "duration": result.duration,
+                    "has_audio": getattr(result, 'has_audio', False),
+                    "timings": {"parse": parse_time, "generate": result.generation_time}
+                })
+            
+            await enforce_video_quota()
             
             logger.info(f"Video generation completed for {video_id} {'with audio' if getattr(result, 'has_audio', False) else 'without audio'}")
             
         else:
-            generation_status[video_id] = "failed"
+            await set_generation_status(video_id, "failed")
             if UTILS_AVAILABLE:
-                save_generation_log(video_id, {
+                await run_in_threadpool(save_generation_log, video_id, {
                     "prompt": prompt,
                     "success": False,
                     "error": result.error_message
@@ -450,9 +882,9 @@ async def generate_video_with_audio_background(
             logger.error(f"Video generation failed for {video_id}: {result.error_message}")
             
     except Exception as e:
-        generation_status[video_id] = "failed"
+        await set_generation_status(video_id, "failed")
         if UTILS_AVAILABLE:
-            save_generation_log(video_id, {
+            await run_in_threadpool(save_generation_log, video_id, {
                 "prompt": prompt,
                 "success": False,
                 "error": str(e)
@@ -460,15 +892,158 @@ async def generate_video_with_audio_background(
         logger.error(f"Background generation error for {video_id}: {e}")
 
 
+async def enforce_video_quota():
+    """Evict least recently accessed videos if storage is over quota."""
+    if not VIDEO_INDEX_AVAILABLE:
+        return
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, quota_manager.enforce)
+    except Exception as e:
+        logger.error(f"Quota enforcement failed: {e}")
+
+
+async def regenerate_video_background(video_id: str):
+    """Re-render an evicted video from its saved flowchart structure and settings."""
+    try:
+        record = await run_in_threadpool(video_index.get, video_id)
+        if not record or not record.get("structure"):
+            await set_generation_status(video_id, "failed")
+            logger.error(f"Cannot regenerate {video_id}: no saved flowchart structure")
+            return
+        
+        flowchart = FlowchartStructure.from_dict(record["structure"])
+        settings = record.get("settings") or {}
+        include_audio = settings.get("include_audio", True)
+        
+        logger.info(f"Regenerating evicted video {video_id}")
+        if include_audio:
+            result = await manim_generator.generate_video_with_audio(
+                flowchart,
+                video_id,
+                include_audio=True,
+                voice_settings=settings.get("voice_settings"),
+                additional_narrations=settings.get("additional_narrations")
+            )
+        else:
+            result = await manim_generator.generate_video(flowchart, video_id)
+        
+        if not result.success:
+            await restore_evicted(video_id, result.error_message)
+            logger.error(f"Regeneration failed for {video_id}: {result.error_message}")
+            return
+        
+        await set_generation_status(video_id, "completed")
+        if UTILS_AVAILABLE:
+            await run_in_threadpool(save_generation_log, video_id, {
+                "success": True,
+                "structure_hash": record.get("structure_hash"),
+                "bytes": await stored_size(result.storage_key),
+                "duration": result.duration,
+                "has_audio": result.has_audio,
+                "timings": {"regenerate": result.generation_time},
+                "error": None
+            })
+        
+        await enforce_video_quota()
+        
+    except Exception as e:
+        await restore_evicted(video_id, str(e))
+        logger.error(f"Regeneration error for {video_id}: {e}")
+
+
+async def restore_evicted(video_id: str, error: Optional[str]):
+    """
+    Put a video whose re-render failed back to evicted, keeping the error.
+
+    Its saved spec is still intact, so a later request may regenerate it again;
+    marking it failed would make the eviction permanent.
+    """
+    generation_status[video_id] = "evicted"
+    if VIDEO_INDEX_AVAILABLE:
+        try:
+            await run_in_threadpool(video_index.record_regeneration_failure, video_id, error)
+        except Exception as e:
+            logger.warning(f"Failed to index status for {video_id}: {e}")
+
+
+async def schedule_regeneration(video_id: str, background_tasks: BackgroundTasks) -> bool:
+    """Queue re-rendering of an evicted video. Returns True if it is (or was already) queued."""
+    if generation_status.get(video_id) == "regenerating":
+        return True
+    if not VIDEO_INDEX_AVAILABLE or not MANIM_AVAILABLE:
+        return False
+    record = await run_in_threadpool(video_index.get, video_id)
+    if not record or record["status"] not in ("evicted", "regenerating") or not record.get("structure"):
+        return False
+    await set_generation_status(video_id, "regenerating")
+    background_tasks.add_task(regenerate_video_background, video_id)
+    return True
+
+
+async def recover_missing_video(video_id: str, background_tasks: BackgroundTasks) -> bool:
+    """
+    Handle a completed video whose stored object is gone: evicted by another
+    worker's quota run, or lost. It is marked evicted in the index (if not
+    already) and its re-render queued. Returns True if a re-render is queued.
+    """
+    if not VIDEO_INDEX_AVAILABLE:
+        return False
+    await run_in_threadpool(video_index.mark_evicted, video_id)
+    note_evicted(video_id)
+    return await schedule_regeneration(video_id, background_tasks)
+
+
+def regenerating_response(video_id: str) -> JSONResponse:
+    """202 telling the client an evicted video is being re-rendered."""
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "video_id": video_id,
+            "status": "regenerating",
+            "message": "Video is being regenerated, check /api/video-status for progress"
+        }
+    )
+
+
+def get_subtitle_urls(video_id: str) -> Dict[str, str]:
+    """Subtitle download URLs by language for every narration track of a job."""
+    if not STORAGE_AVAILABLE or not VIDEO_INDEX_AVAILABLE:
+        return {}
+    record = video_index.get(video_id)
+    settings = (record or {}).get("settings") or {}
+    if not settings.get("include_audio", True):
+        return {}
+    tracks = [settings.get("voice_settings") or DEFAULT_NARRATION_VOICE_SETTINGS]
+    tracks += settings.get("additional_narrations") or []
+    return {
+        language: f"/api/videos/{video_id}/subtitles/{language}"
+        for language in track_languages(tracks)
+        if storage.exists(subtitles_key(video_id, language))
+    }
+
+
 @app.get("/api/video-status/{video_id}")
-async def get_video_status(video_id: str):
+async def get_video_status(video_id: str, background_tasks: BackgroundTasks):
     """Get the status of video generation."""
     try:
         if MIDDLEWARE_AVAILABLE:
             video_id = validate_video_id(video_id)
         
-        # Get current status
-        status = generation_status.get(video_id, "not_found")
+        # Get current status, falling back to the index for jobs run by other workers
+        status = generation_status.get(video_id)
+        record = None
+        if VIDEO_INDEX_AVAILABLE and status in (None, "failed", "evicted", "regenerating"):
+            record = await run_in_threadpool(video_index.get, video_id)
+            status = status or (record["status"] if record else None)
+        status = status or "not_found"
+        # Failures and failed re-renders of evicted videos keep their error for reporting
+        error = record.get("error") if record else None
+        
+        # Evicted videos are re-rendered transparently on first request
+        if status == "evicted" and await schedule_regeneration(video_id, background_tasks):
+            status = "regenerating"
         
         if status == "not_found":
             raise HTTPException(
@@ -480,18 +1055,24 @@ async def get_video_status(video_id: str):
         video_url = None
         file_size_mb = None
         duration = None
+        subtitles = {}
         
         if status == "completed":
-            video_path = VIDEOS_DIR / f"{video_id}.mp4"
-            if video_path.exists():
+            if STORAGE_AVAILABLE:
+                size = await run_in_threadpool(storage.size, video_key(video_id))
+            else:
+                video_path = VIDEOS_DIR / f"{video_id}.mp4"
+                size = video_path.stat().st_size if video_path.exists() else None
+            
+            if size is not None:
                 video_url = f"/api/videos/{video_id}"
-                
-                # Get video info if processor is available
-                if VIDEO_PROCESSOR_AVAILABLE:
-                    video_info = await video_processor.get_video_info(video_path)
-                    if video_info:
-                        file_size_mb = video_info.size_mb
-                        duration = video_info.duration
+                file_size_mb = size / (1024 * 1024)
+                if VIDEO_INDEX_AVAILABLE:
+                    record = record or await run_in_threadpool(video_index.get, video_id)
+                    duration = record.get("duration") if record else None
+                subtitles = await run_in_threadpool(get_subtitle_urls, video_id)
+            elif await recover_missing_video(video_id, background_tasks):
+                status = "regenerating"
             else:
                 status = "failed"
         
@@ -501,7 +1082,9 @@ async def get_video_status(video_id: str):
             "status": status,
             "video_url": video_url,
             "file_size_mb": file_size_mb,
-            "duration": duration
+            "duration": duration,
+            "subtitles": subtitles,
+            "error": error if status != "completed" else None
         }
         
     except HTTPException:
@@ -515,20 +1098,50 @@ async def get_video_status(video_id: str):
 
 
 @app.get("/api/videos/{video_id}")
-async def download_video(video_id: str):
+async def download_video(video_id: str, background_tasks: BackgroundTasks):
     """Download or stream the generated video."""
     try:
         if MIDDLEWARE_AVAILABLE:
             video_id = validate_video_id(video_id)
         
-        video_path = VIDEOS_DIR / f"{video_id}.mp4"
+        if VIDEO_INDEX_AVAILABLE:
+            record = await run_in_threadpool(video_index.get, video_id)
+            if record and record["status"] in ("evicted", "regenerating"):
+                if await schedule_regeneration(video_id, background_tasks):
+                    return regenerating_response(video_id)
         
-        if not video_path.exists():
+        if STORAGE_AVAILABLE:
+            key = video_key(video_id)
+            
+            # Remote storage: let the client fetch directly from the object store
+            presigned_url = await run_in_threadpool(storage.presigned_url, key)
+            if presigned_url:
+                if not await run_in_threadpool(storage.exists, key):
+                    if await recover_missing_video(video_id, background_tasks):
+                        return regenerating_response(video_id)
+                    raise HTTPException(
+                        status_code=404,
+                        detail="Video file not found"
+                    )
+                if VIDEO_INDEX_AVAILABLE:
+                    await run_in_threadpool(video_index.touch, video_id)
+                return RedirectResponse(url=presigned_url, status_code=307)
+            
+            video_path = storage.local_path(key)
+        else:
+            video_path = VIDEOS_DIR / f"{video_id}.mp4"
+        
+        if video_path is None or not video_path.exists():
+            if await recover_missing_video(video_id, background_tasks):
+                return regenerating_response(video_id)
             raise HTTPException(
                 status_code=404,
                 detail="Video file not found"
             )
         
+        if VIDEO_INDEX_AVAILABLE:
+            await run_in_threadpool(video_index.touch, video_id)
+        
         # Return video file
         return FileResponse(
             path=str(video_path),
@@ -550,12 +1163,56 @@ async def download_video(video_id: str):
         )
 
 
+@app.get("/api/videos/{video_id}/subtitles/{language}")
+async def download_subtitles(video_id: str, language: str):
+    """Download the WebVTT subtitles of one narration track."""
+    try:
+        if MIDDLEWARE_AVAILABLE:
+            video_id = validate_video_id(video_id)
+        if not STORAGE_AVAILABLE:
+            raise HTTPException(
+                status_code=404,
+                detail="Subtitles not found"
+            )
+        if not language.replace("-", "").isalnum():
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid language tag"
+            )
+        
+        key = subtitles_key(video_id, language)
+        if not await run_in_threadpool(storage.exists, key):
+            raise HTTPException(
+                status_code=404,
+                detail="Subtitles not found"
+            )
+        
+        presigned_url = await run_in_threadpool(storage.presigned_url, key)
+        if presigned_url:
+            return RedirectResponse(url=presigned_url, status_code=307)
+        
+        return FileResponse(
+            path=str(storage.local_path(key)),
+            media_type="text/vtt",
+            filename=f"flowchart_{video_id}.{language}.vtt"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error serving subtitles: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error serving subtitles"
+        )
+
+
 @app.get("/api/stats")
 async def get_api_stats():
     """Get API usage statistics."""
     try:
         if UTILS_AVAILABLE:
-            stats = get_system_stats()
+            stats = await run_in_threadpool(get_system_stats)
             response_data = stats
         else:
             # Basic stats
@@ -579,8 +1236,22 @@ async def get_api_stats():
         response_data["current_generations"] = status_counts
         response_data["total_tracked_videos"] = len(generation_status)
         
+        if MANIM_AVAILABLE:
+            response_data["renders"] = manim_generator.get_render_stats()
+        
+        if MANIM_AVAILABLE and manim_generator.audio_generator:
+            response_data["tts_segments"] = manim_generator.audio_generator.get_segment_stats()
+            response_data["tts_engines"] = manim_generator.audio_generator.get_engine_stats()
+        
+        if PROMPT_PARSER_AVAILABLE:
+            response_data["parse_cache"] = parse_cache.get_stats()
+        
+        if VIDEO_INDEX_AVAILABLE:
+            response_data["cleanup"] = cleanup_service.get_metrics()
+            response_data["quota"] = quota_manager.get_stats()
+        
         if UTILS_AVAILABLE:
-            return format_success_response(response_data, "Statistics retrieved successfully")
+            return format_success_response({"message": "Statistics retrieved successfully", **response_data})
         else:
             return {
                 "success": True,
@@ -3,39 +3,36 @@ Audio Generator Service for Flowchart Video Generator.
 Converts text explanations to speech using various TTS engines.
 """
 import os
+import time
+import hashlib
 import tempfile
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Any
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
-try:
-    import pyttsx3
-    PYTTSX3_AVAILABLE = True
-except ImportError:
-    PYTTSX3_AVAILABLE = False
-
 try:
     from gtts import gTTS
     GTTS_AVAILABLE = True
 except ImportError:
     GTTS_AVAILABLE = False
 
-try:
-    import azure.cognitiveservices.speech as speechsdk
-    AZURE_SPEECH_AVAILABLE = True
-except ImportError:
-    AZURE_SPEECH_AVAILABLE = False
-
-try:
-    from google.cloud import texttospeech
-    GOOGLE_CLOUD_TTS_AVAILABLE = True
-except ImportError:
-    GOOGLE_CLOUD_TTS_AVAILABLE = False
-
-from pydub import AudioSegment
-from pydub.effects import normalize
+from services.audio_pcm import (
+    PCMAudio, LoudnessStats, peak_normalize, measure_loudness, level_to_target, encode
+)
+from services.tts_cache import TTSSegmentCache
+from services.tts_router import TTSRouter
+from services.tts_engines import (
+    GTTSEngine, AzureTTSEngine, GoogleCloudTTSEngine, OfflineTTSEngine,
+    PYTTSX3_AVAILABLE, AZURE_SPEECH_AVAILABLE, GOOGLE_CLOUD_TTS_AVAILABLE
+)
+from config import (
+    AUDIO_TEMP_DIR, TTS_SEGMENT_CONCURRENCY, TTS_SEGMENT_RETRIES,
+    TTS_CALL_DEADLINE_SECONDS, TTS_HEDGE_AFTER_SECONDS, LOUDNESS_STATS_CACHE_SIZE
+)
 
 
 logger = logging.getLogger(__name__)
@@ -47,105 +44,88 @@ class AudioGenerator:
     """
     
     def __init__(self):
-        self.temp_dir = Path(tempfile.mkdtemp())
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        # Prefixed with the pid so cleanup can tell when the owning worker has exited
+        AUDIO_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        self.temp_dir = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}_", dir=AUDIO_TEMP_DIR))
+        # Encode, cache and mixing work; engine calls run on their own pools (below)
+        self.executor = ThreadPoolExecutor(max_workers=max(2, TTS_SEGMENT_CONCURRENCY * 2))
+        
+        # EBU R128 stats of synthesized segments, keyed by a hash of their samples
+        self._loudness_cache: "OrderedDict[str, LoudnessStats]" = OrderedDict()
+        self._loudness_lock = threading.Lock()
+        
+        # Compressed, leveled narration segments shared across jobs
+        self.cache = TTSSegmentCache()
+        
+        # Per-segment synthesis metrics
+        self.segment_stats = {
+            "segments": 0,
+            "failures": 0,
+            "retries": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        }
         
         # Initialize available TTS engines
         self.engines = {}
         self._initialize_engines()
+        
+        # One pool per engine, sized to its concurrency limit: calls wait in the
+        # pool's queue rather than on the engine's slots, so a call that is
+        # cancelled before it starts (a hedge that lost) never takes a thread or
+        # a slot, and a slow engine cannot hold threads the other work needs
+        self.engine_executors = {
+            name: ThreadPoolExecutor(max_workers=engine.max_concurrency, thread_name_prefix=f"tts-{name}")
+            for name, engine in self.engines.items()
+        }
+        
+        # Latency/error-rate ranking and circuit breakers across engines
+        self.router = TTSRouter(self.engines.keys())
     
     def _initialize_engines(self):
         """Initialize available TTS engines."""
         if PYTTSX3_AVAILABLE:
             try:
-                engine = pyttsx3.init()
-                # Configure voice settings
-                voices = engine.getProperty('voices')
-                if voices:
-                    # Prefer female voice if available
-                    for voice in voices:
-                        if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                            engine.setProperty('voice', voice.id)
-                            break
-                
-                engine.setProperty('rate', 160)  # Speaking rate
-                engine.setProperty('volume', 0.9)  # Volume level
+                engine = OfflineTTSEngine()
                 self.engines['pyttsx3'] = engine
-                logger.info("✅ Initialized pyttsx3 TTS engine")
+                logger.info(f"✅ Initialized pyttsx3 TTS engine pool ({engine.workers} workers)")
             except Exception as e:
                 logger.warning(f"⚠️  Failed to initialize pyttsx3: {e}")
         
         if GTTS_AVAILABLE:
-            self.engines['gtts'] = True
-            logger.info("✅ Google TTS (gTTS) available")
+            try:
+                self.engines['gtts'] = GTTSEngine()
+                logger.info("✅ Google TTS (gTTS) available")
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to initialize gTTS engine: {e}")
         
         if AZURE_SPEECH_AVAILABLE:
             # Check for Azure Speech API key
             if os.getenv('AZURE_SPEECH_KEY') and os.getenv('AZURE_SPEECH_REGION'):
-                self.engines['azure'] = True
-                logger.info("✅ Azure Speech TTS available")
+                try:
+                    self.engines['azure'] = AzureTTSEngine()
+                    logger.info("✅ Azure Speech TTS available")
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to initialize Azure Speech TTS: {e}")
         
         if GOOGLE_CLOUD_TTS_AVAILABLE:
             # Check for Google Cloud credentials
             if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-                self.engines['google_cloud'] = True
-                logger.info("✅ Google Cloud TTS available")
+                try:
+                    self.engines['google_cloud'] = GoogleCloudTTSEngine()
+                    logger.info("✅ Google Cloud TTS available")
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to initialize Google Cloud TTS: {e}")
     
-    async def generate_narration_script(self, flowchart_elements: Dict) -> str:
-        """
-        Generate a natural narration script from flowchart elements.
-        
-        Args:
-            flowchart_elements: Dictionary containing nodes, connections, and metadata
-            
-        Returns:
-            str: Natural language narration script
-        """
-        try:
-            nodes = flowchart_elements.get('nodes', [])
-            connections = flowchart_elements.get('connections', [])
-            title = flowchart_elements.get('title', 'Flowchart')
-            
-            script_parts = []
-            
-            # Introduction
-            script_parts.append(f"Welcome to this {title} explanation.")
-            script_parts.append("Let's walk through each step of this process.")
-            
-            # Describe nodes in logical order
-            for i, node in enumerate(nodes):
-                node_text = node.get('text', f'Step {i+1}')
-                node_type = node.get('type', 'process')
-                
-                if node_type == 'start':
-                    script_parts.append(f"We begin with: {node_text}")
-                elif node_type == 'decision':
-                    script_parts.append(f"Next, we make a decision: {node_text}")
-                elif node_type == 'process':
-                    script_parts.append(f"Then we proceed to: {node_text}")
-                elif node_type == 'end':
-                    script_parts.append(f"Finally, we reach: {node_text}")
-                else:
-                    script_parts.append(f"At this point: {node_text}")
-            
-            # Describe connections if meaningful
-            if connections:
-                script_parts.append("The arrows show the flow between these steps.")
-                
-                # Highlight decision branches
-                decision_connections = [c for c in connections if c.get('condition')]
-                if decision_connections:
-                    script_parts.append("Notice the different paths based on the decisions made.")
-            
-            # Conclusion
-            script_parts.append("This completes our walkthrough of the flowchart.")
-            script_parts.append("Thank you for watching.")
-            
-            return " ".join(script_parts)
-            
-        except Exception as e:
-            logger.error(f"Error generating narration script: {e}")
-            return "Welcome to this flowchart explanation. Please review the visual elements to understand the process flow."
+    def warm_up(self):
+        """Start engines that run worker processes (pyttsx3) ahead of the first request. Blocking."""
+        for name, engine in self.engines.items():
+            if hasattr(engine, 'warm_up'):
+                try:
+                    engine.warm_up()
+                    logger.info(f"TTS engine {name} warmed up")
+                except Exception as e:
+                    logger.warning(f"Failed to warm up TTS engine {name}: {e}")
     
     async def generate_audio(
         self, 
@@ -162,214 +142,330 @@ class AudioGenerator:
             voice_settings: Optional voice configuration
             
         Returns:
-            Path: Path to generated audio file
+            Path: Path to generated audio file, encoded in AUDIO_CLIP_CODEC
         """
-        if engine == 'auto':
-            engine = self._select_best_engine()
-        
-        if engine not in self.engines:
+        audio = peak_normalize(await self.synthesize(text, engine, voice_settings))
+        audio_file = self.temp_dir / f"audio_{os.urandom(8).hex()}.{self.cache.extension}"
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(self.executor, encode, audio, self.cache.codec)
+        await loop.run_in_executor(self.executor, audio_file.write_bytes, data)
+        return audio_file
+    
+    async def synthesize(
+        self,
+        text: str,
+        engine: str = 'auto',
+        voice_settings: Optional[Dict] = None
+    ) -> PCMAudio:
+        """Synthesize text to in-memory PCM without touching the disk."""
+        if engine != 'auto' and engine not in self.engines:
             raise ValueError(f"TTS engine '{engine}' not available")
         
+        # Requested engine first (if healthy), then the others fastest first
+        candidates = self.router.ranked()
+        if engine != 'auto':
+            candidates = ([engine] if engine in candidates else []) + [c for c in candidates if c != engine]
+        if not candidates:
+            raise RuntimeError("No healthy TTS engines available")
+        
+        return await self._hedged_generate(text, candidates, voice_settings)
+    
+    async def _hedged_generate(
+        self,
+        text: str,
+        candidates: List[str],
+        voice_settings: Optional[Dict]
+    ) -> PCMAudio:
+        """
+        Try engines in order, hedging slow or failed calls with the next engine.
+        
+        If the current call has not finished after TTS_HEDGE_AFTER_SECONDS, or
+        fails, the next candidate is started; the first successful result wins.
+        """
+        remaining = list(candidates)
+        pending: Dict[asyncio.Task, str] = {}
+        errors = []
+        
+        def _launch() -> bool:
+            while remaining:
+                name = remaining.pop(0)
+                ticket = self.router.acquire(name)
+                if ticket is not None:
+                    task = asyncio.ensure_future(self._timed_generate(name, ticket, text, voice_settings))
+                    pending[task] = name
+                    return True
+            return False
+        
+        _launch()
         try:
-            if engine == 'pyttsx3':
-                return await self._generate_with_pyttsx3(text, voice_settings)
-            elif engine == 'gtts':
-                return await self._generate_with_gtts(text, voice_settings)
-            elif engine == 'azure':
-                return await self._generate_with_azure(text, voice_settings)
-            elif engine == 'google_cloud':
-                return await self._generate_with_google_cloud(text, voice_settings)
-            else:
-                raise ValueError(f"Unknown engine: {engine}")
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=TTS_HEDGE_AFTER_SECONDS if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    name = next(iter(pending.values()))
+                    if _launch():
+                        logger.info(f"TTS engine {name} is slow, hedging with {list(pending.values())[-1]}")
+                    continue
                 
-        except Exception as e:
-            logger.error(f"Audio generation failed with {engine}: {e}")
-            # Fallback to simplest available engine
-            if engine != 'pyttsx3' and 'pyttsx3' in self.engines:
-                return await self._generate_with_pyttsx3(text, voice_settings)
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{name}: {task.exception()}")
+                    logger.error(f"Audio generation failed with {name}: {task.exception()}")
+                    _launch()
+            
+            raise RuntimeError(f"All TTS engines failed: {'; '.join(errors) or 'none available'}")
+        
+        finally:
+            # Losing calls still queued on their engine's pool are dropped; those
+            # already running finish on that pool and their output is discarded
+            for task in pending:
+                task.cancel()
+    
+    async def _timed_generate(self, engine: str, ticket: int, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Run one engine call under the per-call deadline, feeding the router."""
+        start_time = time.time()
+        try:
+            audio = await asyncio.wait_for(
+                self._dispatch(engine, text, voice_settings),
+                timeout=TTS_CALL_DEADLINE_SECONDS
+            )
+        except BaseException as e:
+            # A call cancelled because a hedge won is no failure, but it took at
+            # least this long, so an engine that keeps losing is still demoted
+            if isinstance(e, asyncio.CancelledError):
+                self.router.abandon(engine, ticket, time.time() - start_time)
+            else:
+                self.router.record(engine, time.time() - start_time, success=False)
             raise
+        self.router.record(engine, time.time() - start_time, success=True)
+        # Hedging and fallback mean this may not be the engine that was asked for
+        audio.engine = engine
+        return audio
     
-    def _select_best_engine(self) -> str:
-        """Select the best available TTS engine."""
-        priority = ['azure', 'google_cloud', 'gtts', 'pyttsx3']
-        for engine in priority:
-            if engine in self.engines:
-                return engine
-        raise RuntimeError("No TTS engines available")
+    async def _dispatch(self, engine: str, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        if engine == 'pyttsx3':
+            return await self._generate_with_pyttsx3(text, voice_settings)
+        elif engine == 'gtts':
+            return await self._generate_with_gtts(text, voice_settings)
+        elif engine == 'azure':
+            return await self._generate_with_azure(text, voice_settings)
+        elif engine == 'google_cloud':
+            return await self._generate_with_google_cloud(text, voice_settings)
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
     
-    async def _generate_with_pyttsx3(self, text: str, voice_settings: Optional[Dict]) -> Path:
-        """Generate audio using pyttsx3 (offline)."""
-        def _generate():
-            engine = self.engines['pyttsx3']
-            
-            if voice_settings:
-                if 'rate' in voice_settings:
-                    engine.setProperty('rate', voice_settings['rate'])
-                if 'volume' in voice_settings:
-                    engine.setProperty('volume', voice_settings['volume'])
-            
-            audio_file = self.temp_dir / f"audio_{os.urandom(8).hex()}.wav"
-            engine.save_to_file(text, str(audio_file))
-            engine.runAndWait()
-            return audio_file
+    async def generate_clips(
+        self,
+        segments: List[Dict],
+        engine: str = 'auto',
+        voice_settings: Optional[Dict] = None,
+        concurrency: int = TTS_SEGMENT_CONCURRENCY
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get one loudness-leveled, compressed clip per segment, e.g. per flowchart node.
         
-        loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(self.executor, _generate)
+        Clips come straight from the segment cache in the final codec, so no
+        audio is written or decoded per job.
         
-        # Normalize audio
-        await self._normalize_audio(audio_file)
-        return audio_file
-    
-    async def _generate_with_gtts(self, text: str, voice_settings: Optional[Dict]) -> Path:
-        """Generate audio using Google TTS (online)."""
-        def _generate():
-            language = voice_settings.get('language', 'en') if voice_settings else 'en'
-            tld = voice_settings.get('tld', 'com') if voice_settings else 'com'
-            slow = voice_settings.get('slow', False) if voice_settings else False
+        Args:
+            segments: Dicts with an 'id' and the 'text' to speak
+            engine: TTS engine to use for every segment
+            voice_settings: Optional voice configuration
+            concurrency: Maximum number of segments synthesized at once
             
-            tts = gTTS(text=text, lang=language, tld=tld, slow=slow)
-            audio_file = self.temp_dir / f"audio_{os.urandom(8).hex()}.mp3"
-            tts.save(str(audio_file))
-            return audio_file
+        Returns:
+            Dict mapping segment id to its clip 'path', 'duration' and leveled
+            'loudness' stats (None if unmeasured); segments that failed to
+            synthesize are left out
+        """
+        succeeded = await self._cached_segments(segments, engine, voice_settings, concurrency)
+        return {
+            segments[r['index']]['id']: {
+                'path': r['segment'].path,
+                'duration': r['segment'].duration,
+                'loudness': r['segment'].loudness
+            }
+            for r in succeeded
+        }
+    
+    async def _cached_segments(
+        self,
+        segments: List[Dict],
+        engine: str,
+        voice_settings: Optional[Dict],
+        concurrency: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Look segments up in the cache; synthesize, level and encode the misses.
         
+        Returns one result per available segment, in order, with its
+        CachedSegment under 'segment'.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
         loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(self.executor, _generate)
+        # Entries are keyed by the engine that produced them, so audio from a
+        # fallback engine is never served as the requested engine's voice
+        lookup_engines = [engine] if engine != 'auto' else self.router.ranked()
         
-        # Convert to WAV and normalize
-        wav_file = await self._convert_to_wav(audio_file)
-        await self._normalize_audio(wav_file)
-        return wav_file
-    
-    async def _generate_with_azure(self, text: str, voice_settings: Optional[Dict]) -> Path:
-        """Generate audio using Azure Speech Services."""
-        def _generate():
-            speech_key = os.getenv('AZURE_SPEECH_KEY')
-            service_region = os.getenv('AZURE_SPEECH_REGION')
+        async def _resolve(index: int, segment: Dict) -> Dict[str, Any]:
+            keys = [self.cache.key(segment['text'], name, voice_settings) for name in lookup_engines]
+            cached = await loop.run_in_executor(self.executor, self.cache.lookup, keys)
+            if cached is not None:
+                return {'index': index, 'segment': cached, 'latency': 0.0, 'attempts': 0, 'cached': True}
             
-            speech_config = speechsdk.SpeechConfig(
-                subscription=speech_key, 
-                region=service_region
-            )
+            async with semaphore:
+                result = await self._synthesize_segment(index, segment['text'], engine, voice_settings)
+            if result['audio'] is None:
+                return result
             
-            voice_name = voice_settings.get('voice', 'en-US-AriaNeural') if voice_settings else 'en-US-AriaNeural'
-            speech_config.speech_synthesis_voice_name = voice_name
-            
-            audio_file = self.temp_dir / f"audio_{os.urandom(8).hex()}.wav"
-            audio_config = speechsdk.audio.AudioOutputConfig(filename=str(audio_file))
-            
-            synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=speech_config, 
-                audio_config=audio_config
-            )
+            def _store():
+                served = result['audio'].engine or engine
+                audio, stats = self._level_segment(result.pop('audio'))
+                return self.cache.put(self.cache.key(segment['text'], served, voice_settings), audio, stats)
             
-            result = synthesizer.speak_text_async(text).get()
-            
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                return audio_file
-            else:
-                raise Exception(f"Azure TTS failed: {result.reason}")
+            result['segment'] = await loop.run_in_executor(self.executor, _store)
+            result['cached'] = False
+            return result
         
-        loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(self.executor, _generate)
-        await self._normalize_audio(audio_file)
-        return audio_file
-    
-    async def _generate_with_google_cloud(self, text: str, voice_settings: Optional[Dict]) -> Path:
-        """Generate audio using Google Cloud TTS."""
-        def _generate():
-            client = texttospeech.TextToSpeechClient()
-            
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            
-            language_code = voice_settings.get('language', 'en-US') if voice_settings else 'en-US'
-            voice_name = voice_settings.get('voice', 'en-US-Wavenet-F') if voice_settings else 'en-US-Wavenet-F'
-            
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                name=voice_name
-            )
-            
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.LINEAR16
-            )
-            
-            response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-            
-            audio_file = self.temp_dir / f"audio_{os.urandom(8).hex()}.wav"
-            with open(audio_file, 'wb') as out:
-                out.write(response.audio_content)
-            
-            return audio_file
+        results = await asyncio.gather(*[
+            _resolve(i, segment) for i, segment in enumerate(segments)
+        ])
         
-        loop = asyncio.get_event_loop()
-        audio_file = await loop.run_in_executor(self.executor, _generate)
-        await self._normalize_audio(audio_file)
-        return audio_file
-    
-    async def _convert_to_wav(self, audio_file: Path) -> Path:
-        """Convert audio file to WAV format."""
-        def _convert():
-            audio = AudioSegment.from_file(str(audio_file))
-            wav_file = audio_file.with_suffix('.wav')
-            audio.export(str(wav_file), format='wav')
-            return wav_file
+        succeeded = [r for r in results if r.get('segment') is not None]
+        if not succeeded:
+            raise RuntimeError("All narration segments failed to synthesize")
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, _convert)
+        failed = len(results) - len(succeeded)
+        hits = sum(1 for r in succeeded if r['cached'])
+        logger.info(
+            f"Narration segments ready {len(succeeded)}/{len(results)} ({hits} cached, "
+            f"max latency {max(r['latency'] for r in results):.2f}s, {failed} failed)"
+        )
+        return succeeded
     
-    async def _normalize_audio(self, audio_file: Path):
-        """Normalize audio levels."""
-        def _normalize():
-            audio = AudioSegment.from_wav(str(audio_file))
-            normalized_audio = normalize(audio)
-            normalized_audio.export(str(audio_file), format='wav')
+    async def _synthesize_segment(
+        self,
+        index: int,
+        text: str,
+        engine: str,
+        voice_settings: Optional[Dict]
+    ) -> Dict[str, Any]:
+        """Synthesize one segment, retrying it on its own if it fails."""
+        start_time = time.time()
+        audio = None
+        error = None
+        attempts = 0
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, _normalize)
-    
-    def get_audio_duration(self, audio_file: Path) -> float:
-        """Get audio duration in seconds."""
-        audio = AudioSegment.from_file(str(audio_file))
-        return len(audio) / 1000.0  # Convert milliseconds to seconds
+        for attempt in range(TTS_SEGMENT_RETRIES + 1):
+            attempts = attempt + 1
+            try:
+                audio = await self.synthesize(text, engine=engine, voice_settings=voice_settings)
+                break
+            except Exception as e:
+                error = str(e)
+                logger.warning(f"Narration segment {index} failed (attempt {attempts}): {e}")
+                if attempt < TTS_SEGMENT_RETRIES:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        
+        latency = time.time() - start_time
+        self.segment_stats["segments"] += 1
+        self.segment_stats["retries"] += attempts - 1
+        self.segment_stats["total_latency"] += latency
+        self.segment_stats["max_latency"] = max(self.segment_stats["max_latency"], latency)
+        if audio is None:
+            self.segment_stats["failures"] += 1
+        
+        return {
+            'index': index,
+            'audio': audio,
+            'latency': latency,
+            'attempts': attempts,
+            'error': error
+        }
     
-    async def create_timed_narration(
-        self, 
-        flowchart_elements: Dict,
-        total_video_duration: float
-    ) -> Tuple[str, List[Dict]]:
+    def _level_segment(self, audio: PCMAudio) -> Tuple[PCMAudio, Optional[LoudnessStats]]:
         """
-        Create timed narration script with timestamps.
+        Bring one segment to the loudness target using cached or fresh measurements.
         
-        Args:
-            flowchart_elements: Flowchart structure
-            total_video_duration: Expected video duration in seconds
-            
-        Returns:
-            Tuple of (narration_script, timing_segments)
+        Clips are leveled once, before they are cached, so the narration Manim
+        mixes from them needs no loudness pass of its own.
         """
-        script = await self.generate_narration_script(flowchart_elements)
-        
-        # Split script into segments based on flowchart elements
-        nodes = flowchart_elements.get('nodes', [])
-        sentences = script.split('. ')
+        key = hashlib.blake2b(audio.samples.tobytes(), digest_size=16).hexdigest()
+        with self._loudness_lock:
+            stats = self._loudness_cache.get(key)
+            if stats is not None:
+                self._loudness_cache.move_to_end(key)
         
-        timing_segments = []
-        time_per_segment = total_video_duration / len(sentences) if sentences else total_video_duration
-        
-        for i, sentence in enumerate(sentences):
-            if sentence.strip():
-                timing_segments.append({
-                    'text': sentence.strip() + '.',
-                    'start_time': i * time_per_segment,
-                    'duration': time_per_segment,
-                    'node_index': min(i, len(nodes) - 1) if nodes else 0
-                })
+        if stats is None:
+            try:
+                stats = measure_loudness(audio)
+            except Exception as e:
+                # Still keep the clip's peaks consistent with the others
+                logger.warning(f"Loudness measurement failed, peak-normalizing instead: {e}")
+                return peak_normalize(audio), None
+            with self._loudness_lock:
+                self._loudness_cache[key] = stats
+                while len(self._loudness_cache) > LOUDNESS_STATS_CACHE_SIZE:
+                    self._loudness_cache.popitem(last=False)
         
-        return script, timing_segments
+        return level_to_target(audio, stats)
+    
+    def get_segment_stats(self) -> Dict[str, Any]:
+        """Per-segment synthesis metrics."""
+        stats = dict(self.segment_stats)
+        stats["avg_latency"] = stats["total_latency"] / stats["segments"] if stats["segments"] else 0.0
+        stats["cache"] = self.cache.get_stats()
+        return stats
+    
+    async def _generate_with_pyttsx3(self, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Generate audio using pyttsx3 (offline) on the worker process pool."""
+        return await self._generate_with_engine('pyttsx3', text, voice_settings)
+    
+    async def _generate_with_gtts(self, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Generate audio using Google TTS (online) with the pooled gTTS engine."""
+        # Chunks are fetched in parallel and decoded in memory
+        return await self._generate_with_engine('gtts', text, voice_settings)
+    
+    async def _generate_with_azure(self, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Generate audio using Azure Speech Services with the persistent engine."""
+        return await self._generate_with_engine('azure', text, voice_settings)
+    
+    async def _generate_with_google_cloud(self, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Generate audio using Google Cloud TTS with the persistent engine."""
+        return await self._generate_with_engine('google_cloud', text, voice_settings)
+    
+    async def _generate_with_engine(self, name: str, text: str, voice_settings: Optional[Dict]) -> PCMAudio:
+        """Synthesize with a long-lived engine client on the engine's own pool."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.engine_executors[name], self.engines[name].synthesize, text, voice_settings
+        )
+    
+    def get_engine_stats(self) -> Dict[str, Dict]:
+        """Latency, error and circuit-breaker state per engine."""
+        stats = self.router.snapshot()
+        for name, engine in self.engines.items():
+            if hasattr(engine, 'stats'):
+                stats.setdefault(name, {}).update(engine.stats.snapshot())
+        return stats
+    
+    def close(self):
+        """Shut down engine clients and worker threads, then remove temporary files."""
+        for name, engine in self.engines.items():
+            if hasattr(engine, 'close'):
+                try:
+                    engine.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close TTS engine {name}: {e}")
+        for executor in self.engine_executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False)
+        self.cleanup()
     
     def cleanup(self):
         """Clean up temporary files."""
@@ -0,0 +1,237 @@
+"""
+In-memory PCM Audio for Flowchart Video Generator.
+Float32 NumPy sample buffers with vectorized normalization and gain,
+plus EBU R128 loudness measurement and leveling.
+"""
+import io
+import re
+import json
+import math
+import wave
+import subprocess
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    AUDIO_SAMPLE_RATE, AUDIO_PEAK_HEADROOM_DB, AUDIO_CODECS, LOUDNESS_TARGET_I, LOUDNESS_TARGET_TP, LOUDNESS_TARGET_LRA
+)
+
+_INT16_SCALE = 32768.0
+_LOUDNORM_JSON = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}")
+
+
+@dataclass
+class LoudnessStats:
+    """EBU R128 measurements as reported by ffmpeg's loudnorm filter."""
+    input_i: float  # Integrated loudness, LUFS
+    input_tp: float  # True peak, dBTP
+    input_lra: float  # Loudness range, LU
+    input_thresh: float  # Relative gating threshold, LUFS
+
+    @property
+    def is_silent(self) -> bool:
+        return math.isinf(self.input_i)
+
+    def to_dict(self) -> dict:
+        return {
+            "input_i": self.input_i,
+            "input_tp": self.input_tp,
+            "input_lra": self.input_lra,
+            "input_thresh": self.input_thresh
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LoudnessStats":
+        return cls(*(float(data[key]) for key in ("input_i", "input_tp", "input_lra", "input_thresh")))
+
+
+@dataclass
+class PCMAudio:
+    """Mono float32 samples in [-1, 1] at a fixed sample rate."""
+    samples: np.ndarray
+    sample_rate: int = AUDIO_SAMPLE_RATE
+    loudness: Optional[LoudnessStats] = None
+    engine: Optional[str] = None  # TTS engine that synthesized it
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    @classmethod
+    def from_pcm16(cls, data: bytes, sample_rate: int, channels: int = 1) -> "PCMAudio":
+        """Build from interleaved signed 16-bit little-endian PCM, downmixing to mono."""
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / _INT16_SCALE
+        if channels > 1:
+            samples = samples[: len(samples) - len(samples) % channels]
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return cls(samples, sample_rate)
+
+    @classmethod
+    def from_wav_bytes(cls, data: bytes) -> "PCMAudio":
+        """Parse a 16-bit PCM WAV file held in memory."""
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"Unsupported WAV sample width: {wav.getsampwidth() * 8} bits")
+            frames = wav.readframes(wav.getnframes())
+            return cls.from_pcm16(frames, wav.getframerate(), wav.getnchannels())
+
+    def to_pcm16(self) -> bytes:
+        """Signed 16-bit little-endian PCM, as fed to ffmpeg with -f s16le."""
+        clipped = np.clip(self.samples, -1.0, 32767.0 / _INT16_SCALE)
+        return (clipped * _INT16_SCALE).astype("<i2").tobytes()
+
+
+def decode(data: bytes, fmt: str, sample_rate: int = AUDIO_SAMPLE_RATE) -> PCMAudio:
+    """
+    Decode compressed audio (e.g. MP3) to mono PCM at sample_rate.
+
+    ffmpeg reads from stdin and writes raw samples to stdout, so nothing
+    touches the disk.
+    """
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", fmt, "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+            "pipe:1"
+        ],
+        input=data,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {fmt} audio: {result.stderr.decode(errors='replace').strip()}")
+    return PCMAudio.from_pcm16(result.stdout, sample_rate)
+
+
+def encode(audio: PCMAudio, codec: str) -> bytes:
+    """Encode PCM straight to a compressed stream (see AUDIO_CODECS) over ffmpeg pipes."""
+    encoder, muxer, _, bitrate = AUDIO_CODECS[codec]
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(audio.sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", encoder, "-b:a", bitrate,
+            "-f", muxer, "pipe:1"
+        ],
+        input=audio.to_pcm16(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not encode {codec} audio: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def peak_normalize(audio: PCMAudio, headroom_db: float = AUDIO_PEAK_HEADROOM_DB) -> PCMAudio:
+    """Scale so the loudest sample sits headroom_db below full scale."""
+    peak = float(np.max(np.abs(audio.samples))) if len(audio.samples) else 0.0
+    if peak == 0.0:
+        return audio
+    target = 10 ** (-headroom_db / 20)
+    return PCMAudio(audio.samples * np.float32(target / peak), audio.sample_rate)
+
+
+def gain(audio: PCMAudio, gain_db: float) -> PCMAudio:
+    return PCMAudio(audio.samples * np.float32(10 ** (gain_db / 20)), audio.sample_rate)
+
+
+def measure_loudness(audio: PCMAudio) -> LoudnessStats:
+    """
+    Measure integrated loudness, true peak and loudness range with ffmpeg.
+
+    Runs as a separate process so the analysis does not compete with the
+    API process for the GIL.
+    """
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats",
+            "-f", "s16le", "-ar", str(audio.sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-af", "loudnorm=print_format=json",
+            "-f", "null", "-"
+        ],
+        input=audio.to_pcm16(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=False
+    )
+    match = _LOUDNORM_JSON.search(result.stderr.decode(errors="replace"))
+    if result.returncode != 0 or not match:
+        raise RuntimeError("ffmpeg loudness measurement failed")
+    return LoudnessStats.from_dict(json.loads(match.group(0)))
+
+
+def level_to_target(
+    audio: PCMAudio,
+    stats: LoudnessStats,
+    target_i: float = LOUDNESS_TARGET_I
+) -> Tuple[PCMAudio, LoudnessStats]:
+    """
+    Apply a static gain that brings a clip to the target integrated loudness.
+
+    The gain is limited so the true peak keeps AUDIO_PEAK_HEADROOM_DB below
+    full scale, so a clip with loud peaks may stay somewhat below the target.
+    """
+    if stats.is_silent:
+        return audio, stats
+    gain_db = min(target_i - stats.input_i, -stats.input_tp - AUDIO_PEAK_HEADROOM_DB)
+    leveled = LoudnessStats(
+        stats.input_i + gain_db,
+        stats.input_tp + gain_db,
+        stats.input_lra,
+        stats.input_thresh + gain_db
+    )
+    return gain(audio, gain_db), leveled
+
+
+def combine_loudness(stats: Sequence[LoudnessStats], durations: Sequence[float]) -> Optional[LoudnessStats]:
+    """
+    Estimate the stats of a track made of non-overlapping clips from each clip's stats.
+
+    Integrated loudness is the duration-weighted energy mean of the audible
+    clips (silence between them falls below the absolute gate anyway); the
+    true peak and loudness range are the clips' maxima. None if no clip is
+    audible.
+    """
+    audible = [(s, d) for s, d in zip(stats, durations) if not s.is_silent and d > 0]
+    if not audible:
+        return None
+    total = sum(d for _, d in audible)
+    energy = sum(d * 10 ** (s.input_i / 10) for s, d in audible) / total
+    input_i = 10 * math.log10(energy)
+    return LoudnessStats(
+        input_i=input_i,
+        input_tp=max(s.input_tp for s, _ in audible),
+        input_lra=max(s.input_lra for s, _ in audible),
+        input_thresh=input_i - 10.0  # EBU R128 relative gate
+    )
+
+
+def loudnorm_options(
+    stats: Optional[LoudnessStats] = None,
+    target_i: float = LOUDNESS_TARGET_I,
+    target_tp: float = LOUDNESS_TARGET_TP,
+    target_lra: float = LOUDNESS_TARGET_LRA
+) -> Dict[str, Any]:
+    """
+    Options for ffmpeg's loudnorm (EBU R128) filter in a final encode.
+
+    With measured stats the filter runs in linear mode (a constant gain with a
+    true-peak limiter); without them it falls back to single-pass dynamic
+    normalization. Both stream with constant memory. loudnorm works at 192 kHz
+    internally, so follow it with aresample=AUDIO_OUTPUT_SAMPLE_RATE.
+    """
+    options: Dict[str, Any] = {"I": target_i, "TP": target_tp, "LRA": target_lra}
+    if stats is not None and not stats.is_silent:
+        options.update({
+            "measured_I": round(stats.input_i, 2),
+            "measured_TP": round(stats.input_tp, 2),
+            "measured_LRA": round(stats.input_lra, 2),
+            "measured_thresh": round(stats.input_thresh, 2),
+            "linear": "true"
+        })
+    return options
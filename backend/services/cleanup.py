@@ -0,0 +1,238 @@
+"""
+Cleanup Service for Flowchart Video Generator.
+Periodically reclaims disk space from every class of generated artifact.
+"""
+import os
+import time
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from services.video_index import VideoIndex, get_video_index
+from services.quota_manager import DiskQuotaManager
+from config import (
+    TEMP_DIR, VIDEOS_DIR, LOGS_DIR, AUDIO_TEMP_DIR, MANIM_SCRATCH_DIR, TTS_CACHE_DIR,
+    OUTLINE_SPOOL_DIR, CLEANUP_INTERVAL_MINUTES, CLEANUP_TTLS_HOURS
+)
+
+logger = logging.getLogger(__name__)
+
+# Paths a finished job may leave behind, keyed by video id
+JOB_TEMP_PATTERNS = [
+    MANIM_SCRATCH_DIR / "{video_id}",
+    TEMP_DIR / "{video_id}_scene.py"  # Written by older versions directly into TEMP_DIR
+]
+
+# Index marker holding the job cursor, so a restart resumes where the last pass stopped
+JOB_CURSOR_MARKER = "cleanup.job_cursor"
+
+
+def _remove(path: Path) -> Tuple[int, int]:
+    """Remove a file or directory tree. Returns (files removed, bytes reclaimed)."""
+    try:
+        if path.is_dir() and not path.is_symlink():
+            files = 0
+            size = 0
+            for root, _, names in os.walk(path):
+                for name in names:
+                    try:
+                        size += os.lstat(os.path.join(root, name)).st_size
+                        files += 1
+                    except OSError:
+                        pass
+            shutil.rmtree(path, ignore_errors=True)
+            return files, size
+        size = path.lstat().st_size
+        path.unlink()
+        return 1, size
+    except FileNotFoundError:
+        return 0, 0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CleanupService:
+    """
+    Recurring cleanup of temporary and generated artifacts.
+
+    All filesystem work runs in a worker thread. Job-scoped files are located
+    through the video index rather than by scanning directories, and each
+    artifact class has its own time-to-live (CLEANUP_TTLS_HOURS). The
+    generation logs in LOGS_DIR are only swept when they have a TTL.
+    """
+
+    def __init__(
+        self,
+        index: Optional[VideoIndex] = None,
+        quota_manager: Optional[DiskQuotaManager] = None,
+        interval_minutes: float = CLEANUP_INTERVAL_MINUTES,
+        ttls_hours: Optional[Dict[str, float]] = None
+    ):
+        self.index = index or get_video_index()
+        self.quota_manager = quota_manager
+        self.interval = interval_minutes * 60
+        self.ttls = {name: hours * 3600 for name, hours in (ttls_hours or CLEANUP_TTLS_HOURS).items()}
+
+        self._task: Optional[asyncio.Task] = None
+        # Jobs that finished before this time have had their temp files removed.
+        # Without a saved cursor, older jobs are left to the TTL sweeps of their
+        # directories instead of walking the whole history on the first pass.
+        self._job_cursor = self.index.get_marker(JOB_CURSOR_MARKER)
+        if self._job_cursor is None:
+            self._job_cursor = time.time() - max(self.ttls.values())
+
+        self.metrics: Dict[str, Any] = {
+            "runs": 0,
+            "last_run_at": None,
+            "last_run_seconds": None,
+            "reclaimed_bytes": {name: 0 for name in self.ttls},
+            "reclaimed_files": {name: 0 for name in self.ttls}
+        }
+
+    def start(self):
+        """Start the recurring cleanup loop on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.run_once)
+            except Exception as e:
+                logger.error(f"Cleanup run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def run_once(self) -> Dict[str, Tuple[int, int]]:
+        """Run every cleanup pass once. Returns (files, bytes) reclaimed per artifact class."""
+        start_time = time.time()
+        results = {
+            "job_temp_files": self._clean_job_temp_files(),
+            "manim_scratch": self._clean_expired_entries(MANIM_SCRATCH_DIR, "manim_scratch", files_only=False),
+            "partial_movie_files": self._clean_partial_movies(),
+            "audio_temp": self._clean_audio_temp(),
+            "tts_cache": self._clean_expired_entries(TTS_CACHE_DIR, "tts_cache", files_only=True),
+            "outline_spool": self._clean_expired_entries(OUTLINE_SPOOL_DIR, "outline_spool", files_only=False),
+            "temp_files": self._clean_expired_entries(TEMP_DIR, "temp_files", files_only=True)
+        }
+        # Kept unless given a retention: benchmark_parser.py replays them
+        if "generation_logs" in self.ttls:
+            results["generation_logs"] = self._clean_expired_entries(LOGS_DIR, "generation_logs", files_only=True)
+
+        if self.quota_manager is not None:
+            evicted = self.quota_manager.enforce()
+            results["videos"] = (evicted["evicted"], evicted["bytes_freed"])
+
+        for name, (files, size) in results.items():
+            self.metrics["reclaimed_files"][name] = self.metrics["reclaimed_files"].get(name, 0) + files
+            self.metrics["reclaimed_bytes"][name] = self.metrics["reclaimed_bytes"].get(name, 0) + size
+
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = start_time
+        self.metrics["last_run_seconds"] = time.time() - start_time
+
+        reclaimed = sum(size for _, size in results.values())
+        if reclaimed:
+            logger.info(f"Cleanup reclaimed {reclaimed / (1024 * 1024):.1f} MB")
+        return results
+
+    def _clean_job_temp_files(self) -> Tuple[int, int]:
+        """Remove scene scripts and render intermediates of finished jobs."""
+        cutoff = time.time() - self.ttls["job_temp_files"]
+        files = size = 0
+        for job in self.index.finished_jobs_between(self._job_cursor, cutoff):
+            for pattern in JOB_TEMP_PATTERNS:
+                removed, reclaimed = _remove(Path(str(pattern).format(video_id=job["video_id"])))
+                files += removed
+                size += reclaimed
+        self._job_cursor = max(self._job_cursor, cutoff)
+        self.index.set_marker(JOB_CURSOR_MARKER, self._job_cursor)
+        return files, size
+
+    def _clean_partial_movies(self) -> Tuple[int, int]:
+        """Remove Manim's partial_movie_files trees left in the videos directory."""
+        cutoff = time.time() - self.ttls["partial_movie_files"]
+        files = size = 0
+        candidates = [VIDEOS_DIR / "partial_movie_files"]
+        manim_videos = VIDEOS_DIR / "videos"
+        if manim_videos.is_dir():
+            # Manim layout: videos/<script>/<quality>/partial_movie_files
+            candidates.extend(manim_videos.glob("*/*/partial_movie_files"))
+        for path in candidates:
+            try:
+                if path.is_dir() and path.stat().st_mtime < cutoff:
+                    removed, reclaimed = _remove(path)
+                    files += removed
+                    size += reclaimed
+            except FileNotFoundError:
+                continue
+        return files, size
+
+    def _clean_audio_temp(self) -> Tuple[int, int]:
+        """Remove expired narration files and directories of exited workers."""
+        cutoff = time.time() - self.ttls["audio_temp"]
+        files = size = 0
+        if not AUDIO_TEMP_DIR.is_dir():
+            return files, size
+
+        with os.scandir(AUDIO_TEMP_DIR) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                # Directories are named "<pid>_<random>" by AudioGenerator
+                pid = entry.name.split("_", 1)[0]
+                if pid.isdigit() and not _pid_alive(int(pid)):
+                    removed, reclaimed = _remove(Path(entry.path))
+                else:
+                    removed, reclaimed = self._remove_expired(Path(entry.path), cutoff, files_only=True)
+                files += removed
+                size += reclaimed
+        return files, size
+
+    def _clean_expired_entries(self, directory: Path, artifact_class: str, files_only: bool) -> Tuple[int, int]:
+        cutoff = time.time() - self.ttls[artifact_class]
+        return self._remove_expired(directory, cutoff, files_only)
+
+    def _remove_expired(self, directory: Path, cutoff: float, files_only: bool) -> Tuple[int, int]:
+        """Remove top-level entries of a directory last modified before cutoff."""
+        files = size = 0
+        if not directory.is_dir():
+            return files, size
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if files_only and not entry.is_file(follow_symlinks=False):
+                        continue
+                    if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                removed, reclaimed = _remove(Path(entry.path))
+                files += removed
+                size += reclaimed
+        return files, size
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "total_reclaimed_bytes": sum(self.metrics["reclaimed_bytes"].values())
+        }
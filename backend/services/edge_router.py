@@ -0,0 +1,272 @@
+"""
+Edge Router for Flowchart Video Generator.
+Routes flowchart edges as orthogonal polylines around node boxes and places their labels.
+"""
+import math
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from config import ROUTE_CLEARANCE, ROUTE_CHANNEL_PROBES, ROUTE_GRID_CELL, LABEL_CHAR_WIDTH, LABEL_HEIGHT
+
+if TYPE_CHECKING:
+    from services.prompt_parser import FlowchartStructure, FlowchartNode
+
+# Version of the routed geometry; bump when routing changes so cached routes are recomputed
+ROUTER_VERSION = "2"
+
+# Half width and height of each node shape as drawn by flowchart_runtime, in scene units
+NODE_HALF_SIZES = {"start": (0.8, 0.8), "end": (0.8, 0.8)}
+DEFAULT_HALF_SIZE = (1.0, 0.5)
+
+Point = Tuple[float, float]
+Box = Tuple[float, float, float, float]  # x0, y0, x1, y1
+
+_DIRECTIONS = {"bottom": (0.0, -1.0), "top": (0.0, 1.0), "left": (-1.0, 0.0), "right": (1.0, 0.0)}
+_PORT_SPREAD = 0.6  # Share of a side's half length that several ports spread over
+_LABEL_GAP = 0.1  # Between a label and the segment it annotates
+
+
+def node_box(node: "FlowchartNode") -> Box:
+    """Bounding box of a node's shape."""
+    w, h = NODE_HALF_SIZES.get(node.type.value, DEFAULT_HALF_SIZE)
+    x, y = node.position
+    return (x - w, y - h, x + w, y + h)
+
+
+class _GridIndex:
+    """Uniform grid over boxes: each box is listed in every cell it overlaps."""
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.boxes: List[Box] = []
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def _span(self, low: float, high: float) -> range:
+        return range(math.floor(low / self.cell), math.floor(high / self.cell) + 1)
+
+    def insert(self, box: Box):
+        index = len(self.boxes)
+        self.boxes.append(box)
+        for i in self._span(box[0], box[2]):
+            for j in self._span(box[1], box[3]):
+                self.cells.setdefault((i, j), []).append(index)
+
+    def hits(self, area: Box) -> int:
+        """Number of boxes whose interior the area overlaps (an axis-aligned segment is a flat area)."""
+        checked = set()
+        count = 0
+        for i in self._span(area[0], area[2]):
+            for j in self._span(area[1], area[3]):
+                for index in self.cells.get((i, j), ()):
+                    if index in checked:
+                        continue
+                    checked.add(index)
+                    box = self.boxes[index]
+                    if box[0] < area[2] and area[0] < box[2] and box[1] < area[3] and area[1] < box[3]:
+                        count += 1
+        return count
+
+
+def _segment_area(a: Point, b: Point) -> Box:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1]))
+
+
+def _port(box: Box, side: str, offset: float) -> Point:
+    """Point on a side of a box; offset in [-1, 1] moves it along the side."""
+    x0, y0, x1, y1 = box
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    if side in ("bottom", "top"):
+        return (cx + offset * (x1 - x0) / 2 * _PORT_SPREAD, y0 if side == "bottom" else y1)
+    return (x0 if side == "left" else x1, cy + offset * (y1 - y0) / 2 * _PORT_SPREAD)
+
+
+def _side_pairs(s: Box, t: Box, gap: float, self_loop: bool) -> List[Tuple[str, str]]:
+    """Port sides to try for an edge from box s to box t, best first."""
+    if self_loop:
+        return [("right", "top")]
+    if t[3] <= s[1] - gap:  # Target below: the usual flow direction
+        return [("bottom", "top"), ("right", "top"), ("left", "top")]
+    if t[0] >= s[2] + gap:  # Same band, to the right
+        return [("right", "left"), ("bottom", "bottom"), ("top", "top")]
+    if t[2] <= s[0] - gap:  # Same band, to the left
+        return [("left", "right"), ("bottom", "bottom"), ("top", "top")]
+    if t[1] >= s[3] + gap:  # Target above: a loop back, drawn along the side
+        return [("right", "right"), ("left", "left")]
+    return [("bottom", "bottom"), ("right", "right")]  # Overlapping or touching boxes
+
+
+def _probes(start: float, step: float, count: int, direction: int) -> Iterator[float]:
+    """Channel coordinates from start outwards: both ways, or only one (direction +1/-1)."""
+    yield start
+    for k in range(1, count + 1):
+        if direction >= 0:
+            yield start + k * step
+        if direction <= 0:
+            yield start - k * step
+
+
+def _middles(p1: Point, q1: Point, ds: str, dt: str, step: float, probes: int) -> Iterator[List[Point]]:
+    """Orthogonal connections between the two stub ends, fewest bends first."""
+    (px, py), (qx, qy) = p1, q1
+    if px == qx or py == qy:
+        yield []
+    yield [(px, qy)]
+    yield [(qx, py)]
+
+    # Ports on the same side are joined by a channel beyond both stubs
+    if ds == dt == "bottom":
+        h_start, h_dir = min(py, qy), -1
+    elif ds == dt == "top":
+        h_start, h_dir = max(py, qy), 1
+    else:
+        h_start, h_dir = (py + qy) / 2, 0
+    if ds == dt == "right":
+        v_start, v_dir = max(px, qx), 1
+    elif ds == dt == "left":
+        v_start, v_dir = min(px, qx), -1
+    else:
+        v_start, v_dir = (px + qx) / 2, 0
+
+    for c in _probes(h_start, step, probes, h_dir):
+        yield [(px, c), (qx, c)]
+    for c in _probes(v_start, step, probes, v_dir):
+        yield [(c, py), (c, qy)]
+
+
+def _simplify(points: List[Point]) -> List[Point]:
+    """Round, and drop repeated points and corners that don't turn."""
+    out: List[Point] = []
+    for x, y in points:
+        point = (round(x, 3), round(y, 3))
+        if out and point == out[-1]:
+            continue
+        if len(out) >= 2 and (out[-2][0] == out[-1][0] == point[0] or out[-2][1] == out[-1][1] == point[1]):
+            out[-1] = point
+            continue
+        out.append(point)
+    return out
+
+
+def _route(
+    s: Box,
+    t: Box,
+    pairs: List[Tuple[str, str]],
+    offsets: Tuple[float, float],
+    obstacles: _GridIndex,
+    clearance: float,
+    probes: int
+) -> List[Point]:
+    """The first crossing-free route over the side pairs, else the one with fewest crossings."""
+    best: Optional[Tuple[int, int, List[Point]]] = None
+    for rank, (ds, dt) in enumerate(pairs):
+        p = _port(s, ds, offsets[0] if rank == 0 else 0.0)
+        q = _port(t, dt, offsets[1] if rank == 0 else 0.0)
+        p1 = (p[0] + _DIRECTIONS[ds][0] * clearance, p[1] + _DIRECTIONS[ds][1] * clearance)
+        q1 = (q[0] + _DIRECTIONS[dt][0] * clearance, q[1] + _DIRECTIONS[dt][1] * clearance)
+        for middle in _middles(p1, q1, ds, dt, 2 * clearance, probes):
+            path = [p1] + middle + [q1]
+            crossings = sum(obstacles.hits(_segment_area(a, b)) for a, b in zip(path, path[1:]))
+            if best is None or (crossings, len(middle)) < best[:2]:
+                best = (crossings, len(middle), [p] + path + [q])
+            if crossings == 0:
+                return _simplify(best[2])
+    return _simplify(best[2])
+
+
+def _label_box(label: str, center: Point) -> Box:
+    w = LABEL_CHAR_WIDTH * len(label) + 0.2
+    return (center[0] - w / 2, center[1] - LABEL_HEIGHT / 2, center[0] + w / 2, center[1] + LABEL_HEIGHT / 2)
+
+
+def _place_label(label: str, route: List[Point], avoid: Tuple[_GridIndex, ...]) -> Point:
+    """Beside the first segment, from the source on, where the label overlaps nothing to avoid."""
+    w = LABEL_CHAR_WIDTH * len(label) + 0.2
+    h = LABEL_HEIGHT
+    candidates = []
+    for a, b in zip(route, route[1:]):
+        mx, my = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+        if a[0] == b[0]:
+            candidates += [(mx + w / 2 + _LABEL_GAP, my), (mx - w / 2 - _LABEL_GAP, my)]
+        else:
+            candidates += [(mx, my + h / 2 + _LABEL_GAP), (mx, my - h / 2 - _LABEL_GAP)]
+
+    for center in candidates:
+        area = _label_box(label, center)
+        if not any(index.hits(area) for index in avoid):
+            break
+    else:
+        center = candidates[0] if candidates else route[0]
+    return (round(center[0], 3), round(center[1], 3))
+
+
+def route_edges(
+    flowchart: "FlowchartStructure",
+    keep_existing: bool = False,
+    clearance: float = ROUTE_CLEARANCE,
+    probes: int = ROUTE_CHANNEL_PROBES
+) -> "FlowchartStructure":
+    """
+    Route every connection in place as an orthogonal polyline and return the chart.
+
+    Each edge leaves and enters its nodes through side ports chosen from the
+    relative position of the two boxes (several edges on one side are spread
+    along it) and is joined by the straight, L or Z path with the fewest bends
+    that crosses no node box. Z channels are probed outwards from the middle.
+    Boxes, segments and labels are kept in uniform grids, so each collision
+    test only looks at nearby boxes. Labels are placed once all edges are
+    routed, beside the first segment where they overlap no node, edge or other
+    label. Routes and label positions are stored on the connections, so they
+    are cached and serialized with the layout. keep_existing keeps the routes
+    connections already have, minus repeated points, and reroutes those that
+    collapse to a single point.
+    """
+    nodes = {node.id: node for node in flowchart.nodes}
+    boxes = {node_id: node_box(node) for node_id, node in nodes.items()}
+    obstacles = _GridIndex(ROUTE_GRID_CELL)
+    for box in boxes.values():
+        half = clearance / 2
+        obstacles.insert((box[0] - half, box[1] - half, box[2] + half, box[3] + half))
+
+    edges = [edge for edge in flowchart.connections if edge.from_node in boxes and edge.to_node in boxes]
+    pairs = [
+        _side_pairs(boxes[e.from_node], boxes[e.to_node], 2 * clearance, e.from_node == e.to_node)
+        for e in edges
+    ]
+
+    # Spread the ends sharing a node side, ordered by where the other end lies
+    groups: Dict[Tuple[str, str], List[Tuple[float, int, int]]] = {}
+    for i, (edge, edge_pairs) in enumerate(zip(edges, pairs)):
+        ds, dt = edge_pairs[0]
+        for node_id, side, other, end in ((edge.from_node, ds, edge.to_node, 0), (edge.to_node, dt, edge.from_node, 1)):
+            x, y = nodes[other].position
+            groups.setdefault((node_id, side), []).append((x if side in ("bottom", "top") else y, i, end))
+    offsets = [[0.0, 0.0] for _ in edges]
+    for members in groups.values():
+        if len(members) > 1:
+            members.sort()
+            for k, (_, i, end) in enumerate(members):
+                offsets[i][end] = 2 * (k + 1) / (len(members) + 1) - 1
+
+    for i, edge in enumerate(edges):
+        if keep_existing and len(edge.route) >= 2:
+            # Given routes may repeat points; a zero-length last segment leaves the arrow tip without a direction
+            edge.route = _simplify(edge.route)
+        if not (keep_existing and len(edge.route) >= 2):
+            edge.route = _route(
+                boxes[edge.from_node], boxes[edge.to_node], pairs[i], tuple(offsets[i]), obstacles, clearance, probes
+            )
+            edge.label_position = None
+
+    # Labels once every route is known, so they avoid all edges as well as nodes
+    lines = _GridIndex(ROUTE_GRID_CELL)
+    for edge in edges:
+        for a, b in zip(edge.route, edge.route[1:]):
+            lines.insert(_segment_area(a, b))
+    labels = _GridIndex(ROUTE_GRID_CELL)
+    for edge in edges:
+        if edge.label_position is not None:
+            labels.insert(_label_box(edge.label, edge.label_position))
+    for edge in edges:
+        if edge.label and edge.label_position is None:
+            edge.label_position = _place_label(edge.label, edge.route, (obstacles, lines, labels))
+            labels.insert(_label_box(edge.label, edge.label_position))
+    return flowchart
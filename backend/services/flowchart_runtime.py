@@ -0,0 +1,201 @@
+"""
+Flowchart Scene Runtime for Flowchart Video Generator.
+The one Manim scene every job renders, driven by the scene description in FLOWCHART_SCENE_DATA.
+
+Manim loads this module by path in the render subprocess, so it only depends
+on Manim and the standard library; its bytecode is compiled once and reused
+from __pycache__ by every job. Scene data holds only literal values (text,
+coordinates, timings, clip paths) and is never executed.
+"""
+import os
+import json
+import math
+
+from manim import (
+    MovingCameraScene, Text, Circle, Polygon, Rectangle, Line, Arrow, VGroup,
+    Write, FadeIn, FadeOut, Create, UP, DL, UR, WHITE, BLACK, GREEN, RED, YELLOW, BLUE
+)
+
+SCENE_DATA_ENV = "FLOWCHART_SCENE_DATA"
+SCENE_DATA_VERSION = 3
+
+# Cell size of the grid that finds revealed elements near the viewport, in scene units
+_CULL_CELL = 4.0
+
+
+def _shape(node_type: str):
+    if node_type in ("start", "end"):
+        return Circle(radius=0.8, color=GREEN if node_type == "start" else RED, fill_opacity=0.3)
+    if node_type == "decision":
+        return Polygon(
+            [-0.8, 0.5, 0], [0.8, 0.5, 0], [1.0, 0, 0], [0.8, -0.5, 0], [-0.8, -0.5, 0], [-1.0, 0, 0],
+            color=YELLOW, fill_opacity=0.3
+        )
+    return Rectangle(width=2.0, height=1.0, color=BLUE, fill_opacity=0.3)
+
+
+def _connector(route):
+    """An orthogonal polyline ending in an arrow tip, drawn from source to target."""
+    points = [[x, y, 0] for x, y in route]
+    segments = [Line(a, b, color=BLACK) for a, b in zip(points[:-2], points[1:-1])]
+    tip = Arrow(
+        start=points[-2], end=points[-1], color=BLACK, buff=0,
+        tip_length=0.2, max_tip_length_to_length_ratio=1
+    )
+    return VGroup(*segments, tip)
+
+
+def _bounds(mobject):
+    """Bounding box (x0, y0, x1, y1) of a mobject."""
+    (x0, y0, _), (x1, y1, _) = mobject.get_corner(DL), mobject.get_corner(UR)
+    return (x0, y0, x1, y1)
+
+
+class _Revealed:
+    """Revealed mobjects in a uniform grid by bounding box, so those near a viewport are found without a scan."""
+
+    def __init__(self, cell: float):
+        self.cell = cell
+        self.mobjects = []
+        self.boxes = []
+        self.cells = {}
+
+    def _span(self, low: float, high: float) -> range:
+        return range(math.floor(low / self.cell), math.floor(high / self.cell) + 1)
+
+    def add(self, mobject):
+        index = len(self.mobjects)
+        box = _bounds(mobject)
+        self.mobjects.append(mobject)
+        self.boxes.append(box)
+        for i in self._span(box[0], box[2]):
+            for j in self._span(box[1], box[3]):
+                self.cells.setdefault((i, j), []).append(index)
+
+    def overlapping(self, area) -> set:
+        """Indices of the mobjects whose box overlaps the area."""
+        found = set()
+        for i in self._span(area[0], area[2]):
+            for j in self._span(area[1], area[3]):
+                for index in self.cells.get((i, j), ()):
+                    box = self.boxes[index]
+                    if box[0] <= area[2] and area[0] <= box[2] and box[1] <= area[3] and area[1] <= box[3]:
+                        found.add(index)
+        return found
+
+
+class FlowchartScene(MovingCameraScene):
+    """
+    Reveal the title, then every node with its narration clip, then the edges.
+
+    Scene data layout (see ManimGenerator._build_scene_data):
+    nodes are [type, text, x, y]; edges are [from index, to index, label,
+    route as [[x, y], ...], label position [x, y] or null];
+    cues are [node index, run time, hold, clip path or null], and the title
+    cue is [run time, hold, clip path or null]; camera is {follow, margin}.
+
+    With camera-follow the frame pans to each element during its reveal, so
+    the planned timeline is unchanged, and only revealed elements overlapping
+    the frame (or the area it sweeps during a pan) stay in the scene. Manim
+    rasterizes the scene's mobjects only, so per-frame cost follows what is
+    visible rather than the chart size.
+    """
+
+    def construct(self):
+        with open(os.environ[SCENE_DATA_ENV], encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SCENE_DATA_VERSION:
+            raise ValueError(f"Unsupported scene data version: {data.get('version')}")
+        timing = data["timing"]
+        self.follow = data["camera"]["follow"]
+        self.margin = data["camera"]["margin"]
+        self.revealed = _Revealed(_CULL_CELL)
+        self.on_screen = set()
+
+        # Scene configuration
+        self.camera.background_color = WHITE
+
+        # Title
+        title = Text(data["title"], font_size=36, color=BLACK)
+        title.to_edge(UP, buff=0.5)
+        self._cue(Write(title), *data["title_cue"])
+        self.play(FadeOut(title), run_time=timing["title_fade"])
+
+        # Create all flowchart elements
+        nodes = []
+        for node_type, text, x, y in data["nodes"]:
+            label = Text(text, font_size=20, color=BLACK).move_to([x, y, 0])
+            shape = _shape(node_type).move_to([x, y, 0])
+            nodes.append(VGroup(shape, label))
+
+        edges = []
+        for source, target, label, route, label_position in data["edges"]:
+            edges.append(_connector(route))
+            if label:
+                edges.append(Text(label, font_size=16, color=BLACK).move_to([*label_position, 0]))
+
+        # Animation sequence: nodes one by one, each with its narration
+        for index, run_time, hold, clip in data["cues"]:
+            self._cue(FadeIn(nodes[index]), run_time, hold, clip, nodes[index])
+
+        # Show edges
+        for edge in edges:
+            self._cue(Create(edge), timing["edge_reveal"], timing["edge_hold"], None, edge)
+
+        # Hold final state
+        self.wait(timing["final_hold"])
+
+        # Fade out everything (in camera-follow mode, everything still in the scene)
+        all_objects = [self.revealed.mobjects[i] for i in sorted(self.on_screen)] if self.follow else nodes + edges
+        if all_objects:
+            self.play(FadeOut(*all_objects), run_time=timing["fade_out"])
+
+    def _cue(self, animation, run_time: float, hold: float, clip, mobject=None):
+        """Reveal one element, starting its narration clip at the same frame."""
+        animations = [animation]
+        following = self.follow and mobject is not None
+        if following:
+            viewport = self._viewport()
+            target = self._follow_target(mobject)
+            if target is not None:
+                # Pan during the reveal; keep everything the frame sweeps over
+                animations.append(self.camera.frame.animate.move_to(target))
+                end = self._viewport(target)
+                viewport = (
+                    min(viewport[0], end[0]), min(viewport[1], end[1]),
+                    max(viewport[2], end[2]), max(viewport[3], end[3])
+                )
+            self._cull(viewport)
+        if clip is not None:
+            self.add_sound(clip)
+        self.play(*animations, run_time=run_time)
+        if following:
+            self.revealed.add(mobject)
+            self._cull(self._viewport())
+        self.wait(hold)
+
+    def _viewport(self, center=None):
+        """Area the frame shows, centred on center or on the frame's current position."""
+        frame = self.camera.frame
+        x, y = (center if center is not None else frame.get_center())[:2]
+        return (x - frame.width / 2, y - frame.height / 2, x + frame.width / 2, y + frame.height / 2)
+
+    def _follow_target(self, mobject):
+        """Frame centre that brings the mobject into view, or None if it already is (margin included)."""
+        x0, y0, x1, y1 = _bounds(mobject)
+        fx0, fy0, fx1, fy1 = self._viewport()
+        m = self.margin
+        if fx0 + m <= x0 and x1 <= fx1 - m and fy0 + m <= y0 and y1 <= fy1 - m:
+            return None
+        return mobject.get_center()
+
+    def _cull(self, area):
+        """Keep in the scene only the revealed mobjects that overlap the area."""
+        visible = self.revealed.overlapping(area)
+        leaving = self.on_screen - visible
+        if leaving:
+            self.remove(*(self.revealed.mobjects[i] for i in leaving))
+        entering = visible - self.on_screen
+        if entering:
+            self.add(*(self.revealed.mobjects[i] for i in sorted(entering)))
+        self.on_screen = visible
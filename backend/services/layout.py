@@ -0,0 +1,131 @@
+"""
+Layered Layout for Flowchart Video Generator.
+Places the nodes of an arbitrary flowchart graph in top-to-bottom layers.
+"""
+from typing import Dict, List
+
+from services.prompt_parser import FlowchartStructure
+from config import LAYOUT_NODE_SPACING, LAYOUT_LAYER_SPACING, LAYOUT_ORDERING_SWEEPS
+
+# Identifies the placement produced with the configured spacing. Bump the
+# leading number whenever the algorithm changes, so memoized layouts are recomputed.
+LAYOUT_VERSION = f"1/{LAYOUT_NODE_SPACING}/{LAYOUT_LAYER_SPACING}/{LAYOUT_ORDERING_SWEEPS}"
+
+
+def _acyclic_successors(order: List[str], successors: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Drop the back edges found by a depth-first search, leaving a DAG."""
+    dag: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    state: Dict[str, int] = {}  # 1 = on the DFS stack, 2 = finished
+
+    for root in order:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node_id, children = stack[-1]
+            for child in children:
+                if state.get(child) == 1:
+                    continue  # Back edge: closes a loop
+                dag[node_id].append(child)
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                state[node_id] = 2
+                stack.pop()
+    return dag
+
+
+def _assign_layers(order: List[str], dag: Dict[str, List[str]]) -> Dict[str, int]:
+    """Longest-path layering: every edge points at least one layer down."""
+    indegree = {node_id: 0 for node_id in order}
+    for children in dag.values():
+        for child in children:
+            indegree[child] += 1
+
+    layer = {node_id: 0 for node_id in order}
+    ready = [node_id for node_id in order if indegree[node_id] == 0]
+    for node_id in ready:  # ready grows while it is walked (Kahn's algorithm)
+        for child in dag[node_id]:
+            layer[child] = max(layer[child], layer[node_id] + 1)
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    return layer
+
+
+def _order_layers(
+    layers: List[List[str]],
+    dag: Dict[str, List[str]],
+    sweeps: int
+) -> None:
+    """Reorder each layer by the barycenter of its neighbours to reduce crossings."""
+    predecessors: Dict[str, List[str]] = {node_id: [] for layer in layers for node_id in layer}
+    for node_id, children in dag.items():
+        for child in children:
+            predecessors[child].append(node_id)
+
+    index = {node_id: i for layer in layers for i, node_id in enumerate(layer)}
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        neighbours = predecessors if downward else dag
+        sequence = layers[1:] if downward else layers[-2::-1]
+        for layer in sequence:
+            def barycenter(node_id: str) -> float:
+                linked = neighbours[node_id]
+                if not linked:
+                    return index[node_id]
+                return sum(index[other] for other in linked) / len(linked)
+
+            layer.sort(key=barycenter)
+            for i, node_id in enumerate(layer):
+                index[node_id] = i
+
+
+def layered_layout(
+    flowchart: FlowchartStructure,
+    node_spacing: float = LAYOUT_NODE_SPACING,
+    layer_spacing: float = LAYOUT_LAYER_SPACING,
+    sweeps: int = LAYOUT_ORDERING_SWEEPS
+) -> FlowchartStructure:
+    """
+    Lay a flowchart out top to bottom in place and return it.
+
+    Loops are broken by ignoring DFS back edges, nodes are layered by longest
+    path from the sources and each layer is ordered with barycenter sweeps.
+    The drawing is centered on the origin, and nodes are re-sorted by layer
+    so they are revealed (and narrated) in the order the flow runs.
+    Runs in O((V + E) * sweeps + V log V).
+    """
+    if not flowchart.nodes:
+        return flowchart
+
+    order = [node.id for node in flowchart.nodes]
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in order}
+    for edge in flowchart.connections:
+        if edge.from_node in successors and edge.to_node in successors and edge.from_node != edge.to_node:
+            successors[edge.from_node].append(edge.to_node)
+
+    dag = _acyclic_successors(order, successors)
+    layer_of = _assign_layers(order, dag)
+
+    layers: List[List[str]] = [[] for _ in range(max(layer_of.values()) + 1)]
+    for node_id in order:
+        layers[layer_of[node_id]].append(node_id)
+    _order_layers(layers, dag, sweeps)
+
+    top = (len(layers) - 1) * layer_spacing / 2
+    positions = {}
+    rank = {}
+    for depth, layer in enumerate(layers):
+        left = -(len(layer) - 1) * node_spacing / 2
+        for i, node_id in enumerate(layer):
+            positions[node_id] = (round(left + i * node_spacing, 3), round(top - depth * layer_spacing, 3))
+            rank[node_id] = (depth, i)
+
+    for node in flowchart.nodes:
+        node.position = positions[node.id]
+    flowchart.nodes.sort(key=lambda node: rank[node.id])
+    return flowchart
@@ -1,31 +1,62 @@
 """
 Manim generator service for creating animated flowchart videos with audio narration.
 """
+import io
 import os
+import json
+import shutil
+import py_compile
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
 
 from services.prompt_parser import FlowchartStructure
 from services.audio_generator import AudioGenerator
-from config import TEMP_DIR, VIDEOS_DIR, MANIM_CONFIG
+from services.audio_pcm import combine_loudness
+from services.video_processor import VideoProcessor
+from services.storage import get_storage, video_key
+from services.subtitles import build_webvtt, subtitles_key, track_languages
+from services.scene_preflight import check_scene_data, PreflightError
+from services.edge_router import route_edges, node_box
+from services.timeline import (
+    Timeline, Cue, NarrationClip, plan_timeline, TITLE_CUE, TITLE_FADE_SECONDS,
+    EDGE_REVEAL_SECONDS, EDGE_HOLD_SECONDS, FINAL_HOLD_SECONDS, FADE_OUT_SECONDS
+)
+from config import (
+    TEMP_DIR, VIDEOS_DIR, MANIM_CONFIG, MANIM_SCRATCH_DIR, MANIM_SHARED_CACHE_DIR,
+    DEFAULT_NARRATION_VOICE_SETTINGS, MAX_CONCURRENT_RENDERS, PREFLIGHT_DRY_RUN, PREFLIGHT_DRY_RUN_TIMEOUT,
+    SCENE_FRAME_WIDTH, SCENE_FRAME_HEIGHT, CAMERA_FOLLOW, CAMERA_FOLLOW_MARGIN
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The Manim scene every job renders, fed by a per-job scene description.
+# The env var name and data version must match services/flowchart_runtime.py,
+# which runs in the render subprocess and does not import this package.
+SCENE_RUNTIME_PATH = Path(__file__).with_name("flowchart_runtime.py")
+SCENE_RUNTIME_CLASS = "FlowchartScene"
+SCENE_DATA_ENV = "FLOWCHART_SCENE_DATA"
+SCENE_DATA_VERSION = 3
+
 
 @dataclass
 class VideoResult:
     """Result of video generation."""
     success: bool
     video_path: Optional[str] = None
+    storage_key: Optional[str] = None
     audio_path: Optional[str] = None
     error_message: Optional[str] = None
     generation_time: Optional[float] = None
+    duration: Optional[float] = None  # Of the rendered video, in seconds
     has_audio: bool = False
+    audio_tracks: List[str] = field(default_factory=list)  # Language of each narration track
+    subtitles: Dict[str, str] = field(default_factory=dict)  # Language -> storage key of WebVTT
 
 
 class ManimGenerator:
@@ -39,6 +70,27 @@ class ManimGenerator:
         self.temp_dir.mkdir(exist_ok=True)
         self.videos_dir.mkdir(exist_ok=True)
 
+        self.storage = get_storage()
+        self.video_processor = VideoProcessor()
+
+        # Compile the scene runtime once; every render then loads it from __pycache__
+        self.runtime_error: Optional[str] = None
+        try:
+            py_compile.compile(str(SCENE_RUNTIME_PATH), doraise=True)
+        except py_compile.PyCompileError as e:
+            self.runtime_error = str(e)
+            logger.error(f"Scene runtime does not compile, every render will fail: {e}")
+        except OSError as e:
+            logger.warning(f"Could not precompile the scene runtime: {e}")
+
+        # Renders are limited; jobs queue for a slot only after passing pre-flight
+        self.render_slots = MAX_CONCURRENT_RENDERS
+        self._render_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RENDERS)
+        self.renders_active = 0
+        self.renders_waiting = 0
+        self.preflight_checks = 0
+        self.preflight_failures = 0
+
         # Initialize audio generator if available
         try:
             self.audio_generator = AudioGenerator()
@@ -51,76 +103,119 @@ class ManimGenerator:
         flowchart: FlowchartStructure,
         video_id: str,
         include_audio: bool = True,
-        voice_settings: Optional[Dict] = None
+        voice_settings: Optional[Dict] = None,
+        additional_narrations: Optional[List[Dict]] = None,
+        output_path: Optional[Path] = None,
+        quality: Optional[str] = None
     ) -> VideoResult:
-        """Generate an animated video with audio narration from flowchart structure."""
+        """
+        Generate an animated video with audio narration from flowchart structure.
+
+        Each entry of additional_narrations is another set of voice settings
+        (e.g. {'language': 'es'}, optionally with translated 'texts' per
+        element id). All tracks are synthesized concurrently and share one
+        render: the primary track is mixed by Manim from clips leveled to the
+        loudness target, the others are added as loudness-normalized alternate
+        audio streams.
+        WebVTT subtitles are stored for every track.
+
+        With output_path the video is moved there instead of being published
+        to storage (and no subtitles are stored), e.g. for one chapter of a
+        longer video. quality (e.g. "high_quality") overrides the configured
+        render quality.
+        """
+        job_dir = None
         try:
             import time
             start_time = time.time()
 
             logger.info(f"Starting video generation for {video_id}")
 
-            # Convert flowchart to dictionary for audio generation
-            flowchart_dict = self._flowchart_to_dict(flowchart)
+            # Fail structurally broken charts before any narration is synthesized
+            self._preflight(self._build_scene_data(flowchart, plan_timeline(flowchart, {})), video_id, final=False)
 
-            # Generate audio narration if requested and available
-            audio_path = None
-            narration_segments = []
+            # Scene data and render output share the job's scratch directory
+            job_dir = self._create_job_dir(video_id)
 
+            # Synthesize one narration clip per node (plus the title) for every track
+            tracks = [voice_settings or DEFAULT_NARRATION_VOICE_SETTINGS] + list(additional_narrations or [])
+            track_clips: List[Dict[str, NarrationClip]] = [{} for _ in tracks]
             if include_audio and self.audio_generator:
-                try:
-                    # Generate narration script with timing
-                    script, timing_segments = await self.audio_generator.create_timed_narration(
-                        flowchart_dict,
-                        total_video_duration=15.0  # Estimate 15 seconds
-                    )
-
-                    # Generate audio file using gTTS (more reliable than pyttsx3)
-                    audio_path = await self.audio_generator.generate_audio(
-                        script,
-                        engine='gtts',
-                        voice_settings=voice_settings or {'lang': 'en', 'tld': 'com'}
-                    )
-
-                    narration_segments = timing_segments
-                    logger.info(f"Audio generated successfully: {audio_path}")
-
-                except Exception as e:
-                    logger.warning(f"Audio generation failed: {e}")
-                    # Continue without audio
-
-            # Generate Manim Python code with audio synchronization
-            manim_code = self._generate_manim_code_with_audio(
-                flowchart,
-                video_id,
-                narration_segments,
-                audio_path
-            )
-
-            # Write code to temporary file
-            temp_file_path = self.temp_dir / f"{video_id}_scene.py"
-            with open(temp_file_path, "w") as f:
-                f.write(manim_code)
-
-            logger.info(f"Manim code written to: {temp_file_path}")
-
-            # Run Manim to generate video
-            video_path = await self._render_manim_video(temp_file_path, video_id)
-
-            # If we have both video and audio, combine them
-            final_video_path = video_path
-            if audio_path and video_path:
-                final_video_path = await self._combine_video_audio(
-                    video_path,
-                    audio_path,
-                    video_id
+                results = await asyncio.gather(
+                    *[self._generate_narration_clips(flowchart, settings) for settings in tracks],
+                    return_exceptions=True
+                )
+                for i, result in enumerate(results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Audio generation failed for narration track {i}: {result}")
+                        # Continue without this track
+                    else:
+                        track_clips[i] = result
+                logger.info(f"Audio generated successfully: {sum(len(c) for c in track_clips)} narration clips")
+
+            # Place every clip at its element's reveal time, leaving room for the longest track
+            reserved: Dict[str, float] = {}
+            for clips in track_clips[1:]:
+                for element_id, clip in clips.items():
+                    reserved[element_id] = max(reserved.get(element_id, 0.0), clip.duration)
+            timeline = plan_timeline(flowchart, track_clips[0], reserved)
+
+            # Describe the scene for the shared runtime; no code is generated per job
+            scene_data = self._build_scene_data(flowchart, timeline)
+            self._preflight(scene_data, video_id)
+            scene_data_path = job_dir / "scene.json"
+            scene_data_path.write_text(json.dumps(scene_data, separators=(",", ":")), encoding="utf-8")
+
+            logger.info(f"Scene data written to: {scene_data_path} ({timeline.duration:.1f}s planned)")
+            if PREFLIGHT_DRY_RUN:
+                await self._dry_run(scene_data_path, video_id)
+
+            # Run Manim to generate video; it mixes the placed clips into the output itself
+            async with self._render_slot():
+                video_path = await self._render_manim_video(scene_data_path, video_id, quality)
+
+            # Alternate tracks are muxed in, in one audio-only pass without
+            # rendering again; the primary narration is copied as rendered
+            languages = track_languages(tracks)
+            audio_tracks = [languages[0]] if track_clips[0] else []
+            extra_tracks = [
+                self._alternate_track(languages[i], timeline, clips)
+                for i, clips in enumerate(track_clips) if i > 0 and clips
+            ]
+            storage_key = video_key(video_id) if output_path is None else None
+            if output_path is not None:
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            muxed = False
+            if extra_tracks:
+                # Streamed into storage as it is muxed (or written to output_path)
+                result = await self.video_processor.add_audio_tracks(
+                    str(video_path), extra_tracks,
+                    primary_language=audio_tracks[0] if audio_tracks else None,
+                    storage_key=storage_key,
+                    output_path=str(output_path) if output_path is not None else None
+                )
+                if result.success:
+                    muxed = True
+                    audio_tracks += [track['language'] for track in extra_tracks]
+                else:
+                    logger.warning(f"Alternate narration tracks dropped: {result.error_message}")
+
+            if output_path is not None:
+                # Kept on local disk for the caller to post-process
+                subtitles = {}
+                if not muxed:
+                    shutil.move(str(video_path), str(output_path))
+                final_video_path = output_path
+            else:
+                subtitles = await self._store_subtitles(
+                    video_id, flowchart, timeline, tracks, track_clips, languages
                 )
 
-            # Clean up temporary files
-            try:
-                temp_file_path.unlink(missing_ok=True)
-            except Exception as e:
-                logger.warning(f"Could not clean up temp file: {e}")
+                # Publish the final video to storage, unless the mux already streamed it there
+                if not muxed:
+                    loop = asyncio.get_event_loop()
+                    await loop.run_in_executor(None, self.storage.put_file, storage_key, video_path)
+                final_video_path = self.storage.local_path(storage_key) or storage_key
 
             generation_time = time.time() - start_time
             logger.info(f"Video generation completed in {generation_time:.2f}s")
@@ -128,9 +223,12 @@ class ManimGenerator:
             return VideoResult(
                 success=True,
                 video_path=str(final_video_path),
-                audio_path=str(audio_path) if audio_path else None,
+                storage_key=storage_key,
                 generation_time=generation_time,
-                has_audio=bool(audio_path)
+                duration=timeline.duration,
+                has_audio=bool(audio_tracks),
+                audio_tracks=audio_tracks,
+                subtitles=subtitles
             )
 
         except Exception as e:
@@ -140,192 +238,270 @@ class ManimGenerator:
                 error_message=str(e)
             )
 
-    async def generate_video(self, flowchart: FlowchartStructure, video_id: str) -> VideoResult:
-        """Generate video without audio (backwards compatibility)."""
-        return await self.generate_video_with_audio(flowchart, video_id, include_audio=False)
+        finally:
+            if job_dir is not None:
+                self._discard_job_dir(job_dir)
+
+    def _create_job_dir(self, video_id: str) -> Path:
+        """
+        Create an isolated Manim media directory for one job.
+
+        Lives next to VIDEOS_DIR on the same filesystem, so the finished video is
+        moved into place with a rename. Text SVGs and LaTeX output don't depend on
+        the job and go to a shared cache instead.
+        """
+        job_dir = MANIM_SCRATCH_DIR / video_id
+        if job_dir.exists():
+            self._discard_job_dir(job_dir)
+        job_dir.mkdir(parents=True)
+
+        config_lines = [
+            "[CLI]",
+            f"media_dir = {job_dir}",
+            f"video_dir = {job_dir / 'out'}",
+            f"partial_movie_dir = {job_dir / 'partial'}",
+            f"images_dir = {job_dir / 'images'}",
+            f"log_dir = {job_dir / 'logs'}",
+            f"text_dir = {MANIM_SHARED_CACHE_DIR / 'texts'}",
+            f"tex_dir = {MANIM_SHARED_CACHE_DIR / 'Tex'}",
+        ]
+        (job_dir / "manim.cfg").write_text("\n".join(config_lines) + "\n")
+        return job_dir
+
+    def _discard_job_dir(self, job_dir: Path):
+        """Delete a job's scratch directory, first renaming it out of the way atomically."""
+        trash_dir = job_dir.with_name(f".trash_{job_dir.name}_{os.getpid()}")
+        try:
+            os.replace(job_dir, trash_dir)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"Could not move scratch dir {job_dir} aside: {e}")
+            trash_dir = job_dir
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+    def _narration_texts(self, flowchart: FlowchartStructure, voice_settings: Dict) -> Dict[str, str]:
+        """Spoken text per element: the title and FlowchartNode.narration, unless overridden by 'texts'."""
+        texts = {TITLE_CUE: f"Welcome to this {flowchart.title or 'flowchart'} explanation."}
+        for node in flowchart.nodes:
+            text = node.narration or node.text
+            if text.strip():
+                texts[node.id] = text
+        texts.update(voice_settings.get('texts') or {})
+        return texts
+
+    async def _generate_narration_clips(
+        self,
+        flowchart: FlowchartStructure,
+        voice_settings: Dict
+    ) -> Dict[str, NarrationClip]:
+        """Get compressed clips for the title and per-node narration of one track."""
+        texts = self._narration_texts(flowchart, voice_settings)
+        segments = [{'id': element_id, 'text': text} for element_id, text in texts.items()]
+        engine_settings = {key: value for key, value in voice_settings.items() if key != 'texts'}
+
+        # gTTS is more reliable than pyttsx3; the router falls back if it is unhealthy
+        clips = await self.audio_generator.generate_clips(
+            segments,
+            engine='gtts',
+            voice_settings=engine_settings
+        )
+        return {
+            clip_id: NarrationClip(path=str(clip['path']), duration=clip['duration'], loudness=clip.get('loudness'))
+            for clip_id, clip in clips.items()
+        }
 
-    def _flowchart_to_dict(self, flowchart: FlowchartStructure) -> Dict:
-        """Convert flowchart structure to dictionary for audio generation."""
+    @staticmethod
+    def _alternate_track(language: str, timeline: Timeline, clips: Dict[str, NarrationClip]) -> Dict:
+        """
+        An alternate narration track for add_audio_tracks: its clips at their
+        cue start times, and loudness stats combined from the clips' cached
+        stats (None unless every clip was measured).
+        """
+        placed = [
+            (cue.start_time, clips[cue.element_id])
+            for cue in [timeline.title] + timeline.nodes
+            if cue.element_id in clips
+        ]
+        measured = [clip for _, clip in placed if clip.loudness is not None]
+        loudness = None
+        if len(measured) == len(placed):
+            loudness = combine_loudness([clip.loudness for clip in measured], [clip.duration for clip in measured])
         return {
-            'title': flowchart.title,
-            'nodes': [
-                {
-                    'id': node.id,
-                    'text': node.text,
-                    'type': node.type.value,
-                    'position': list(node.position)
-                }
-                for node in flowchart.nodes
-            ],
-            'connections': [
-                {
-                    'from': edge.from_node,
-                    'to': edge.to_node,
-                    'type': 'line',  # Default edge type
-                    'condition': edge.label
-                }
-                for edge in flowchart.connections
-            ]
+            'language': language,
+            'clips': [(start_time, clip.path) for start_time, clip in placed],
+            'loudness': loudness
         }
 
-    def _generate_manim_code_with_audio(
+    async def _store_subtitles(
         self,
-        flowchart: FlowchartStructure,
         video_id: str,
-        narration_segments: List[Dict],
-        audio_path: Optional[Path]
-    ) -> str:
-        """Generate Manim code with audio synchronization."""
-
-        # Clean video_id for class name (replace hyphens with underscores, remove invalid chars)
-        clean_video_id = "".join(c if c.isalnum() else "_" for c in video_id)
-        
-        # Start with basic structure
-        code = f'''"""
-Generated Manim scene: {video_id}
-Flowchart: {flowchart.title or "Untitled"}
-Generated with audio synchronization
-"""
-
-from manim import *
-import numpy as np
+        flowchart: FlowchartStructure,
+        timeline: Timeline,
+        tracks: List[Dict],
+        track_clips: List[Dict[str, NarrationClip]],
+        languages: List[str]
+    ) -> Dict[str, str]:
+        """Write a WebVTT file per narration track to storage. Returns language -> key."""
+        subtitles = {}
+        loop = asyncio.get_event_loop()
+        for settings, clips, language in zip(tracks, track_clips, languages):
+            if not clips:
+                continue
+            document = build_webvtt(
+                timeline,
+                self._narration_texts(flowchart, settings),
+                {element_id: clip.duration for element_id, clip in clips.items()},
+                language
+            )
+            key = subtitles_key(video_id, language)
+            try:
+                await loop.run_in_executor(
+                    None, self.storage.put_stream, key, io.BytesIO(document.encode("utf-8"))
+                )
+                subtitles[language] = key
+            except Exception as e:
+                logger.warning(f"Failed to store {language} subtitles for {video_id}: {e}")
+        return subtitles
 
-class FlowchartScene_{clean_video_id}(Scene):
-    def construct(self):
-        # Scene configuration
-        self.camera.background_color = WHITE
+    async def generate_video(self, flowchart: FlowchartStructure, video_id: str) -> VideoResult:
+        """Generate video without audio (backwards compatibility)."""
+        return await self.generate_video_with_audio(flowchart, video_id, include_audio=False)
 
-        # Title
-        title = Text("{self._escape_string(flowchart.title or 'Flowchart')}", font_size=36, color=BLACK)
-        title.to_edge(UP, buff=0.5)
+    def _build_scene_data(self, flowchart: FlowchartStructure, timeline: Timeline) -> Dict:
+        """
+        Describe the scene for the shared flowchart runtime.
 
-        # Show title
-        self.play(Write(title))
-        self.wait(1)
-        self.play(FadeOut(title))
+        Only literal values go in: texts, coordinates, timings and clip paths.
+        Edges and cues refer to nodes by index, and edges whose endpoints are
+        missing are dropped. Edges carry the routes the parsers computed;
+        charts built elsewhere are routed here. Charts that don't fit the
+        frame are shown with camera-follow (see CAMERA_FOLLOW). Runs in O(N + E).
+        """
+        index = {node.id: i for i, node in enumerate(flowchart.nodes)}
+        if any(not edge.route for edge in flowchart.connections):
+            route_edges(flowchart, keep_existing=True)
 
-        # Create all flowchart elements
-        nodes = {{}}
-        edges = []
+        def cue_timing(cue: Cue) -> List:
+            return [cue.run_time, round(cue.hold, 3), cue.clip.path if cue.clip is not None else None]
 
-'''
+        return {
+            "version": SCENE_DATA_VERSION,
+            "title": flowchart.title or "Flowchart",
+            "title_cue": cue_timing(timeline.title),
+            "nodes": [
+                [node.type.value, node.text, node.position[0], node.position[1]]
+                for node in flowchart.nodes
+            ],
+            "edges": [
+                [
+                    index[edge.from_node], index[edge.to_node], edge.label,
+                    [list(point) for point in edge.route],
+                    list(edge.label_position) if edge.label_position is not None else None
+                ]
+                for edge in flowchart.connections
+                if edge.from_node in index and edge.to_node in index
+            ],
+            "cues": [[index[cue.element_id]] + cue_timing(cue) for cue in timeline.nodes],
+            "camera": {
+                "follow": CAMERA_FOLLOW == "always" or (CAMERA_FOLLOW == "auto" and not self._fits_frame(flowchart)),
+                "margin": CAMERA_FOLLOW_MARGIN
+            },
+            "timing": {
+                "title_fade": TITLE_FADE_SECONDS,
+                "edge_reveal": EDGE_REVEAL_SECONDS,
+                "edge_hold": EDGE_HOLD_SECONDS,
+                "final_hold": FINAL_HOLD_SECONDS,
+                "fade_out": FADE_OUT_SECONDS
+            }
+        }
 
-        # Add node definitions
+    def _fits_frame(self, flowchart: FlowchartStructure) -> bool:
+        """Whether every node and edge lies inside the default frame, centred on the origin."""
+        half_width, half_height = SCENE_FRAME_WIDTH / 2, SCENE_FRAME_HEIGHT / 2
         for node in flowchart.nodes:
-            code += self._generate_node_code(node)
-
-        # Add edge definitions
-        for edge in flowchart.connections:
-            code += self._generate_edge_code(edge, flowchart.nodes)
-
-        # Add animation sequence
-        code += self._generate_animation_sequence(flowchart, narration_segments)
+            x0, y0, x1, y1 = node_box(node)
+            if x0 < -half_width or x1 > half_width or y0 < -half_height or y1 > half_height:
+                return False
+        return all(
+            abs(x) <= half_width and abs(y) <= half_height
+            for edge in flowchart.connections for x, y in edge.route
+        )
 
-        return code
+    def _preflight(self, scene_data: Dict, video_id: str, final: bool = True):
+        """
+        Raise PreflightError if the scene data cannot render. Takes milliseconds.
+
+        The early check (final=False) runs before narration exists, so clip
+        files are only checked, and warnings only logged, on the final one.
+        """
+        self.preflight_checks += 1
+        report = check_scene_data(scene_data, check_clips=final)
+        if self.runtime_error:
+            report.errors.append(f"Scene runtime does not compile: {self.runtime_error}")
+        if not report.ok:
+            self.preflight_failures += 1
+            raise PreflightError(f"Pre-flight checks failed: {'; '.join(report.errors)}")
+        if final:
+            for warning in report.warnings:
+                logger.warning(f"Pre-flight warning for {video_id}: {warning}")
+            logger.info(f"Pre-flight checks passed for {video_id} in {report.elapsed * 1000:.1f}ms")
+
+    async def _dry_run(self, scene_data_path: Path, video_id: str):
+        """Construct the scene in Manim without rendering frames, outside any render slot."""
+        job_dir = scene_data_path.parent
+        process = await asyncio.create_subprocess_exec(
+            "python", "-m", "manim", "render", str(SCENE_RUNTIME_PATH), SCENE_RUNTIME_CLASS,
+            "--config_file", str(job_dir / "manim.cfg"),
+            "--dry_run",
+            "--verbosity", "ERROR",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=str(job_dir),
+            env={**os.environ, SCENE_DATA_ENV: str(scene_data_path)}
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=PREFLIGHT_DRY_RUN_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            self.preflight_failures += 1
+            raise PreflightError(f"Manim dry run timed out after {PREFLIGHT_DRY_RUN_TIMEOUT}s")
+        if process.returncode != 0:
+            self.preflight_failures += 1
+            detail = stderr.decode(errors="replace").strip().splitlines()[-1:] or ["no output"]
+            raise PreflightError(f"Manim dry run failed (code {process.returncode}): {detail[0]}")
+        logger.info(f"Manim dry run passed for {video_id}")
+
+    @asynccontextmanager
+    async def _render_slot(self):
+        """Hold one of the limited render slots."""
+        self.renders_waiting += 1
+        try:
+            await self._render_semaphore.acquire()
+        finally:
+            self.renders_waiting -= 1
+        self.renders_active += 1
+        try:
+            yield
+        finally:
+            self.renders_active -= 1
+            self._render_semaphore.release()
 
-    def _escape_string(self, text: str) -> str:
-        """Escape special characters in strings for Manim code."""
-        return text.replace('"', '\\"').replace("'", "\\'").replace("\n", "\\n")
+    def get_render_stats(self) -> Dict[str, int]:
+        return {
+            "slots": self.render_slots,
+            "active": self.renders_active,
+            "waiting": self.renders_waiting,
+            "preflight_checks": self.preflight_checks,
+            "preflight_failures": self.preflight_failures
+        }
 
-    def _generate_node_code(self, node) -> str:
-        """Generate Manim code for a single node."""
-        x, y = node.position
-        safe_id = self._make_safe_identifier(node.id)
-        
-        # Determine shape and color based on node type
-        if node.type.value in ["start", "end"]:
-            shape_code = f"Circle(radius=0.8, color={'GREEN' if node.type.value == 'start' else 'RED'}, fill_opacity=0.3)"
-        elif node.type.value == "decision":
-            shape_code = "Polygon([-0.8, 0.5, 0], [0.8, 0.5, 0], [1.0, 0, 0], [0.8, -0.5, 0], [-0.8, -0.5, 0], [-1.0, 0, 0], color=YELLOW, fill_opacity=0.3)"
-        else:
-            shape_code = "Rectangle(width=2.0, height=1.0, color=BLUE, fill_opacity=0.3)"
-
-        code = f'''
-        # Node: {node.id}
-        {safe_id}_text = Text("{self._escape_string(node.text)}", font_size=20, color=BLACK)
-        {safe_id}_text.move_to([{x}, {y}, 0])
-        
-        {safe_id}_shape = {shape_code}
-        {safe_id}_shape.move_to([{x}, {y}, 0])
-        
-        nodes["{node.id}"] = VGroup({safe_id}_shape, {safe_id}_text)
-
-'''
-        return code
-
-    def _generate_edge_code(self, edge, nodes) -> str:
-        """Generate Manim code for an edge."""
-        from_node = next((n for n in nodes if n.id == edge.from_node), None)
-        to_node = next((n for n in nodes if n.id == edge.to_node), None)
-
-        if not from_node or not to_node:
-            return ""
-
-        safe_from = self._make_safe_identifier(edge.from_node)
-        safe_to = self._make_safe_identifier(edge.to_node)
-        edge_key = f"{edge.from_node}_{edge.to_node}"
-
-        code = f'''
-        # Edge: {edge.from_node} -> {edge.to_node}
-        edge_{safe_from}_{safe_to} = Arrow(
-            start=[{from_node.position[0]}, {from_node.position[1] - 0.5}, 0],
-            end=[{to_node.position[0]}, {to_node.position[1] + 0.5}, 0],
-            color=BLACK,
-            buff=0.1
-        )
-        edges.append(edge_{safe_from}_{safe_to})
-
-'''
-        if edge.label:
-            code += f'''
-        edge_label_{safe_from}_{safe_to} = Text("{self._escape_string(edge.label)}", font_size=16, color=BLACK)
-        edge_label_{safe_from}_{safe_to}.next_to(edge_{safe_from}_{safe_to}, RIGHT, buff=0.1)
-        edges.append(edge_label_{safe_from}_{safe_to})
-
-'''
-        return code
-
-    def _make_safe_identifier(self, text: str) -> str:
-        """Convert text to a safe Python identifier."""
-        # Replace non-alphanumeric characters with underscores
-        safe = "".join(c if c.isalnum() else "_" for c in text)
-        # Ensure it doesn't start with a number
-        if safe and safe[0].isdigit():
-            safe = "n_" + safe
-        return safe or "unnamed"
-
-    def _generate_animation_sequence(self, flowchart, narration_segments) -> str:
-        """Generate the animation sequence."""
-        code = '''
-        # Animation sequence
-        all_nodes = list(nodes.values())
-        
-        # Show nodes one by one
-        for i, node in enumerate(all_nodes):
-            self.play(FadeIn(node), run_time=0.8)
-            self.wait(0.3)
-        
-        # Show edges
-        for edge in edges:
-            self.play(Create(edge), run_time=0.5)
-            self.wait(0.2)
-
-        # Hold final state
-        self.wait(2)
-
-        # Fade out everything
-        all_objects = all_nodes + edges
-        if all_objects:
-            self.play(FadeOut(*all_objects), run_time=1)
-'''
-        return code
-
-    async def _render_manim_video(self, script_path: Path, video_id: str) -> Path:
-        """Render the Manim script to video."""
+    async def _render_manim_video(self, scene_data_path: Path, video_id: str, quality: Optional[str] = None) -> Path:
+        """Render the shared runtime scene with a job's scene data inside its scratch directory."""
         try:
-            output_dir = self.videos_dir
+            job_dir = scene_data_path.parent
             clean_video_id = "".join(c if c.isalnum() else "_" for c in video_id)
-            scene_name = f"FlowchartScene_{clean_video_id}"
             
             # Map quality settings to Manim's expected values
             quality_map = {
@@ -335,14 +511,15 @@ class FlowchartScene_{clean_video_id}(Scene):
                 "fourk_quality": "k"
             }
             
-            manim_quality = quality_map.get(MANIM_CONFIG.get("quality", "medium_quality"), "m")
+            manim_quality = quality_map.get(quality or MANIM_CONFIG.get("quality", "medium_quality"), "m")
             
             # Manim command (updated for v0.19.0)
             cmd = [
                 "python", "-m", "manim", "render",
-                str(script_path),
-                scene_name,
-                "--media_dir", str(output_dir),
+                str(SCENE_RUNTIME_PATH),
+                SCENE_RUNTIME_CLASS,
+                "--config_file", str(job_dir / "manim.cfg"),
+                "-o", clean_video_id,
                 "-q", manim_quality,
                 "--verbosity", MANIM_CONFIG.get("verbosity", "WARNING")
             ]
@@ -357,7 +534,8 @@ class FlowchartScene_{clean_video_id}(Scene):
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                cwd=str(script_path.parent)
+                cwd=str(job_dir),
+                env={**os.environ, SCENE_DATA_ENV: str(scene_data_path)}
             )
 
             stdout, stderr = await process.communicate()
@@ -369,79 +547,14 @@ class FlowchartScene_{clean_video_id}(Scene):
             if process.returncode != 0:
                 raise Exception(f"Manim rendering failed (code {process.returncode}): {stderr.decode()}")
 
-            # Find the generated video file
-            video_file = self._find_generated_video(output_dir, scene_name)
-            if not video_file:
-                raise Exception(f"Generated video file not found. Searched in {output_dir} for {scene_name}")
-
-            # Move to final location with predictable name
-            final_path = self.videos_dir / f"{video_id}.mp4"
-            if final_path.exists():
-                final_path.unlink()  # Remove existing file
-            video_file.rename(final_path)
+            # video_dir and the output name are fixed by the job config, so the path is known
+            video_file = job_dir / "out" / f"{clean_video_id}.mp4"
+            if not video_file.exists():
+                raise Exception(f"Generated video file not found: {video_file}")
 
-            logger.info(f"Video successfully generated: {final_path}")
-            return final_path
+            logger.info(f"Video successfully rendered: {video_file}")
+            return video_file
 
         except Exception as e:
             logger.error(f"Error in _render_manim_video: {e}")
             raise
-
-    def _find_generated_video(self, output_dir: Path, scene_name: str) -> Optional[Path]:
-        """Find the generated video file in Manim's output structure."""
-        # Manim typically outputs to videos/[script_name]/[quality]/[scene_name].mp4
-        logger.info(f"Searching for video file with scene name: {scene_name}")
-        logger.info(f"Search directory: {output_dir}")
-        
-        for root, dirs, files in os.walk(output_dir):
-            logger.info(f"Checking directory: {root}, files: {files}")
-            for file in files:
-                if file.endswith('.mp4') and (scene_name in file or scene_name.lower() in file.lower()):
-                    found_path = Path(root) / file
-                    logger.info(f"Found video file: {found_path}")
-                    return found_path
-        
-        logger.error(f"No video file found for scene: {scene_name}")
-        return None
-
-    async def _combine_video_audio(
-        self,
-        video_path: Path,
-        audio_path: Path,
-        video_id: str
-    ) -> Path:
-        """Combine video and audio using ffmpeg."""
-        try:
-            output_path = self.videos_dir / f"{video_id}_with_audio.mp4"
-
-            # Use ffmpeg to combine video and audio
-            cmd = [
-                "ffmpeg", "-y",  # Overwrite output file
-                "-i", str(video_path),  # Video input
-                "-i", str(audio_path),  # Audio input
-                "-c:v", "copy",  # Copy video codec
-                "-c:a", "aac",  # Audio codec
-                "-shortest",  # End when shortest stream ends
-                str(output_path)
-            ]
-
-            logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            stdout, stderr = await process.communicate()
-
-            if process.returncode == 0:
-                logger.info(f"Audio and video combined successfully: {output_path}")
-                return output_path
-            else:
-                logger.error(f"FFmpeg error: {stderr.decode()}")
-                return video_path  # Return original video if combination fails
-
-        except Exception as e:
-            logger.error(f"Error combining video and audio: {e}")
-            return video_path  # Return original video if combination fails
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+NLP Prompt Parser for Flowchart Video Generator.
+Dependency-parses prompt steps with spaCy to recover decisions and their branches.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+
+from services.prompt_parser import (
+    PromptParser, FlowchartStructure, FlowchartNode, FlowchartConnection, NodeType, PARSER_VERSION
+)
+from services.layout import layered_layout, LAYOUT_VERSION
+from services.edge_router import route_edges
+from config import NLP_MODEL, NLP_BATCH_SIZE, NLP_BATCH_WINDOW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_CONDITION_MARKERS = {"if", "whether"}
+_ELSE_MARKERS = {"else", "otherwise"}
+_CLAUSE_JOINERS = {"then", ",", "and", ":"}
+# Pipeline components the branch extraction does not use
+_UNUSED_PIPES = ("ner", "lemmatizer", "textcat")
+
+
+@dataclass
+class _Branch:
+    """A step that splits the flow: a question and its outcomes."""
+    question: str
+    outcomes: List[Tuple[str, str]] = field(default_factory=list)  # (edge label, step text)
+    prefix: str = ""  # Work done before the question, e.g. "validate data"
+
+
+def _span_text(doc, start: int, end: int) -> str:
+    """Text of doc[start:end] without joining words or punctuation at either edge."""
+    while start < end and doc[start].lower_ in _CLAUSE_JOINERS:
+        start += 1
+    while end > start and (doc[end - 1].is_punct or doc[end - 1].lower_ in _CLAUSE_JOINERS):
+        end -= 1
+    return doc[start:end].text if end > start else ""
+
+
+def _conditional(doc) -> Optional[_Branch]:
+    """'[prefix] if <condition> [then] <yes> [else|otherwise <no>]'."""
+    marker = next((token for token in doc if token.lower_ in _CONDITION_MARKERS), None)
+    if marker is None:
+        return None
+    else_index = next((t.i for t in doc[marker.i + 1:] if t.lower_ in _ELSE_MARKERS), len(doc))
+
+    then_index = next((t.i for t in doc[marker.i + 1:else_index] if t.lower_ in ("then", ",")), None)
+    if then_index is None:
+        head = marker.head
+        if head.dep_ != "ROOT" and head.i > marker.i:
+            # The parser attached the marker to the conditional clause: it ends with that clause's subtree
+            then_index = max(t.i for t in head.subtree if t.i < else_index) + 1
+        else:
+            # Fragmentary input ("if valid process ..."): the condition runs up to the next verb
+            then_index = next(
+                (t.i for t in doc[marker.i + 2:else_index] if t.pos_ in ("VERB", "AUX")),
+                else_index
+            )
+
+    question = _span_text(doc, marker.i + 1, then_index)
+    yes = _span_text(doc, then_index, else_index)
+    if not question or not yes:
+        return None
+
+    branch = _Branch(question=f"{question}?", prefix=_span_text(doc, 0, marker.i))
+    branch.outcomes.append(("Yes", yes))
+    no = _span_text(doc, else_index + 1, len(doc))
+    if no:
+        branch.outcomes.append(("No", no))
+    return branch
+
+
+def _alternatives(doc) -> Optional[_Branch]:
+    """'<outcome> or <outcome>' (or 'success/failure') as the whole step."""
+    roots = [token for token in doc if token.dep_ == "ROOT"]
+    if len(roots) != 1 or roots[0].pos_ in ("VERB", "AUX"):
+        return None  # "enter username or email" is one action, not a choice
+    root = roots[0]
+
+    cuts = [t.i for t in doc if t.text == "/" or (t.lower_ == "or" and t.head == root and root.conjuncts)]
+    if cuts:
+        bounds = [-1] + cuts + [len(doc)]
+        options = [_span_text(doc, a + 1, b) for a, b in zip(bounds, bounds[1:])]
+    elif len(doc) == 1 and "/" in root.text:
+        options = root.text.split("/")
+    else:
+        return None
+    options = [option for option in options if option]
+    if len(options) < 2:
+        return None
+    return _Branch(question=f"{doc.text.strip()}?", outcomes=[("", option) for option in options])
+
+
+class NLPPromptParser(PromptParser):
+    """
+    spaCy-backed prompt parser that keeps decisions and branches.
+
+    Steps are split by the regex tokenizer, then dependency-parsed: an "if ...
+    else ..." step becomes a decision with Yes/No branches and an "x or y"
+    step a decision with one branch per outcome; branches rejoin at the next
+    step and the graph is placed with the layered layout. The model is loaded
+    once per worker; concurrent parse_prompt_async calls that arrive within
+    NLP_BATCH_WINDOW_SECONDS share one nlp.pipe call on a dedicated thread.
+    Without spaCy or the model, and for any prompt the NLP path fails on,
+    it falls back to the regex heuristics.
+    """
+
+    def __init__(
+        self,
+        model: str = NLP_MODEL,
+        batch_size: int = NLP_BATCH_SIZE,
+        batch_window: float = NLP_BATCH_WINDOW_SECONDS
+    ):
+        super().__init__()
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        self.nlp = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+        # spaCy pipelines are not safe to share between threads: one thread owns the model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlp")
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._drain_task: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.prompts = 0
+        self.fallbacks = 0
+
+    @property
+    def version(self) -> str:
+        """Output version: the model and layout, or the regex parser's once the model failed to load."""
+        if self._load_failed:
+            return PARSER_VERSION
+        return f"{PARSER_VERSION}+{self.model}+layout{LAYOUT_VERSION}"
+
+    def warm_up(self) -> bool:
+        """Load the model now rather than on the first prompt. Blocking; returns availability."""
+        return self._load() is not None
+
+    def _load(self):
+        with self._load_lock:
+            if self.nlp is None and not self._load_failed:
+                if not SPACY_AVAILABLE:
+                    logger.warning("spaCy is not installed; using the regex prompt parser")
+                    self._load_failed = True
+                    return None
+                try:
+                    nlp = spacy.load(self.model)
+                    unused = [name for name in _UNUSED_PIPES if name in nlp.pipe_names]
+                    if unused:
+                        nlp.select_pipes(disable=unused)
+                    self.nlp = nlp
+                    logger.info(f"Loaded NLP model {self.model} ({', '.join(nlp.pipe_names)})")
+                except Exception as e:
+                    logger.warning(f"Could not load NLP model {self.model}, using the regex prompt parser: {e}")
+                    self._load_failed = True
+            return self.nlp
+
+    def parse_prompt(self, prompt: str) -> FlowchartStructure:
+        return self.parse_many([prompt])[0]
+
+    def _regex_parse(self, prompt: str) -> FlowchartStructure:
+        return PromptParser.parse_prompt(self, prompt)
+
+    def parse_many(self, prompts: List[str]) -> List[FlowchartStructure]:
+        """Parse a batch of prompts with a single nlp.pipe pass over all their steps. Blocking."""
+        nlp = self._load()
+        if nlp is None:
+            return [self._regex_parse(prompt) for prompt in prompts]
+
+        cleaned = [self._clean_prompt(prompt) for prompt in prompts]
+        steps = [self._extract_steps(text) for text in cleaned]
+        try:
+            docs = list(nlp.pipe((step for prompt_steps in steps for step in prompt_steps), batch_size=self.batch_size))
+        except Exception as e:
+            logger.error(f"NLP parsing failed for a batch of {len(prompts)} prompts: {e}")
+            self.fallbacks += len(prompts)
+            return [self._regex_parse(prompt) for prompt in prompts]
+
+        self.batches += 1
+        self.prompts += len(prompts)
+        results = []
+        position = 0
+        for prompt, text, prompt_steps in zip(prompts, cleaned, steps):
+            prompt_docs = docs[position:position + len(prompt_steps)]
+            position += len(prompt_steps)
+            try:
+                results.append(self._build_branched_structure(prompt_steps, prompt_docs, text))
+            except Exception as e:
+                logger.warning(f"NLP structure extraction failed, using regex parser: {e}")
+                self.fallbacks += 1
+                results.append(self._regex_parse(prompt))
+        return results
+
+    async def parse_prompt_async(self, prompt: str) -> FlowchartStructure:
+        """Parse in the model's thread, batched with other prompts submitted meanwhile."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, future))
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.ensure_future(self._drain())
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_event_loop()
+        await asyncio.sleep(self.batch_window)
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:len(batch)]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.parse_many, [prompt for prompt, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _build_branched_structure(self, steps: List[str], docs: List[Any], text: str) -> FlowchartStructure:
+        """Turn parsed steps into a graph; branch steps fan out and rejoin at the next step."""
+        nodes: List[FlowchartNode] = []
+        connections: List[FlowchartConnection] = []
+        exits: List[Tuple[str, str]] = []  # (node id, edge label) waiting for the next node
+
+        def add(step_text: str, node_type: NodeType) -> str:
+            node_id = f"node_{len(nodes)}"
+            nodes.append(FlowchartNode(
+                id=node_id,
+                type=node_type,
+                text=step_text.capitalize(),
+                color=self._get_node_color(node_type)
+            ))
+            return node_id
+
+        def follow(node_id: str):
+            for source, label in exits:
+                connections.append(FlowchartConnection(source, node_id, label))
+
+        for index, (step, doc) in enumerate(zip(steps, docs)):
+            inner = 0 < index < len(steps) - 1
+            branch = (_conditional(doc) or _alternatives(doc)) if inner else None
+            if branch is None:
+                node_id = add(step, self._determine_node_type(step, index, len(steps)))
+                follow(node_id)
+                exits = [(node_id, "")]
+                continue
+
+            if branch.prefix:
+                prefix_id = add(branch.prefix, self._inner_type(branch.prefix))
+                follow(prefix_id)
+                exits = [(prefix_id, "")]
+            decision_id = add(branch.question, NodeType.DECISION)
+            follow(decision_id)
+            exits = []
+            for label, outcome in branch.outcomes:
+                outcome_id = add(outcome, self._inner_type(outcome))
+                connections.append(FlowchartConnection(decision_id, outcome_id, label, condition=label))
+                exits.append((outcome_id, ""))
+            if len(branch.outcomes) == 1:
+                # No else branch: the "No" path skips straight to the next step
+                exits.append((decision_id, "No"))
+
+        self._generate_narration(nodes, text)
+        flowchart = FlowchartStructure(
+            nodes=nodes,
+            connections=connections,
+            title=self._extract_title(text),
+            description=text[:100] + "..." if len(text) > 100 else text,
+            estimated_duration=self._estimate_duration(nodes)
+        )
+        return route_edges(layered_layout(flowchart))
+
+    def _inner_type(self, step: str) -> NodeType:
+        """Type of a node inside a branch; only the branch's own question is a decision."""
+        node_type = self._determine_node_type(step, 1, 3)
+        return NodeType.PROCESS if node_type is NodeType.DECISION else node_type
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "loaded": self.nlp is not None,
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "average_batch_size": self.prompts / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,180 @@
+"""
+Outline Ingestion for Flowchart Video Generator.
+Incrementally parses streamed Markdown or NDJSON outlines into one flowchart page per section.
+"""
+import re
+import json
+import codecs
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config import OUTLINE_FORMATS, OUTLINE_MAX_STEPS_PER_PAGE, OUTLINE_MAX_LINE_LENGTH
+
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)(?:[-*+]|\d{1,9}[.)])\s+(?:\[[ xX]\]\s+)?(.*)$")
+_FENCE = re.compile(r"^\s{0,3}(```|~~~)")
+_INLINE_MARKUP = re.compile(r"(\*\*|__|`|\[([^\]]*)\]\([^)]*\))")
+
+DEFAULT_SECTION_TITLE = "Overview"
+
+
+class OutlineError(ValueError):
+    """An outline document that cannot be parsed."""
+
+
+@dataclass
+class OutlinePage:
+    """One flowchart's worth of an outline: a section, or part of a long one."""
+    index: int
+    title: str
+    steps: List[str] = field(default_factory=list)
+
+
+def _plain(text: str) -> str:
+    """Strip inline Markdown (emphasis, code, links) from a line."""
+    return _INLINE_MARKUP.sub(lambda m: m.group(2) or "", text).strip()
+
+
+class OutlineReader:
+    """
+    Streaming outline parser.
+
+    Feed it the raw bytes of an upload chunk by chunk; it returns every page
+    completed so far and keeps only the current section and one partial line
+    in memory. Markdown headings start a new section and list items (or
+    paragraph lines) are its steps. In NDJSON, each line is either
+    {"section": "..."}, {"step": "..."} or a whole {"title": "...", "steps": [...]}.
+    Sections longer than max_steps continue on a follow-up page.
+    """
+
+    def __init__(
+        self,
+        fmt: str = "markdown",
+        max_steps: int = OUTLINE_MAX_STEPS_PER_PAGE,
+        max_line_length: int = OUTLINE_MAX_LINE_LENGTH
+    ):
+        if fmt not in OUTLINE_FORMATS:
+            raise OutlineError(f"Unsupported outline format: {fmt}")
+        self.fmt = fmt
+        self.max_steps = max_steps
+        self.max_line_length = max_line_length
+
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+        self._line_number = 0
+        self._in_fence = False
+        self._section: Optional[str] = None
+        self._continuation = 0
+        self._steps: List[str] = []
+        self._pages: List[OutlinePage] = []
+        self.page_count = 0
+
+    def feed(self, data: bytes) -> List[OutlinePage]:
+        """Consume a chunk of the document. Returns the pages it completed."""
+        text = self._partial + self._decoder.decode(data)
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_line_length:
+            # Keep memory bounded on pathological input: the rest of the line is dropped
+            self._partial = self._partial[:self.max_line_length]
+        for line in lines:
+            self._line(line[:self.max_line_length])
+        return self._take_pages()
+
+    def close(self) -> List[OutlinePage]:
+        """Finish the document. Returns the remaining pages."""
+        tail = self._partial + self._decoder.decode(b"", final=True)
+        self._partial = ""
+        if tail:
+            self._line(tail[:self.max_line_length])
+        self._end_section()
+        return self._take_pages()
+
+    def _take_pages(self) -> List[OutlinePage]:
+        pages, self._pages = self._pages, []
+        return pages
+
+    def _line(self, line: str):
+        self._line_number += 1
+        line = line.rstrip("\r")
+        if self.fmt == "ndjson":
+            self._ndjson_line(line)
+        else:
+            self._markdown_line(line)
+
+    def _markdown_line(self, line: str):
+        if _FENCE.match(line):
+            self._in_fence = not self._in_fence
+            return
+        if self._in_fence or not line.strip():
+            return
+
+        heading = _HEADING.match(line)
+        if heading:
+            self._start_section(_plain(heading.group(2)))
+            return
+
+        item = _LIST_ITEM.match(line)
+        if item:
+            if item.group(1) and self._steps and len(item.group(1).expandtabs(4)) >= 4:
+                # Nested items refine their parent step
+                self._steps[-1] = f"{self._steps[-1]}: {_plain(item.group(2))}"
+            else:
+                self._add_step(_plain(item.group(2)))
+            return
+
+        if line[:1].isspace() and self._steps:
+            # Wrapped continuation of the previous item
+            self._steps[-1] = f"{self._steps[-1]} {_plain(line)}"
+        elif not line.lstrip().startswith((">", "|", "<!--")):
+            self._add_step(_plain(line))
+
+    def _ndjson_line(self, line: str):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise OutlineError(f"Invalid JSON on line {self._line_number}: {e}")
+        if not isinstance(record, dict):
+            raise OutlineError(f"Line {self._line_number} is not a JSON object")
+
+        if "steps" in record:
+            self._start_section(str(record.get("title") or record.get("section") or ""))
+            for step in record["steps"] or []:
+                self._add_step(str(step))
+            self._end_section()
+        elif "section" in record or "title" in record:
+            self._start_section(str(record.get("section") or record.get("title") or ""))
+        elif "step" in record:
+            self._add_step(str(record["step"]))
+        else:
+            raise OutlineError(f"Line {self._line_number} has no 'section', 'step' or 'steps'")
+
+    def _start_section(self, title: str):
+        self._end_section()
+        self._section = title.strip() or None
+        self._continuation = 0
+
+    def _add_step(self, step: str):
+        step = step.strip()
+        if not step:
+            return
+        if len(self._steps) >= self.max_steps:
+            self._emit()
+            self._continuation += 1
+        self._steps.append(step)
+
+    def _end_section(self):
+        if self._steps:
+            self._emit()
+        self._section = None
+        self._continuation = 0
+
+    def _emit(self):
+        title = self._section or DEFAULT_SECTION_TITLE
+        if self._continuation:
+            title = f"{title} (part {self._continuation + 1})"
+        self._pages.append(OutlinePage(index=self.page_count, title=title, steps=self._steps))
+        self.page_count += 1
+        self._steps = []
@@ -0,0 +1,204 @@
+"""
+Parse Cache for Flowchart Video Generator.
+Memoizes parsed flowchart structures, layout included, per normalized input and parser version.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from services.prompt_parser import FlowchartStructure
+from config import PARSE_CACHE_SIZE, PARSE_CACHE_PERSIST, PARSE_CACHE_DB_PATH, PARSE_CACHE_PERSISTED_MAX
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    structure TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_parses_accessed_at ON parses(accessed_at);
+"""
+
+# Persisted rows are trimmed back to the limit once every this many writes
+_TRIM_INTERVAL = 256
+
+
+def normalize_source(kind: str, source: Any) -> str:
+    """
+    Canonical text of a parser input.
+
+    Prompts are lowercased and whitespace-collapsed, as the prompt parser
+    does before reading them. Mermaid and DOT keep their case and line
+    structure, minus trailing whitespace and blank lines; JSON and other
+    structured payloads are serialized with sorted keys.
+    """
+    if kind == "text":
+        return " ".join(str(source).lower().split())
+    if isinstance(source, str):
+        lines = (line.rstrip() for line in source.replace("\r\n", "\n").split("\n"))
+        return "\n".join(line for line in lines if line)
+    return json.dumps(source, sort_keys=True, separators=(",", ":"))
+
+
+class ParseCache:
+    """
+    Bounded LRU of parsed flowchart structures, optionally backed by SQLite.
+
+    Entries are keyed by the input kind, its normalized text and the version
+    of the parser that produced them, so a parser upgrade never serves an old
+    parse; retain_versions() drops persisted rows of other versions. Entries
+    are stored serialized and rebuilt on every hit, so callers may mutate the
+    structure they get back.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = PARSE_CACHE_SIZE,
+        db_path: Optional[Path] = PARSE_CACHE_DB_PATH if PARSE_CACHE_PERSIST else None,
+        max_persisted: int = PARSE_CACHE_PERSISTED_MAX
+    ):
+        self.max_entries = max_entries
+        self.max_persisted = max_persisted
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = None
+        if db_path is not None:
+            try:
+                self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(SCHEMA)
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache persistence disabled: {e}")
+                self._conn = None
+
+    @staticmethod
+    def key(kind: str, source: Any, version: str) -> str:
+        """Cache key of an input as read by a given parser version."""
+        material = f"{kind}\0{version}\0{normalize_source(kind, source)}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[FlowchartStructure]:
+        """The memoized structure for a key, or None (counted as a miss)."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return FlowchartStructure.from_dict(data)
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute("SELECT structure FROM parses WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._conn.execute("UPDATE parses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                        data = json.loads(row[0])
+                except (sqlite3.Error, ValueError) as e:
+                    logger.warning(f"Parse cache read failed: {e}")
+                if data is not None:
+                    self._remember(key, data)
+                    self.disk_hits += 1
+                    return FlowchartStructure.from_dict(data)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, kind: str, version: str, flowchart: FlowchartStructure):
+        """Memoize a freshly parsed structure."""
+        data = flowchart.to_dict()
+        with self._lock:
+            self._remember(key, data)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO parses (key, kind, version, structure, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, version, json.dumps(data), time.time())
+                )
+                self._writes += 1
+                if self._writes % _TRIM_INTERVAL == 0:
+                    self._trim()
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache write failed: {e}")
+
+    def _remember(self, key: str, data: Dict[str, Any]):
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim(self):
+        """Drop the least recently used persisted rows beyond the limit."""
+        self._conn.execute(
+            """
+            DELETE FROM parses WHERE key IN (
+                SELECT key FROM parses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_persisted,)
+        )
+
+    def retain_versions(self, versions: Dict[str, str]) -> int:
+        """Delete persisted parses of each kind made by any other parser version."""
+        if self._conn is None:
+            return 0
+        removed = 0
+        with self._lock:
+            try:
+                for kind, version in versions.items():
+                    cursor = self._conn.execute(
+                        "DELETE FROM parses WHERE kind = ? AND version != ?", (kind, version)
+                    )
+                    removed += cursor.rowcount
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache invalidation failed: {e}")
+        if removed:
+            logger.info(f"Invalidated {removed} cached parses from older parser versions")
+        return removed
+
+    def clear(self):
+        """Forget every memoized parse, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM parses")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        persisted = None
+        if self._conn is not None:
+            with self._lock:
+                persisted = self._conn.execute("SELECT COUNT(*) FROM parses").fetchone()[0]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persisted_entries": persisted,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
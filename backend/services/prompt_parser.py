@@ -3,13 +3,74 @@ Prompt Parser Service for Flowchart Video Generator.
 Parses natural language prompts into structured flowchart data.
 """
 import re
+import json
+import hashlib
 import logging
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any
+from dataclasses import dataclass, field
 from enum import Enum
 
+from config import LAYOUT_NODE_SPACING
+from services.edge_router import ROUTER_VERSION, route_edges
+
 logger = logging.getLogger(__name__)
 
+# Version of the parser's output. Bump whenever a change alters the structure
+# parsed from the same prompt, so memoized parses are recomputed.
+PARSER_VERSION = f"4+route{ROUTER_VERSION}"
+
+# Step separators, matched in one pass: arrows, bullets, a dash standing on its
+# own (so "follow-up" stays one word) and numbered list markers ("1.", "12)").
+# Prompts are whitespace-collapsed before tokenizing, so bullets and list markers
+# are recognised by the whitespace around them rather than by line starts. A
+# number only counts as a list marker if text follows it and it continues the
+# list (see _split_steps), so "wait 5. then retry" keeps its number. The
+# leading lookahead lets the regex engine skip straight to candidate characters.
+_STEP_SEPARATOR = re.compile(
+    r"""
+    (?=[\d•▪◦*–—=→➜⇒-])
+    (?:
+        -{1,2}>|=>|[→➜⇒]                  # arrows
+      | (?<!\S)
+        (?:[•▪◦*–—-](?!\S)                 # bullets, dashes
+          | (?P<number>\d{1,3})(?P<delimiter>[.)])(?=\s)  # list markers
+        )
+    )
+    """,
+    re.VERBOSE
+)
+# Sentence ends; a period inside a token ("v1.2", "node.js") is not one
+_SENTENCE_END = re.compile(r"\.(?=\s|$)")
+# Words and standalone punctuation, as looked up by the node classifier
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def _split_steps(prompt: str) -> List[str]:
+    """
+    Split a prompt at its step separators.
+
+    Numbered markers must count up by one with the same delimiter ("1. mix
+    2. bake"), from 1 or from whatever number opens the prompt; a number that
+    does not continue the list is part of its step's text.
+    """
+    parts = []
+    start = 0
+    expected = None  # (number, delimiter) of the next list marker
+    for match in _STEP_SEPARATOR.finditer(prompt):
+        number = match.group("number")
+        if number is not None:
+            marker = (int(number), match.group("delimiter"))
+            if expected is None:
+                if marker[0] != 1 and match.start() != 0:
+                    continue
+            elif marker != expected:
+                continue
+            expected = (marker[0] + 1, marker[1])
+        parts.append(prompt[start:match.start()])
+        start = match.end()
+    parts.append(prompt[start:])
+    return parts
+
 
 class NodeType(Enum):
     """Types of flowchart nodes."""
@@ -21,9 +82,9 @@ class NodeType(Enum):
     CONNECTOR = "connector"
 
 
-@dataclass
+@dataclass(slots=True)
 class FlowchartNode:
-    """A single node in the flowchart."""
+    """A single node in the flowchart. Slotted: charts can hold thousands."""
     id: str
     type: NodeType
     text: str
@@ -32,13 +93,15 @@ class FlowchartNode:
     narration: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class FlowchartConnection:
-    """A connection between two nodes."""
+    """A connection between two nodes, with its routed polyline and label position once routed."""
     from_node: str
     to_node: str
     label: str = ""
     condition: str = ""
+    route: List[Tuple[float, float]] = field(default_factory=list)
+    label_position: Optional[Tuple[float, float]] = None
 
 
 @dataclass
@@ -50,10 +113,85 @@ class FlowchartStructure:
     description: str = ""
     estimated_duration: float = 10.0
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to plain JSON-compatible data."""
+        # Built field by field: dataclasses.asdict deep-copies every value recursively
+        return {
+            "nodes": [
+                {
+                    "id": node.id,
+                    "type": node.type.value,
+                    "text": node.text,
+                    "position": list(node.position),
+                    "color": node.color,
+                    "narration": node.narration
+                }
+                for node in self.nodes
+            ],
+            "connections": [
+                {
+                    "from_node": edge.from_node,
+                    "to_node": edge.to_node,
+                    "label": edge.label,
+                    "condition": edge.condition,
+                    "route": [list(point) for point in edge.route],
+                    "label_position": list(edge.label_position) if edge.label_position is not None else None
+                }
+                for edge in self.connections
+            ],
+            "title": self.title,
+            "description": self.description,
+            "estimated_duration": self.estimated_duration
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FlowchartStructure":
+        """Rebuild a structure serialized with to_dict()."""
+        nodes = [
+            FlowchartNode(
+                id=node["id"],
+                type=NodeType(node["type"]),
+                text=node["text"],
+                position=tuple(node.get("position", (0.0, 0.0))),
+                color=node.get("color", "#4CAF50"),
+                narration=node.get("narration", "")
+            )
+            for node in data.get("nodes", [])
+        ]
+        connections = [
+            FlowchartConnection(
+                from_node=edge["from_node"],
+                to_node=edge["to_node"],
+                label=edge.get("label", ""),
+                condition=edge.get("condition", ""),
+                route=[tuple(point) for point in edge.get("route") or []],
+                label_position=tuple(edge["label_position"]) if edge.get("label_position") else None
+            )
+            for edge in data.get("connections", [])
+        ]
+        return cls(
+            nodes=nodes,
+            connections=connections,
+            title=data.get("title", "Flowchart"),
+            description=data.get("description", ""),
+            estimated_duration=data.get("estimated_duration", 10.0)
+        )
+
+    def node_index(self) -> Dict[str, FlowchartNode]:
+        """Nodes by id, for constant-time lookups of edge endpoints."""
+        return {node.id: node for node in self.nodes}
+
+    def content_hash(self) -> str:
+        """Deterministic hash of the structure, usable as a cache key."""
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 
 class PromptParser:
     """Parse natural language prompts into flowchart structures."""
     
+    version = PARSER_VERSION
+    
     def __init__(self):
         self.node_keywords = {
             NodeType.START: ["start", "begin", "initialize", "commence"],
@@ -62,6 +200,27 @@ class PromptParser:
             NodeType.DECISION: ["if", "decide", "check", "verify", "determine", "?"],
             NodeType.INPUT_OUTPUT: ["input", "output", "read", "write", "display", "show"]
         }
+        self._keyword_index = self._build_keyword_index(self.node_keywords)
+
+    @staticmethod
+    def _build_keyword_index(node_keywords: Dict[NodeType, List[str]]) -> Dict[str, NodeType]:
+        """
+        Map every keyword, and its common inflections, to its node type.
+
+        Steps are classified by looking up their words, so "checkout" is not
+        a decision and "send" is not an end, while "checks" and "verified" are
+        still recognised. Punctuation keywords such as "?" are tokens too.
+        """
+        index: Dict[str, NodeType] = {}
+        for node_type, keywords in node_keywords.items():
+            for keyword in keywords:
+                forms = [keyword]
+                if keyword.isalpha():
+                    stem = keyword[:-1] if keyword.endswith("e") else keyword
+                    forms += [keyword + "s", keyword + "es", stem + "ed", stem + "ing"]
+                for form in forms:
+                    index.setdefault(form, node_type)
+        return index
     
     def parse_prompt(self, prompt: str) -> FlowchartStructure:
         """Parse a natural language prompt into a flowchart structure."""
@@ -72,24 +231,10 @@ class PromptParser:
             # Extract steps from the prompt
             steps = self._extract_steps(cleaned_prompt)
             
-            # Create nodes from steps
-            nodes = self._create_nodes_from_steps(steps)
-            
-            # Create connections between nodes
-            connections = self._create_connections(nodes)
-            
-            # Generate narration for each node
-            self._generate_narration(nodes, cleaned_prompt)
-            
-            # Estimate duration
-            duration = self._estimate_duration(nodes)
-            
-            return FlowchartStructure(
-                nodes=nodes,
-                connections=connections,
+            return self._build_structure(
+                steps,
                 title=self._extract_title(cleaned_prompt),
-                description=cleaned_prompt[:100] + "..." if len(cleaned_prompt) > 100 else cleaned_prompt,
-                estimated_duration=duration
+                description=cleaned_prompt[:100] + "..." if len(cleaned_prompt) > 100 else cleaned_prompt
             )
             
         except Exception as e:
@@ -97,6 +242,39 @@ class PromptParser:
             # Return a simple default flowchart
             return self._create_default_flowchart(prompt)
     
+    async def parse_prompt_async(self, prompt: str) -> FlowchartStructure:
+        """Parse from async code; the regex heuristics are cheap enough to run inline."""
+        return self.parse_prompt(prompt)
+    
+    def parse_steps(self, steps: List[str], title: str) -> FlowchartStructure:
+        """Build a flowchart from steps that are already split, e.g. the items of an outline section."""
+        steps = [re.sub(r'\s+', ' ', step.strip()) for step in steps if step.strip()]
+        if len(steps) < 3:
+            steps = ["Start"] + steps + ["End"]
+        return self._build_structure(steps, title=title, description=title)
+    
+    def _build_structure(self, steps: List[str], title: str, description: str) -> FlowchartStructure:
+        """Turn ordered steps into a linear flowchart with narration."""
+        # Create nodes from steps
+        nodes = self._create_nodes_from_steps(steps)
+        
+        # Create connections between nodes
+        connections = self._create_connections(nodes)
+        
+        # Generate narration for each node
+        self._generate_narration(nodes, description)
+        
+        # Estimate duration
+        duration = self._estimate_duration(nodes)
+        
+        return route_edges(FlowchartStructure(
+            nodes=nodes,
+            connections=connections,
+            title=title,
+            description=description,
+            estimated_duration=duration
+        ))
+    
     def _clean_prompt(self, prompt: str) -> str:
         """Clean and normalize the input prompt."""
         # Remove extra whitespace
@@ -107,24 +285,15 @@ class PromptParser:
     
     def _extract_steps(self, prompt: str) -> List[str]:
         """Extract individual steps from the prompt."""
-        # Look for common step separators
-        separators = ['->', '→', '➜', '-', '•', '1.', '2.', '3.', '4.', '5.']
-        
-        steps = []
-        
-        # Split by common separators
-        for sep in separators:
-            if sep in prompt:
-                parts = prompt.split(sep)
-                steps = [part.strip() for part in parts if part.strip()]
-                break
+        # Split on every arrow, bullet and list marker in a single pass
+        steps = [part.strip() for part in _split_steps(prompt) if part.strip()]
         
         # If no separators found, split by sentences
-        if not steps:
-            steps = [s.strip() for s in prompt.split('.') if s.strip()]
+        if len(steps) < 2:
+            steps = [s.strip() for s in _SENTENCE_END.split(prompt) if s.strip()]
         
         # If still no steps, split by commas
-        if not steps:
+        if len(steps) < 2:
             steps = [s.strip() for s in prompt.split(',') if s.strip()]
         
         # Ensure we have at least 3 steps (start, process, end)
@@ -146,7 +315,7 @@ class PromptParser:
                 id=f"node_{i}",
                 type=node_type,
                 text=step.capitalize(),
-                position=(i * 2.0, 0.0),
+                position=(i * LAYOUT_NODE_SPACING, 0.0),
                 color=self._get_node_color(node_type)
             )
             
@@ -166,12 +335,17 @@ class PromptParser:
         if index == total - 1:
             return NodeType.END
         
-        # Check for decision keywords
-        if any(keyword in step_lower for keyword in self.node_keywords[NodeType.DECISION]):
-            return NodeType.DECISION
+        # One pass over the step's words; decision keywords take precedence
+        # over input/output keywords
+        is_input_output = False
+        for word in _WORD.findall(step_lower):
+            node_type = self._keyword_index.get(word)
+            if node_type is NodeType.DECISION:
+                return NodeType.DECISION
+            if node_type is NodeType.INPUT_OUTPUT:
+                is_input_output = True
         
-        # Check for input/output keywords
-        if any(keyword in step_lower for keyword in self.node_keywords[NodeType.INPUT_OUTPUT]):
+        if is_input_output:
             return NodeType.INPUT_OUTPUT
         
         # Default to process
@@ -251,7 +425,7 @@ class PromptParser:
                 id="process",
                 type=NodeType.PROCESS,
                 text="Process",
-                position=(2.0, 0.0),
+                position=(LAYOUT_NODE_SPACING, 0.0),
                 color="#2196F3",
                 narration="We perform the main process"
             ),
@@ -259,7 +433,7 @@ class PromptParser:
                 id="end",
                 type=NodeType.END,
                 text="End",
-                position=(4.0, 0.0),
+                position=(2 * LAYOUT_NODE_SPACING, 0.0),
                 color="#F44336",
                 narration="We complete the process"
             )
@@ -270,10 +444,10 @@ class PromptParser:
             FlowchartConnection("process", "end")
         ]
         
-        return FlowchartStructure(
+        return route_edges(FlowchartStructure(
             nodes=nodes,
             connections=connections,
             title="Simple Flowchart",
             description=prompt[:100],
             estimated_duration=10.0
-        )
+        ))
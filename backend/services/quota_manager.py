@@ -0,0 +1,108 @@
+"""
+Disk Quota Service for Flowchart Video Generator.
+Evicts least recently accessed videos once stored renditions exceed the quota.
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, Any, Optional
+
+from services.video_index import VideoIndex, get_video_index
+from services.storage import StorageBackend, get_storage, video_key
+from config import (
+    VIDEO_DISK_QUOTA_MB, VIDEO_QUOTA_LOW_WATERMARK, CLEANUP_OLD_VIDEOS_AFTER_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DiskQuotaManager:
+    """
+    Keep stored videos under a size quota.
+
+    Only the rendered file is removed: the job's FlowchartStructure and settings
+    stay in the index, so an evicted video can be re-rendered when requested.
+    on_evicted is called with the id of every video marked evicted, from the
+    thread running enforce(), so in-memory job status can follow the index.
+    """
+
+    BATCH_SIZE = 100
+
+    def __init__(
+        self,
+        index: Optional[VideoIndex] = None,
+        storage: Optional[StorageBackend] = None,
+        quota_bytes: int = VIDEO_DISK_QUOTA_MB * 1024 * 1024,
+        low_watermark: float = VIDEO_QUOTA_LOW_WATERMARK,
+        max_idle_days: Optional[float] = CLEANUP_OLD_VIDEOS_AFTER_DAYS,
+        on_evicted: Optional[Callable[[str], None]] = None
+    ):
+        self.index = index or get_video_index()
+        self.storage = storage or get_storage()
+        self.quota_bytes = quota_bytes
+        self.low_watermark = low_watermark
+        self.max_idle_days = max_idle_days
+        self.on_evicted = on_evicted
+        self._lock = threading.Lock()
+
+        self.total_evicted = 0
+        self.total_bytes_freed = 0
+
+    def enforce(self) -> Dict[str, Any]:
+        """Evict idle videos, then evict LRU videos until under the low watermark."""
+        with self._lock:
+            evicted = 0
+            bytes_freed = 0
+
+            if self.max_idle_days:
+                cutoff = time.time() - self.max_idle_days * 86400
+                while True:
+                    candidates = self.index.least_recently_accessed(self.BATCH_SIZE, accessed_before=cutoff)
+                    if not candidates:
+                        break
+                    for candidate in candidates:
+                        bytes_freed += self._evict(candidate)
+                        evicted += 1
+
+            total_bytes = self.index.get_stats()["total_bytes"]
+            if total_bytes > self.quota_bytes:
+                target = int(self.quota_bytes * self.low_watermark)
+                while total_bytes > target:
+                    candidates = self.index.least_recently_accessed(self.BATCH_SIZE)
+                    if not candidates:
+                        break
+                    for candidate in candidates:
+                        freed = self._evict(candidate)
+                        bytes_freed += freed
+                        total_bytes -= freed
+                        evicted += 1
+                        if total_bytes <= target:
+                            break
+
+            self.total_evicted += evicted
+            self.total_bytes_freed += bytes_freed
+            if evicted:
+                logger.info(f"Evicted {evicted} videos, freed {bytes_freed / (1024 * 1024):.1f} MB")
+
+            return {"evicted": evicted, "bytes_freed": bytes_freed}
+
+    def _evict(self, candidate: Dict[str, Any]) -> int:
+        """Delete one video file and mark it evicted. Returns bytes freed."""
+        video_id = candidate["video_id"]
+        try:
+            self.storage.delete(video_key(video_id))
+        except Exception as e:
+            logger.warning(f"Failed to delete evicted video {video_id}: {e}")
+        if self.index.mark_evicted(video_id) and self.on_evicted is not None:
+            try:
+                self.on_evicted(video_id)
+            except Exception as e:
+                logger.warning(f"Eviction callback failed for {video_id}: {e}")
+        return candidate["bytes"] or 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "quota_bytes": self.quota_bytes,
+            "total_evicted": self.total_evicted,
+            "total_bytes_freed": self.total_bytes_freed
+        }
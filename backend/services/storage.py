@@ -0,0 +1,340 @@
+"""
+Artifact Storage Service for Flowchart Video Generator.
+Stores rendered videos on the local filesystem or an S3-compatible object store.
+"""
+import os
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Optional, BinaryIO
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+from config import (
+    VIDEOS_DIR, STORAGE_BACKEND, S3_BUCKET, S3_ENDPOINT_URL, S3_REGION,
+    S3_PREFIX, S3_MULTIPART_CHUNK_MB, PRESIGNED_URL_EXPIRY_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Chunk size used when copying streams into storage
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Types mimetypes does not know on every platform
+_CONTENT_TYPES = {".vtt": "text/vtt", ".mp4": "video/mp4"}
+
+
+def content_type(key: str) -> str:
+    """MIME type an artifact is stored and served with, from its key's extension."""
+    suffix = Path(key).suffix.lower()
+    return _CONTENT_TYPES.get(suffix) or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class StorageWriter:
+    """
+    Writable handle for streaming an artifact into storage.
+
+    Use as a context manager: the artifact only becomes visible once the
+    block exits cleanly, and is discarded if an exception is raised.
+    """
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        raise NotImplementedError
+
+    def commit(self):
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+class StorageBackend:
+    """Base class for artifact storage backends."""
+
+    name = "base"
+
+    def open_writer(self, key: str) -> StorageWriter:
+        """Open a streaming writer for the given key."""
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: Path, move: bool = True) -> int:
+        """Store a local file under the given key and return its size in bytes."""
+        with open(path, 'rb') as source:
+            size = self.put_stream(key, source)
+        if move:
+            Path(path).unlink(missing_ok=True)
+        return size
+
+    def put_stream(self, key: str, stream: BinaryIO) -> int:
+        """Store the contents of a binary stream under the given key."""
+        with self.open_writer(key) as writer:
+            while True:
+                chunk = stream.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        return writer.bytes_written
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> Optional[int]:
+        """Size of the stored artifact in bytes, or None if it does not exist."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Local filesystem path of the artifact, if the backend keeps one."""
+        return None
+
+    def presigned_url(self, key: str, expires_in: int = PRESIGNED_URL_EXPIRY_SECONDS) -> Optional[str]:
+        """Time-limited URL clients can download the artifact from directly."""
+        return None
+
+
+class _LocalWriter(StorageWriter):
+    """Write to a hidden partial file and rename it into place on commit."""
+
+    def __init__(self, final_path: Path):
+        super().__init__()
+        self.final_path = final_path
+        self.partial_path = final_path.with_name(f".{final_path.name}.part")
+        self._file = open(self.partial_path, 'wb')
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.partial_path, self.final_path)
+
+    def abort(self):
+        self._file.close()
+        self.partial_path.unlink(missing_ok=True)
+
+
+class LocalStorage(StorageBackend):
+    """Store artifacts in a directory on the local filesystem."""
+
+    name = "local"
+
+    def __init__(self, root: Path = VIDEOS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def open_writer(self, key: str) -> StorageWriter:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return _LocalWriter(path)
+
+    def put_file(self, key: str, path: Path, move: bool = True) -> int:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            try:
+                # Same filesystem: a rename is atomic and copies nothing
+                os.replace(path, target)
+                return target.stat().st_size
+            except OSError:
+                pass
+        return super().put_file(key, path, move=move)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> bool:
+        path = self._path(key)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        return path if path.exists() else None
+
+
+class _S3MultipartWriter(StorageWriter):
+    """Stream parts to S3 as they fill up, using a multipart upload."""
+
+    # S3 rejects non-final parts smaller than 5 MiB
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, client, bucket: str, key: str, part_size: int, content_type: str):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = None
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )
+            self._upload_id = response["UploadId"]
+
+        part_number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer)
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer.clear()
+
+    def write(self, data: bytes):
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._flush_part()
+
+    def commit(self):
+        if self._upload_id is None:
+            # Small artifact: a single PUT is cheaper than a multipart upload
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key,
+                Body=bytes(self._buffer), ContentType=self.content_type
+            )
+            return
+
+        if self._buffer:
+            self._flush_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts}
+        )
+
+    def abort(self):
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload for {self.key}: {e}")
+        self._buffer.clear()
+
+
+class S3Storage(StorageBackend):
+    """Store artifacts in an S3-compatible bucket (AWS S3, MinIO, ...)."""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+        prefix: str = S3_PREFIX,
+        part_size: int = S3_MULTIPART_CHUNK_MB * 1024 * 1024
+    ):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("boto3 is required for S3 storage")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"})
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def open_writer(self, key: str) -> StorageWriter:
+        return _S3MultipartWriter(self.client, self.bucket, self._key(key), self.part_size, content_type(key))
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return response["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def presigned_url(self, key: str, expires_in: int = PRESIGNED_URL_EXPIRY_SECONDS) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentType": content_type(key)
+            },
+            ExpiresIn=expires_in
+        )
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the process-wide storage backend selected by STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        elif STORAGE_BACKEND == "local":
+            _storage = LocalStorage()
+        else:
+            raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+        logger.info(f"Using {_storage.name} artifact storage")
+    return _storage
+
+
+def video_key(video_id: str, extension: str = "mp4") -> str:
+    """Storage key of a job's final video."""
+    return f"{video_id}.{extension}"
@@ -0,0 +1,513 @@
+"""
+Structured Input Parsers for Flowchart Video Generator.
+Builds flowchart structures directly from Mermaid, Graphviz DOT or JSON definitions,
+bypassing natural-language parsing.
+"""
+import re
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from services.prompt_parser import (
+    PromptParser, FlowchartStructure, FlowchartNode, FlowchartConnection, NodeType
+)
+from services.layout import layered_layout, LAYOUT_VERSION
+from services.edge_router import route_edges, ROUTER_VERSION
+from config import MAX_STRUCTURED_INPUT_LENGTH, MAX_STRUCTURED_NODES
+
+# Version of the structures built from definitions; bump when parsing changes
+STRUCTURED_PARSER_VERSION = f"3+layout{LAYOUT_VERSION}+route{ROUTER_VERSION}"
+
+# Shape kinds shared by the Mermaid and DOT parsers. A "terminal" becomes a
+# start node when nothing points at it and an end node otherwise.
+_TERMINAL = "terminal"
+_SHAPE_TYPES = {
+    "process": NodeType.PROCESS,
+    "decision": NodeType.DECISION,
+    "input_output": NodeType.INPUT_OUTPUT,
+    "connector": NodeType.CONNECTOR
+}
+
+
+class StructuredInputError(ValueError):
+    """A flowchart definition that cannot be parsed or is invalid."""
+
+
+class _GraphBuilder:
+    """Collects nodes and edges in definition order, then builds the structure."""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Optional[str]]] = {}
+        self.edges: List[Tuple[str, str, str]] = []
+        self.title: Optional[str] = None
+
+    def node(self, node_id: str, text: Optional[str] = None, shape: Optional[str] = None):
+        entry = self.nodes.get(node_id)
+        if entry is None:
+            if len(self.nodes) >= MAX_STRUCTURED_NODES:
+                raise StructuredInputError(f"Too many nodes (max {MAX_STRUCTURED_NODES})")
+            entry = self.nodes[node_id] = {"text": None, "shape": None}
+        if text is not None:
+            entry["text"] = text
+        if shape is not None:
+            entry["shape"] = shape
+
+    def edge(self, from_node: str, to_node: str, label: str = ""):
+        self.node(from_node)
+        self.node(to_node)
+        self.edges.append((from_node, to_node, label))
+
+    def build(self) -> FlowchartStructure:
+        if not self.nodes:
+            raise StructuredInputError("Flowchart definition contains no nodes")
+
+        has_incoming = {to_node for _, to_node, _ in self.edges}
+        nodes = []
+        for node_id, entry in self.nodes.items():
+            shape = entry["shape"] or "process"
+            if shape == _TERMINAL:
+                node_type = NodeType.END if node_id in has_incoming else NodeType.START
+            else:
+                node_type = _SHAPE_TYPES.get(shape, NodeType.PROCESS)
+            nodes.append(FlowchartNode(id=node_id, type=node_type, text=entry["text"] or node_id, color=""))
+
+        connections = [FlowchartConnection(from_node, to_node, label) for from_node, to_node, label in self.edges]
+        flowchart = FlowchartStructure(nodes=nodes, connections=connections, title=self.title or "Flowchart")
+        return _finalize(flowchart, layout=True)
+
+
+def _finalize(flowchart: FlowchartStructure, layout: bool) -> FlowchartStructure:
+    """Lay out and route if needed and fill in the derived fields the prompt parser would set."""
+    if layout:
+        layered_layout(flowchart)
+    # Routes given with explicit positions are kept; a new layout invalidates them
+    route_edges(flowchart, keep_existing=not layout)
+    defaults = PromptParser()
+    for node in flowchart.nodes:
+        node.color = node.color or defaults._get_node_color(node.type)
+    defaults._generate_narration([node for node in flowchart.nodes if not node.narration], "")
+    flowchart.estimated_duration = defaults._estimate_duration(flowchart.nodes)
+    return flowchart
+
+
+def _check_length(source: str):
+    if len(source) > MAX_STRUCTURED_INPUT_LENGTH:
+        raise StructuredInputError(f"Definition too long (max {MAX_STRUCTURED_INPUT_LENGTH} characters)")
+
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        text = text[1:-1]
+    return re.sub(r"<br\s*/?>", " ", text).strip()
+
+
+# --- Mermaid -----------------------------------------------------------------
+
+_MERMAID_HEADER = re.compile(r"(?:flowchart|graph)(?:\s+(?:TB|TD|BT|RL|LR))?\s*;?\s*$", re.IGNORECASE)
+_MERMAID_FRONTMATTER = re.compile(r"\A\s*---\s*\n(.*?)\n\s*---\s*\n", re.DOTALL)
+_MERMAID_TITLE = re.compile(r"^\s*title\s*:\s*(.+?)\s*$", re.MULTILINE)
+_MERMAID_IGNORED = re.compile(
+    r"(?:%%|classDef\b|class\b|style\b|linkStyle\b|click\b|direction\b|subgraph\b|end\s*$)"
+)
+# Node id with an optional shape; longer delimiters are tried first
+_MERMAID_NODE = re.compile(
+    r"""
+    \s*(?P<id>\w+)
+    (?:
+        \(\[(?P<stadium>.*?)\]\)
+      | \(\((?P<circle>.*?)\)\)
+      | \[\[(?P<subroutine>.*?)\]\]
+      | \[\((?P<cylinder>.*?)\)\]
+      | \[[/\\](?P<parallelogram>.*?)[/\\]\]
+      | \{\{(?P<hexagon>.*?)\}\}
+      | \{(?P<rhombus>.*?)\}
+      | \[(?P<rect>.*?)\]
+      | \((?P<rounded>.*?)\)
+      | >(?P<flag>.*?)\]
+    )?
+    (?::::\w+)?
+    """,
+    re.VERBOSE
+)
+_MERMAID_SHAPES = {
+    "stadium": _TERMINAL,
+    "circle": _TERMINAL,
+    "subroutine": "process",
+    "cylinder": "input_output",
+    "parallelogram": "input_output",
+    "hexagon": "process",
+    "rhombus": "decision",
+    "rect": "process",
+    "rounded": "process",
+    "flag": "input_output"
+}
+# A link, with its label either inline ("-- yes -->") or piped ("-->|yes|")
+_MERMAID_LINK = re.compile(
+    r"""
+    \s*
+    (?:
+        <?(?:-{2,}>|={2,}>|-\.+->|-{3,}|={3,}|-\.+-)
+      | <?(?:--|==|-\.)\s+(?P<inline>[^|]+?)\s+(?:-{2,}>|={2,}>|\.+->|-{3,}|={3,}|\.+-)
+    )
+    \s*(?:\|(?P<piped>[^|]*)\|)?
+    """,
+    re.VERBOSE
+)
+_MERMAID_AMPERSAND = re.compile(r"\s*&")
+
+
+def _mermaid_group(builder: _GraphBuilder, statement: str, pos: int) -> Tuple[List[str], int]:
+    """Parse "A[..] & B{..}" at pos; returns the node ids and the new position."""
+    ids = []
+    while True:
+        match = _MERMAID_NODE.match(statement, pos)
+        if not match:
+            raise StructuredInputError(f"Expected a node at {statement[pos:pos + 30]!r}")
+        shape = next((name for name in _MERMAID_SHAPES if match.group(name) is not None), None)
+        text = _unquote(match.group(shape)) if shape else None
+        builder.node(match.group("id"), text, _MERMAID_SHAPES[shape] if shape else None)
+        ids.append(match.group("id"))
+        pos = match.end()
+        ampersand = _MERMAID_AMPERSAND.match(statement, pos)
+        if not ampersand:
+            return ids, pos
+        pos = ampersand.end()
+
+
+def parse_mermaid(source: str) -> FlowchartStructure:
+    """Parse a Mermaid `flowchart`/`graph` definition."""
+    _check_length(source)
+    builder = _GraphBuilder()
+
+    frontmatter = _MERMAID_FRONTMATTER.match(source)
+    if frontmatter:
+        title = _MERMAID_TITLE.search(frontmatter.group(1))
+        builder.title = _unquote(title.group(1)) if title else None
+        source = source[frontmatter.end():]
+
+    header_seen = False
+    for line in source.splitlines():
+        for statement in line.split(";"):
+            statement = statement.strip()
+            if not statement or _MERMAID_IGNORED.match(statement):
+                continue
+            if not header_seen:
+                if not _MERMAID_HEADER.match(statement):
+                    raise StructuredInputError("Mermaid definition must start with 'flowchart' or 'graph'")
+                header_seen = True
+                continue
+
+            sources, pos = _mermaid_group(builder, statement, 0)
+            while pos < len(statement):
+                link = _MERMAID_LINK.match(statement, pos)
+                if not link:
+                    raise StructuredInputError(f"Expected a link at {statement[pos:pos + 30]!r}")
+                label = _unquote(link.group("piped") or link.group("inline") or "")
+                targets, pos = _mermaid_group(builder, statement, link.end())
+                for from_node in sources:
+                    for to_node in targets:
+                        builder.edge(from_node, to_node, label)
+                sources = targets
+
+    if not header_seen:
+        raise StructuredInputError("Mermaid definition must start with 'flowchart' or 'graph'")
+    return builder.build()
+
+
+# --- Graphviz DOT --------------------------------------------------------------
+
+_DOT_TOKEN = re.compile(
+    r"""
+      (?P<space>\s+|//[^\n]*|\#[^\n]*|/\*.*?\*/)
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<html><[^<>]*(?:<[^<>]*>[^<>]*)*>)
+    | (?P<edgeop>->|--)
+    | (?P<id>[A-Za-z_\x80-￿][\w\x80-￿]*|-?(?:\.\d+|\d+(?:\.\d*)?))
+    | (?P<punct>[{}\[\];,=:])
+    """,
+    re.VERBOSE | re.DOTALL
+)
+_DOT_KEYWORDS = {"strict", "graph", "digraph", "node", "edge", "subgraph"}
+_DOT_SHAPES = {
+    "diamond": "decision",
+    "mdiamond": "decision",
+    "parallelogram": "input_output",
+    "trapezium": "input_output",
+    "invtrapezium": "input_output",
+    "cylinder": "input_output",
+    "note": "input_output",
+    "ellipse": _TERMINAL,
+    "oval": _TERMINAL,
+    "circle": _TERMINAL,
+    "doublecircle": _TERMINAL,
+    "point": "connector"
+}
+
+
+def _dot_tokens(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = _DOT_TOKEN.match(source, pos)
+        if not match:
+            raise StructuredInputError(f"Unexpected character in DOT at {source[pos:pos + 30]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        value = match.group()
+        if kind == "string":
+            value = value[1:-1].replace('\\"', '"').replace("\\n", " ").replace("\\l", " ").replace("\\r", " ")
+            kind = "id"
+        elif kind == "html":
+            value = re.sub(r"<[^<>]*>", " ", value[1:-1]).strip()
+            kind = "id"
+        elif kind == "id" and value.lower() in _DOT_KEYWORDS:
+            kind = value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _DotParser:
+    """Recursive-descent parser for the subset of DOT that describes a flowchart."""
+
+    def __init__(self, tokens: List[Tuple[str, str]], builder: _GraphBuilder):
+        self.tokens = tokens
+        self.pos = 0
+        self.builder = builder
+        self.node_defaults: Dict[str, str] = {}
+        self.mentioned: List[str] = []
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind: str) -> str:
+        if self.peek() != kind:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of input"
+            raise StructuredInputError(f"Expected {kind} in DOT, found {found!r}")
+        value = self.tokens[self.pos][1]
+        self.pos += 1
+        return value
+
+    def accept(self, value: str) -> bool:
+        if self.pos < len(self.tokens) and self.tokens[self.pos] == ("punct", value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value: str):
+        if not self.accept(value):
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of input"
+            raise StructuredInputError(f"Expected {value!r} in DOT, found {found!r}")
+
+    def graph(self):
+        if self.peek() == "strict":
+            self.pos += 1
+        if self.peek() not in ("graph", "digraph"):
+            raise StructuredInputError("DOT definition must start with 'graph' or 'digraph'")
+        self.pos += 1
+        if self.peek() == "id":
+            self.builder.title = self.take("id")
+        self.expect("{")
+        self.statements()
+        self.expect("}")
+
+    def statements(self):
+        while self.peek() is not None and self.tokens[self.pos] != ("punct", "}"):
+            self.statement()
+            self.accept(";")
+
+    def attributes(self) -> Dict[str, str]:
+        attrs: Dict[str, str] = {}
+        while self.accept("["):
+            while not self.accept("]"):
+                key = self.take("id")
+                value = ""
+                if self.accept("="):
+                    value = self.take("id")
+                attrs[key.lower()] = value
+                self.accept(",") or self.accept(";")
+        return attrs
+
+    def endpoint(self) -> List[str]:
+        """A node id (port ignored) or a subgraph; returns the node ids it stands for."""
+        if self.peek() == "subgraph" or self.tokens[self.pos] == ("punct", "{"):
+            return self.subgraph()
+        node_id = self.take("id")
+        if self.accept(":"):
+            self.take("id")
+            if self.accept(":"):
+                self.take("id")
+        if node_id not in self.builder.nodes:
+            self._apply_node_attributes(node_id, self.node_defaults)
+        self.mentioned.append(node_id)
+        return [node_id]
+
+    def subgraph(self) -> List[str]:
+        if self.peek() == "subgraph":
+            self.pos += 1
+            if self.peek() == "id":
+                self.pos += 1
+        start = len(self.mentioned)
+        self.expect("{")
+        self.statements()
+        self.expect("}")
+        # An edge to a subgraph connects every node named inside it
+        return list(dict.fromkeys(self.mentioned[start:]))
+
+    def statement(self):
+        kind = self.peek()
+        if kind in ("graph", "node", "edge"):
+            self.pos += 1
+            attrs = self.attributes()
+            if kind == "node":
+                self.node_defaults.update(attrs)
+            elif kind == "graph" and attrs.get("label"):
+                self.builder.title = attrs["label"]
+            return
+        if kind == "id" and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1] == ("punct", "="):
+            key = self.take("id")
+            self.expect("=")
+            value = self.take("id")
+            if key.lower() == "label":
+                self.builder.title = value
+            return
+
+        sources = self.endpoint()
+        if self.peek() != "edgeop":
+            # New nodes already got the defaults from endpoint(); a mention of
+            # an existing node only applies its own attributes
+            attrs = self.attributes()
+            if len(sources) == 1:
+                self._apply_node_attributes(sources[0], attrs)
+            return
+
+        chain = [sources]
+        while self.peek() == "edgeop":
+            self.pos += 1
+            chain.append(self.endpoint())
+        label = self.attributes().get("label", "")
+        for from_group, to_group in zip(chain, chain[1:]):
+            for from_node in from_group:
+                for to_node in to_group:
+                    self.builder.edge(from_node, to_node, label)
+
+    def _apply_node_attributes(self, node_id: str, attrs: Dict[str, str]):
+        shape = None
+        if attrs.get("type"):
+            node_type = attrs["type"].lower()
+            shape = _TERMINAL if node_type in ("start", "end") else node_type
+        elif attrs.get("shape"):
+            shape = _DOT_SHAPES.get(attrs["shape"].lower(), "process")
+        self.builder.node(node_id, attrs.get("label") or None, shape)
+
+
+def parse_dot(source: str) -> FlowchartStructure:
+    """Parse a Graphviz DOT `digraph`/`graph` definition."""
+    _check_length(source)
+    builder = _GraphBuilder()
+    parser = _DotParser(_dot_tokens(source), builder)
+    parser.graph()
+    if parser.peek() is not None:
+        raise StructuredInputError("Unexpected content after the DOT graph")
+    return builder.build()
+
+
+# --- JSON ----------------------------------------------------------------------
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _check_point(value: Any, what: str):
+    if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(_is_number(v) for v in value):
+        raise StructuredInputError(f"{what} must be two finite numbers")
+
+
+def _check_string(value: Any, what: str):
+    if not isinstance(value, str):
+        raise StructuredInputError(f"{what} must be a string")
+
+
+def _check_json_fields(nodes: List[Any], connections: List[Any]):
+    """Reject values from_dict would accept but rendering or routing cannot use."""
+    for i, node in enumerate(nodes):
+        if not isinstance(node, dict):
+            raise StructuredInputError(f"Node {i} must be an object")
+        for field in ("id", "text", "color", "narration"):
+            if field in node:
+                _check_string(node[field], f"Node {i} '{field}'")
+        if "position" in node:
+            _check_point(node["position"], f"Node {i} 'position'")
+    if any("position" in node for node in nodes) and not all("position" in node for node in nodes):
+        raise StructuredInputError("Give a 'position' for every node or for none (to have them laid out)")
+
+    for i, edge in enumerate(connections):
+        if not isinstance(edge, dict):
+            raise StructuredInputError(f"Connection {i} must be an object")
+        for field in ("from_node", "to_node", "label", "condition"):
+            if field in edge:
+                _check_string(edge[field], f"Connection {i} '{field}'")
+        if edge.get("label_position") is not None:
+            _check_point(edge["label_position"], f"Connection {i} 'label_position'")
+        for point in edge.get("route") or []:
+            _check_point(point, f"Connection {i} 'route' points")
+
+
+def parse_json_structure(data: Union[str, Dict[str, Any]]) -> FlowchartStructure:
+    """
+    Build a flowchart from a FlowchartStructure.to_dict()-shaped payload.
+
+    Nodes are laid out unless every node has a position; missing colors and
+    narration are derived from the node type.
+    """
+    if isinstance(data, str):
+        _check_length(data)
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            raise StructuredInputError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get("nodes"), list) or not data["nodes"]:
+        raise StructuredInputError("JSON flowchart needs a non-empty 'nodes' list")
+    if len(data["nodes"]) > MAX_STRUCTURED_NODES:
+        raise StructuredInputError(f"Too many nodes (max {MAX_STRUCTURED_NODES})")
+    if not isinstance(data.get("connections", []), list):
+        raise StructuredInputError("'connections' must be a list")
+    for field in ("title", "description"):
+        if field in data:
+            _check_string(data[field], f"'{field}'")
+    if "estimated_duration" in data and not (_is_number(data["estimated_duration"]) and data["estimated_duration"] >= 0):
+        raise StructuredInputError("'estimated_duration' must be a finite, non-negative number")
+    _check_json_fields(data["nodes"], data.get("connections", []))
+
+    try:
+        flowchart = FlowchartStructure.from_dict(data)
+    except (KeyError, TypeError, ValueError) as e:
+        raise StructuredInputError(f"Invalid flowchart structure: {e}")
+
+    ids = [node.id for node in flowchart.nodes]
+    if len(set(ids)) != len(ids):
+        raise StructuredInputError("Node ids must be unique")
+    known = set(ids)
+    for edge in flowchart.connections:
+        if edge.from_node not in known or edge.to_node not in known:
+            raise StructuredInputError(f"Connection {edge.from_node} -> {edge.to_node} references an unknown node")
+
+    raw_nodes = data["nodes"]
+    for node, raw in zip(flowchart.nodes, raw_nodes):
+        if "color" not in raw:
+            node.color = ""
+    layout = "position" not in raw_nodes[0]
+    return _finalize(flowchart, layout=layout)
+
+
+def parse_structured(input_format: str, source: Union[str, Dict[str, Any]]) -> FlowchartStructure:
+    """Parse a flowchart definition in one of the structured input formats."""
+    if input_format == "mermaid":
+        return parse_mermaid(source)
+    if input_format == "dot":
+        return parse_dot(source)
+    if input_format == "json":
+        return parse_json_structure(source)
+    raise StructuredInputError(f"Unsupported input format: {input_format}")
@@ -0,0 +1,94 @@
+"""
+Subtitle Service for Flowchart Video Generator.
+Builds WebVTT subtitles from the narration timeline.
+"""
+from typing import Dict, List, Optional
+
+from services.timeline import Timeline
+
+
+def subtitles_key(video_id: str, language: str) -> str:
+    """Storage key of a job's subtitles in one language."""
+    return f"{video_id}.{language}.vtt"
+
+
+def track_languages(tracks: List[Dict]) -> List[str]:
+    """Language tag per narration track's voice settings, made unique (en, en-2, ...)."""
+    languages: List[str] = []
+    for settings in tracks:
+        base = settings.get('language') or settings.get('lang') or 'und'
+        language = base
+        n = 1
+        while language in languages:
+            n += 1
+            language = f"{base}-{n}"
+        languages.append(language)
+    return languages
+
+
+# ISO 639-1 to 639-2/T for the languages the TTS engines speak; MP4 only takes the latter
+_ISO639_2 = {
+    'ar': 'ara', 'bn': 'ben', 'cs': 'ces', 'da': 'dan', 'de': 'deu', 'el': 'ell',
+    'en': 'eng', 'es': 'spa', 'fi': 'fin', 'fr': 'fra', 'he': 'heb', 'hi': 'hin',
+    'hu': 'hun', 'id': 'ind', 'it': 'ita', 'ja': 'jpn', 'ko': 'kor', 'nl': 'nld',
+    'no': 'nor', 'pl': 'pol', 'pt': 'por', 'ro': 'ron', 'ru': 'rus', 'sk': 'slk',
+    'sv': 'swe', 'ta': 'tam', 'th': 'tha', 'tr': 'tur', 'uk': 'ukr', 'vi': 'vie',
+    'zh': 'zho'
+}
+
+
+def container_language(language: Optional[str]) -> str:
+    """Three-letter code for a track's language tag (en, en-2, pt-BR, ...), 'und' if unknown."""
+    base = (language or '').split('-')[0].lower()
+    if len(base) == 3 and base.isalpha():
+        return base
+    return _ISO639_2.get(base, 'und')
+
+
+def format_timestamp(seconds: float) -> str:
+    """WebVTT timestamp, e.g. 00:01:02.345."""
+    millis = int(round(max(0.0, seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def _escape(text: str) -> str:
+    # Cue payloads must not contain "-->" or unescaped markup characters
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("-->", "→")
+
+
+def build_webvtt(
+    timeline: Timeline,
+    texts: Dict[str, str],
+    durations: Dict[str, float],
+    language: Optional[str] = None
+) -> str:
+    """
+    Build a WebVTT document with one cue per narrated element.
+
+    Args:
+        timeline: Planned scene timeline; cue start times come from here
+        texts: Spoken text per element id
+        durations: Clip duration per element id in this language
+        language: Optional language tag written to the header
+    """
+    lines: List[str] = ["WEBVTT"]
+    if language:
+        lines.append(f"Language: {language}")
+    lines.append("")
+
+    number = 0
+    for cue in [timeline.title] + timeline.nodes:
+        text = texts.get(cue.element_id)
+        duration = durations.get(cue.element_id)
+        if not text or not duration:
+            continue
+        number += 1
+        lines.append(str(number))
+        lines.append(f"{format_timestamp(cue.start_time)} --> {format_timestamp(cue.start_time + duration)}")
+        lines.append(_escape(text.strip()))
+        lines.append("")
+
+    return "\n".join(lines)
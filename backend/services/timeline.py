@@ -0,0 +1,98 @@
+"""
+Scene Timeline Planner for Flowchart Video Generator.
+Lays out the reveal of each flowchart element and the narration clip attached to it.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from services.audio_pcm import LoudnessStats
+from services.prompt_parser import FlowchartStructure
+
+# Animation timings shared by the planner and the generated scene
+TITLE_WRITE_SECONDS = 1.0
+TITLE_HOLD_SECONDS = 1.0
+TITLE_FADE_SECONDS = 1.0
+NODE_REVEAL_SECONDS = 0.8
+NODE_MIN_HOLD_SECONDS = 0.3
+EDGE_REVEAL_SECONDS = 0.5
+EDGE_HOLD_SECONDS = 0.2
+FINAL_HOLD_SECONDS = 2.0
+FADE_OUT_SECONDS = 1.0
+
+# Silence left after a clip before the next element is revealed
+NARRATION_GAP_SECONDS = 0.3
+
+TITLE_CUE = "__title__"
+
+
+@dataclass
+class NarrationClip:
+    """A synthesized narration clip on disk."""
+    path: str
+    duration: float
+    loudness: Optional[LoudnessStats] = None  # As leveled, None if unmeasured
+
+
+@dataclass(slots=True)
+class Cue:
+    """One reveal in the scene and the narration that starts with it."""
+    element_id: str
+    start_time: float
+    run_time: float
+    hold: float
+    clip: Optional[NarrationClip] = None
+
+
+@dataclass
+class Timeline:
+    title: Cue
+    nodes: List[Cue] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def has_audio(self) -> bool:
+        return self.title.clip is not None or any(cue.clip for cue in self.nodes)
+
+
+def _hold_for(narration_seconds: float, run_time: float, min_hold: float) -> float:
+    """Wait after a reveal long enough for its narration to finish."""
+    if narration_seconds <= 0:
+        return min_hold
+    return max(min_hold, narration_seconds + NARRATION_GAP_SECONDS - run_time)
+
+
+def plan_timeline(
+    flowchart: FlowchartStructure,
+    clips: Dict[str, NarrationClip],
+    reserved: Optional[Dict[str, float]] = None
+) -> Timeline:
+    """
+    Plan the scene so every narration clip starts exactly when its element appears.
+
+    The title and each node are revealed in order; a reveal's hold is stretched
+    until its clip has finished, so clips never overlap. reserved gives extra
+    narration time per element, e.g. the longest clip across alternate
+    language tracks that are placed on the same timeline.
+    """
+    reserved = reserved or {}
+
+    def _narration_seconds(element_id: str) -> float:
+        clip = clips.get(element_id)
+        return max(clip.duration if clip else 0.0, reserved.get(element_id, 0.0))
+
+    title_clip = clips.get(TITLE_CUE)
+    title_run_time = TITLE_WRITE_SECONDS
+    title_hold = _hold_for(_narration_seconds(TITLE_CUE), title_run_time, TITLE_HOLD_SECONDS)
+    title = Cue(TITLE_CUE, 0.0, title_run_time, title_hold, title_clip)
+
+    t = title_run_time + title_hold + TITLE_FADE_SECONDS
+    cues = []
+    for node in flowchart.nodes:
+        clip = clips.get(node.id)
+        hold = _hold_for(_narration_seconds(node.id), NODE_REVEAL_SECONDS, NODE_MIN_HOLD_SECONDS)
+        cues.append(Cue(node.id, t, NODE_REVEAL_SECONDS, hold, clip))
+        t += NODE_REVEAL_SECONDS + hold
+
+    t += len(flowchart.connections) * (EDGE_REVEAL_SECONDS + EDGE_HOLD_SECONDS)
+    t += FINAL_HOLD_SECONDS + FADE_OUT_SECONDS
+    return Timeline(title=title, nodes=cues, duration=t)
@@ -0,0 +1,141 @@
+"""
+TTS Segment Cache for Flowchart Video Generator.
+Stores synthesized, loudness-leveled narration segments in their final compressed codec.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+from services.audio_pcm import PCMAudio, LoudnessStats, encode
+from config import (
+    TTS_CACHE_DIR, AUDIO_CODECS, AUDIO_CLIP_CODEC, AUDIO_SAMPLE_RATE, LOUDNESS_TARGET_I
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedSegment:
+    """A compressed narration segment on disk."""
+    key: str
+    path: Path
+    duration: float
+    loudness: Optional[LoudnessStats] = None
+
+
+class TTSSegmentCache:
+    """
+    Content-addressed cache of compressed narration segments.
+
+    Segments are encoded once, directly from PCM, in the codec the final
+    container uses (AAC for MP4, Opus for WebM), so Manim can take them as
+    they are and decoding only happens when segments have to be mixed.
+    Each segment has a JSON sidecar with its duration and loudness stats.
+    Entries are touched on every hit; CleanupService expires idle ones.
+    """
+
+    def __init__(self, directory: Path = TTS_CACHE_DIR, codec: str = AUDIO_CLIP_CODEC):
+        if codec not in AUDIO_CODECS:
+            raise ValueError(f"Unsupported audio codec: {codec}")
+        self.directory = directory
+        self.codec = codec
+        self.extension = AUDIO_CODECS[codec][2]
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_written = 0
+
+    def key(self, text: str, engine: str, voice_settings: Optional[Dict]) -> str:
+        """Cache key for a segment: everything that changes the encoded audio."""
+        material = json.dumps(
+            {
+                "text": text,
+                "engine": engine,
+                "voice": voice_settings or {},
+                "codec": self.codec,
+                "sample_rate": AUDIO_SAMPLE_RATE,
+                "loudness_target": LOUDNESS_TARGET_I
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.{self.extension}", self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[CachedSegment]:
+        audio_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            if not audio_path.exists():
+                raise FileNotFoundError(audio_path)
+            now = time.time()
+            os.utime(audio_path, (now, now))
+            os.utime(meta_path, (now, now))
+        except (FileNotFoundError, ValueError):
+            return None
+
+        loudness = meta.get("loudness")
+        return CachedSegment(
+            key=key,
+            path=audio_path,
+            duration=meta["duration"],
+            loudness=LoudnessStats.from_dict(loudness) if loudness else None
+        )
+
+    def get(self, key: str) -> Optional[CachedSegment]:
+        return self.lookup([key])
+
+    def lookup(self, keys: List[str]) -> Optional[CachedSegment]:
+        """The first of several keys that is cached, counted as one hit or miss."""
+        for key in keys:
+            segment = self._read(key)
+            if segment is not None:
+                with self._lock:
+                    self.hits += 1
+                return segment
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: PCMAudio, loudness: Optional[LoudnessStats] = None) -> CachedSegment:
+        """Encode a segment once and store it atomically. Blocking."""
+        audio_path, meta_path = self._paths(key)
+        data = encode(audio, self.codec)
+        meta = {
+            "duration": audio.duration,
+            "codec": self.codec,
+            "loudness": loudness.to_dict() if loudness else None
+        }
+
+        # Write under temporary names, then rename: readers never see partial files
+        suffix = f".{os.getpid()}_{threading.get_ident()}.tmp"
+        tmp_audio = audio_path.with_name(audio_path.name + suffix)
+        tmp_meta = meta_path.with_name(meta_path.name + suffix)
+        tmp_audio.write_bytes(data)
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_audio, audio_path)
+        os.replace(tmp_meta, meta_path)
+
+        with self._lock:
+            self.bytes_written += len(data)
+        return CachedSegment(key=key, path=audio_path, duration=audio.duration, loudness=loudness)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "codec": self.codec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_written": self.bytes_written
+            }
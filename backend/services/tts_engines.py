@@ -0,0 +1,491 @@
+"""
+TTS Engine Clients for Flowchart Video Generator.
+Long-lived, reusable text-to-speech engine clients with latency tracking.
+"""
+import os
+import re
+import json
+import time
+import queue
+import base64
+import logging
+import threading
+import tempfile
+import urllib.parse
+import multiprocessing
+from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import pyttsx3
+    PYTTSX3_AVAILABLE = True
+except ImportError:
+    PYTTSX3_AVAILABLE = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+try:
+    import azure.cognitiveservices.speech as speechsdk
+    AZURE_SPEECH_AVAILABLE = True
+except ImportError:
+    AZURE_SPEECH_AVAILABLE = False
+
+try:
+    import grpc
+    from google.cloud import texttospeech
+    from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+    GOOGLE_CLOUD_TTS_AVAILABLE = True
+except ImportError:
+    GOOGLE_CLOUD_TTS_AVAILABLE = False
+
+from services.audio_pcm import PCMAudio, decode
+from config import (
+    GTTS_BASE_URL, GTTS_CHUNK_CONCURRENCY, GTTS_CONNECT_TIMEOUT, GTTS_READ_TIMEOUT,
+    GTTS_MAX_RETRIES, AZURE_TTS_MAX_CONCURRENCY, AZURE_SPEECH_ENDPOINT,
+    GOOGLE_TTS_MAX_CONCURRENCY, GOOGLE_TTS_ENDPOINT, GOOGLE_TTS_INSECURE, AUDIO_SAMPLE_RATE,
+    OFFLINE_TTS_WORKERS, OFFLINE_TTS_TASKS_PER_WORKER, OFFLINE_TTS_RATE, OFFLINE_TTS_VOLUME
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EngineStats:
+    """Thread-safe latency and error counters for one engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+
+    def record(self, latency: float, success: bool):
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            if not success:
+                self.failures += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "avg_latency": self.total_latency / self.calls if self.calls else None,
+                "last_latency": self.last_latency
+            }
+
+
+class TTSEngine:
+    """
+    Base class for TTS engine clients.
+
+    An engine is created once per worker and reused for every synthesis call.
+    synthesize() is blocking and safe to call from several threads at once.
+    """
+
+    name = "base"
+
+    def __init__(self, max_concurrency: int = 4):
+        self.stats = EngineStats()
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def synthesize(self, text: str, voice_settings: Optional[Dict] = None) -> PCMAudio:
+        """Synthesize text to decoded in-memory PCM, recording latency and errors."""
+        with self._slots:
+            start_time = time.time()
+            try:
+                audio = self._synthesize(text, voice_settings or {})
+            except Exception:
+                self.stats.record(time.time() - start_time, success=False)
+                raise
+            self.stats.record(time.time() - start_time, success=True)
+            return audio
+
+    def _synthesize(self, text: str, voice_settings: Dict) -> PCMAudio:
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections and worker resources."""
+
+
+class GTTSEngine(TTSEngine):
+    """
+    gTTS-compatible client for the Google Translate TTS endpoint.
+
+    Like gTTS, text is split into chunks of at most 100 characters, but the
+    chunks are fetched concurrently over a pooled keep-alive session with
+    retries and timeouts, and the MP3 data is decoded in memory.
+    """
+
+    name = "gtts"
+
+    RPC_ID = "jQ1olc"
+    MAX_CHUNK_CHARS = 100
+    HEADERS = {
+        "Referer": "http://translate.google.com/",
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36"
+        ),
+        "Content-Type": "application/x-www-form-urlencoded;charset=utf-8"
+    }
+    _AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+    _SENTENCE_PATTERN = re.compile(r'(?<=[.!?;:,\n])\s+')
+
+    def __init__(
+        self,
+        base_url: Optional[str] = GTTS_BASE_URL,
+        concurrency: int = GTTS_CHUNK_CONCURRENCY,
+        timeout: tuple = (GTTS_CONNECT_TIMEOUT, GTTS_READ_TIMEOUT),
+        max_retries: int = GTTS_MAX_RETRIES
+    ):
+        if not REQUESTS_AVAILABLE:
+            raise RuntimeError("requests is required for the gTTS engine")
+        super().__init__(max_concurrency=concurrency)
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"])
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.HEADERS)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gtts")
+
+    def _url(self, tld: str) -> str:
+        base = self.base_url or f"https://translate.google.{tld}"
+        return f"{base.rstrip('/')}/_/TranslateWebserverUi/data/batchexecute"
+
+    @classmethod
+    def chunk_text(cls, text: str) -> List[str]:
+        """Split text into chunks the endpoint accepts, preferring sentence boundaries."""
+        chunks = []
+        for sentence in cls._SENTENCE_PATTERN.split(text.strip()):
+            sentence = sentence.strip()
+            while len(sentence) > cls.MAX_CHUNK_CHARS:
+                cut = sentence.rfind(" ", 0, cls.MAX_CHUNK_CHARS)
+                if cut <= 0:
+                    cut = cls.MAX_CHUNK_CHARS
+                chunks.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                chunks.append(sentence)
+        return chunks
+
+    def _payload(self, chunk: str, lang: str, slow: bool) -> str:
+        parameter = [chunk, lang, True if slow else None, "null"]
+        escaped_parameter = json.dumps(parameter, separators=(",", ":"))
+        rpc = [[[self.RPC_ID, escaped_parameter, None, "generic"]]]
+        escaped_rpc = json.dumps(rpc, separators=(",", ":"))
+        return f"f.req={urllib.parse.quote(escaped_rpc)}&"
+
+    def _fetch_chunk(self, url: str, chunk: str, lang: str, slow: bool) -> bytes:
+        response = self.session.post(url, data=self._payload(chunk, lang, slow), timeout=self.timeout)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            if self.RPC_ID in line:
+                match = self._AUDIO_PATTERN.search(line)
+                if match:
+                    return base64.b64decode(match.group(1))
+        raise RuntimeError("No audio in TTS response")
+
+    def fetch_mp3(self, text: str, voice_settings: Optional[Dict] = None) -> bytes:
+        """Fetch all chunks concurrently and return the concatenated MP3 stream."""
+        voice_settings = voice_settings or {}
+        lang = voice_settings.get('language', 'en')
+        tld = voice_settings.get('tld', 'com')
+        slow = voice_settings.get('slow', False)
+
+        url = self._url(tld)
+        chunks = self.chunk_text(text)
+        if not chunks:
+            raise ValueError("No text to speak")
+
+        futures = [
+            self.executor.submit(self._fetch_chunk, url, chunk, lang, slow)
+            for chunk in chunks
+        ]
+        # MP3 frames are self-delimiting, so chunk streams concatenate directly
+        return b"".join(future.result() for future in futures)
+
+    def _synthesize(self, text: str, voice_settings: Dict) -> PCMAudio:
+        mp3_data = self.fetch_mp3(text, voice_settings)
+        return decode(mp3_data, "mp3")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AzureTTSEngine(TTSEngine):
+    """
+    Azure Speech client that keeps its SpeechConfig and synthesizers alive.
+
+    Synthesizers are pooled per voice with their connections pre-opened, so
+    calls after the first skip authentication and connection setup. Audio is
+    returned in memory instead of being written to a file by the SDK.
+    """
+
+    name = "azure"
+
+    DEFAULT_VOICE = "en-US-AriaNeural"
+
+    def __init__(
+        self,
+        speech_key: Optional[str] = None,
+        region: Optional[str] = None,
+        endpoint: Optional[str] = AZURE_SPEECH_ENDPOINT,
+        max_concurrency: int = AZURE_TTS_MAX_CONCURRENCY
+    ):
+        if not AZURE_SPEECH_AVAILABLE:
+            raise RuntimeError("azure-cognitiveservices-speech is required for the Azure engine")
+        super().__init__(max_concurrency=max_concurrency)
+
+        speech_key = speech_key or os.getenv('AZURE_SPEECH_KEY')
+        region = region or os.getenv('AZURE_SPEECH_REGION')
+        if endpoint:
+            self.speech_config = speechsdk.SpeechConfig(subscription=speech_key, endpoint=endpoint)
+        else:
+            self.speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=region)
+        self.speech_config.set_speech_synthesis_output_format(
+            speechsdk.SpeechSynthesisOutputFormat.Riff24Khz16BitMonoPcm
+        )
+
+        self._pools: Dict[str, queue.SimpleQueue] = {}
+        self._connections = []
+        self._pools_lock = threading.Lock()
+
+    def _new_synthesizer(self, voice_name: str):
+        with self._pools_lock:
+            self.speech_config.speech_synthesis_voice_name = voice_name
+            synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+        connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+        connection.open(True)
+        self._connections.append(connection)
+        return synthesizer
+
+    def _pool(self, voice_name: str) -> queue.SimpleQueue:
+        with self._pools_lock:
+            if voice_name not in self._pools:
+                self._pools[voice_name] = queue.SimpleQueue()
+            return self._pools[voice_name]
+
+    def _synthesize(self, text: str, voice_settings: Dict) -> PCMAudio:
+        voice_name = voice_settings.get('voice', self.DEFAULT_VOICE)
+        pool = self._pool(voice_name)
+        try:
+            synthesizer = pool.get_nowait()
+        except queue.Empty:
+            synthesizer = self._new_synthesizer(voice_name)
+
+        try:
+            result = synthesizer.speak_text_async(text).get()
+        finally:
+            pool.put(synthesizer)
+
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError(f"Azure TTS failed: {result.reason}")
+        return PCMAudio.from_wav_bytes(result.audio_data)
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Azure connection: {e}")
+        self._connections.clear()
+        self._pools.clear()
+
+
+class GoogleCloudTTSEngine(TTSEngine):
+    """
+    Google Cloud Text-to-Speech client with a single long-lived gRPC channel.
+
+    TextToSpeechClient is thread-safe, so one client (and one authenticated
+    channel) serves every call in the worker.
+    """
+
+    name = "google_cloud"
+
+    DEFAULT_LANGUAGE = "en-US"
+    DEFAULT_VOICE = "en-US-Wavenet-F"
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = GOOGLE_TTS_ENDPOINT,
+        insecure: bool = GOOGLE_TTS_INSECURE,
+        max_concurrency: int = GOOGLE_TTS_MAX_CONCURRENCY
+    ):
+        if not GOOGLE_CLOUD_TTS_AVAILABLE:
+            raise RuntimeError("google-cloud-texttospeech is required for the Google Cloud engine")
+        super().__init__(max_concurrency=max_concurrency)
+
+        if endpoint and insecure:
+            # Plain-text channel, e.g. for a local stub server
+            channel = grpc.insecure_channel(endpoint)
+            self.client = texttospeech.TextToSpeechClient(
+                transport=TextToSpeechGrpcTransport(channel=channel)
+            )
+        elif endpoint:
+            self.client = texttospeech.TextToSpeechClient(client_options={"api_endpoint": endpoint})
+        else:
+            self.client = texttospeech.TextToSpeechClient()
+
+        self.audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            sample_rate_hertz=AUDIO_SAMPLE_RATE
+        )
+
+    def _synthesize(self, text: str, voice_settings: Dict) -> PCMAudio:
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=voice_settings.get('language', self.DEFAULT_LANGUAGE),
+            name=voice_settings.get('voice', self.DEFAULT_VOICE)
+        )
+        response = self.client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text=text),
+            voice=voice,
+            audio_config=self.audio_config
+        )
+        # LINEAR16 responses include a WAV header
+        return PCMAudio.from_wav_bytes(response.audio_content)
+
+    def close(self):
+        try:
+            self.client.transport.close()
+        except Exception as e:
+            logger.warning(f"Failed to close Google Cloud TTS channel: {e}")
+
+
+# State of an offline TTS worker process, set up once by _offline_worker_init
+_offline_engine = None
+_offline_defaults: Dict[str, Any] = {}
+
+
+def _offline_worker_init(rate: int, volume: float, preferred_voices: List[str]):
+    """Create this process's own pyttsx3 engine and select its voice once."""
+    global _offline_engine, _offline_defaults
+    _offline_engine = pyttsx3.init()
+
+    voice_id = None
+    for voice in _offline_engine.getProperty('voices') or []:
+        if any(preferred in voice.name.lower() for preferred in preferred_voices):
+            voice_id = voice.id
+            break
+    if voice_id:
+        _offline_engine.setProperty('voice', voice_id)
+
+    _offline_engine.setProperty('rate', rate)
+    _offline_engine.setProperty('volume', volume)
+    _offline_defaults = {'rate': rate, 'volume': volume}
+
+
+def _offline_worker_synthesize(text: str, voice_settings: Dict) -> bytes:
+    """Render text to WAV in a worker process and return the file contents."""
+    engine = _offline_engine
+    for key in ('rate', 'volume'):
+        engine.setProperty(key, voice_settings.get(key, _offline_defaults[key]))
+
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with open(path, "rb") as audio_file:
+            return audio_file.read()
+    finally:
+        os.unlink(path)
+
+
+class OfflineTTSEngine(TTSEngine):
+    """
+    Pool of isolated pyttsx3 (espeak/SAPI/NSSpeech) worker processes.
+
+    pyttsx3 engines are not thread-safe and runAndWait() blocks, so each worker
+    process owns one engine, initialized with its voice when the process starts.
+    Calls beyond the pool size queue on the engine's slots, and workers are
+    replaced after a fixed number of tasks to contain driver leaks. No process
+    is started until the first call or warm_up(), so constructing the engine
+    at import time costs nothing.
+    """
+
+    name = "pyttsx3"
+
+    PREFERRED_VOICES = ["female", "zira"]
+
+    def __init__(
+        self,
+        workers: int = OFFLINE_TTS_WORKERS,
+        tasks_per_worker: int = OFFLINE_TTS_TASKS_PER_WORKER,
+        rate: int = OFFLINE_TTS_RATE,
+        volume: float = OFFLINE_TTS_VOLUME
+    ):
+        if not PYTTSX3_AVAILABLE:
+            raise RuntimeError("pyttsx3 is required for the offline engine")
+        super().__init__(max_concurrency=workers)
+
+        self.workers = workers
+        self.tasks_per_worker = tasks_per_worker
+        self._initargs = (rate, volume, self.PREFERRED_VOICES)
+        self._pool_lock = threading.Lock()
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self.pool is None:
+                self.pool = self._new_pool()
+            return self.pool
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the server process has threads and open sockets
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_offline_worker_init,
+            initargs=self._initargs,
+            max_tasks_per_child=self.tasks_per_worker
+        )
+
+    def warm_up(self):
+        """Start every worker and load its voice ahead of the first real request. Blocking."""
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_offline_worker_synthesize, "ready", {})
+            for _ in range(self.workers)
+        ]
+        for future in futures:
+            future.result()
+
+    def _synthesize(self, text: str, voice_settings: Dict) -> PCMAudio:
+        pool = self._get_pool()
+        try:
+            wav_data = pool.submit(_offline_worker_synthesize, text, voice_settings).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. the speech driver crashed); replace the pool once
+            with self._pool_lock:
+                if self.pool is pool:
+                    logger.warning("Offline TTS worker pool broke, restarting it")
+                    self.pool = self._new_pool()
+            wav_data = self.pool.submit(_offline_worker_synthesize, text, voice_settings).result()
+        return PCMAudio.from_wav_bytes(wav_data)
+
+    def close(self):
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
@@ -0,0 +1,202 @@
+"""
+TTS Routing Service for Flowchart Video Generator.
+Ranks TTS engines by rolling latency and error rate, with a circuit breaker per engine.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Iterable, Any, Optional
+
+from config import (
+    TTS_ROUTER_WINDOW, TTS_ENGINE_PRIOR_LATENCY, TTS_BREAKER_FAILURE_THRESHOLD,
+    TTS_BREAKER_RESET_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker.
+
+    Opens after a run of consecutive failures, rejects calls until the reset
+    timeout has passed, then lets a single trial call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = TTS_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = TTS_BREAKER_RESET_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trials = 0  # Number of the latest half-open trial call
+
+    def allow(self) -> Optional[int]:
+        """
+        Claim a call if one may be attempted now.
+
+        Returns None if not, else a ticket: the trial's number for the
+        half-open trial call, 0 for any other call.
+        """
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                return None
+            self._trial_in_flight = True
+            self._trials += 1
+            return self._trials
+        return 0 if self.state == self.CLOSED else None
+
+    def is_available(self) -> bool:
+        """Like allow(), but without claiming the half-open trial call."""
+        if self.state == self.OPEN:
+            return time.time() - self.opened_at >= self.reset_timeout
+        if self.state == self.HALF_OPEN:
+            return not self._trial_in_flight
+        return True
+
+    def release_trial(self, ticket: int):
+        """Free the half-open trial slot, if the ticket is the trial holding it."""
+        if ticket and ticket == self._trials and self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("TTS circuit breaker opened")
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            self._trial_in_flight = False
+
+
+class EngineHealth:
+    """
+    Rolling window of call outcomes for one engine.
+
+    Calls abandoned before they finished (hedges that lost) are kept as
+    censored samples: their elapsed time is a lower bound on the latency.
+    """
+
+    SUCCESS = "success"
+    FAILURE = "failure"
+    CENSORED = "censored"
+
+    def __init__(self, prior_latency: float, window: int = TTS_ROUTER_WINDOW):
+        self.prior_latency = prior_latency
+        self.samples = deque(maxlen=window)  # (latency, outcome)
+        self.breaker = CircuitBreaker()
+
+    def record(self, latency: float, success: bool):
+        self.samples.append((latency, self.SUCCESS if success else self.FAILURE))
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def record_censored(self, elapsed: float):
+        self.samples.append((elapsed, self.CENSORED))
+
+    @property
+    def latency(self) -> float:
+        """
+        Mean latency of finished and abandoned calls in the window, or the prior estimate.
+
+        An abandoned call counts as its elapsed time, or as the mean of the
+        successful calls (the prior without any) if that is higher, so a
+        hedge cancelled early does not make the engine look faster.
+        """
+        successes = [latency for latency, outcome in self.samples if outcome == self.SUCCESS]
+        censored = [latency for latency, outcome in self.samples if outcome == self.CENSORED]
+        if not successes and not censored:
+            return self.prior_latency
+        expected = sum(successes) / len(successes) if successes else self.prior_latency
+        return (sum(successes) + sum(max(elapsed, expected) for elapsed in censored)) / (len(successes) + len(censored))
+
+    @property
+    def error_rate(self) -> float:
+        outcomes = [outcome for _, outcome in self.samples if outcome != self.CENSORED]
+        if not outcomes:
+            return 0.0
+        return sum(1 for outcome in outcomes if outcome == self.FAILURE) / len(outcomes)
+
+    def score(self) -> float:
+        """Lower is better: latency inflated by the recent error rate."""
+        return self.latency * (1.0 + 4.0 * self.error_rate)
+
+
+class TTSRouter:
+    """Route synthesis calls to the fastest healthy engine."""
+
+    def __init__(self, engine_names: Iterable[str]):
+        self._lock = threading.Lock()
+        self.health: Dict[str, EngineHealth] = {
+            name: EngineHealth(TTS_ENGINE_PRIOR_LATENCY.get(name, 5.0))
+            for name in engine_names
+        }
+
+    def ranked(self, exclude: Iterable[str] = ()) -> List[str]:
+        """Engines whose breaker is not open, fastest first."""
+        excluded = set(exclude)
+        with self._lock:
+            candidates = [
+                (health.score(), name)
+                for name, health in self.health.items()
+                if name not in excluded and health.breaker.is_available()
+            ]
+        return [name for _, name in sorted(candidates)]
+
+    def acquire(self, name: str) -> Optional[int]:
+        """Claim permission to call an engine from its circuit breaker. Returns the ticket, None if refused."""
+        with self._lock:
+            health = self.health.get(name)
+            return health.breaker.allow() if health is not None else None
+
+    def abandon(self, name: str, ticket: int, elapsed: float):
+        """
+        Record a claimed call that was cancelled before it finished.
+
+        Its elapsed time is kept as a lower bound on the engine's latency, and
+        the half-open trial slot is freed only if this call held it.
+        """
+        with self._lock:
+            health = self.health.get(name)
+            if health is not None:
+                health.record_censored(elapsed)
+                health.breaker.release_trial(ticket)
+
+    def record(self, name: str, latency: float, success: bool):
+        with self._lock:
+            health = self.health.get(name)
+            if health is not None:
+                health.record(latency, success)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    "latency": health.latency,
+                    "error_rate": health.error_rate,
+                    "circuit": health.breaker.state,
+                    "samples": len(health.samples),
+                    "censored": sum(1 for _, outcome in health.samples if outcome == EngineHealth.CENSORED)
+                }
+                for name, health in self.health.items()
+            }
@@ -0,0 +1,358 @@
+"""
+Video Index Service for Flowchart Video Generator.
+SQLite metadata store for generated videos with incrementally maintained statistics.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from config import INDEX_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    prompt TEXT,
+    prompt_hash TEXT,
+    structure_hash TEXT,
+    quality TEXT,
+    format TEXT,
+    status TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    duration REAL,
+    has_audio INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    timings TEXT,
+    error TEXT,
+    structure TEXT,
+    settings TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_videos_prompt_hash ON videos(prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_videos_structure_hash ON videos(structure_hash);
+CREATE INDEX IF NOT EXISTS idx_videos_status ON videos(status);
+CREATE INDEX IF NOT EXISTS idx_videos_status_accessed_at ON videos(status, accessed_at);
+CREATE INDEX IF NOT EXISTS idx_videos_updated_at ON videos(updated_at);
+
+-- Aggregates maintained by triggers so reading stats never scans the table
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    videos INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO totals (id, videos, bytes) VALUES (0, 0, 0);
+
+-- Triggers add missing status rows with INSERT ... WHERE NOT EXISTS: an
+-- OR IGNORE inside a trigger is overridden by an upsert's conflict policy
+CREATE TABLE IF NOT EXISTS status_counts (
+    status TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Small named values that services keep across restarts
+CREATE TABLE IF NOT EXISTS markers (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS videos_after_insert AFTER INSERT ON videos
+BEGIN
+    UPDATE totals SET videos = videos + 1, bytes = bytes + NEW.bytes WHERE id = 0;
+    INSERT INTO status_counts (status, count)
+        SELECT NEW.status, 0 WHERE NOT EXISTS (SELECT 1 FROM status_counts WHERE status = NEW.status);
+    UPDATE status_counts SET count = count + 1 WHERE status = NEW.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_delete AFTER DELETE ON videos
+BEGIN
+    UPDATE totals SET videos = videos - 1, bytes = bytes - OLD.bytes WHERE id = 0;
+    UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_update_bytes AFTER UPDATE OF bytes ON videos
+WHEN NEW.bytes != OLD.bytes
+BEGIN
+    UPDATE totals SET bytes = bytes + NEW.bytes - OLD.bytes WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_insert_duration AFTER INSERT ON videos
+WHEN NEW.duration IS NOT NULL
+BEGIN
+    UPDATE totals SET duration = duration + NEW.duration WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_delete_duration AFTER DELETE ON videos
+WHEN OLD.duration IS NOT NULL
+BEGIN
+    UPDATE totals SET duration = duration - OLD.duration WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_update_duration AFTER UPDATE OF duration ON videos
+WHEN COALESCE(NEW.duration, 0) != COALESCE(OLD.duration, 0)
+BEGIN
+    UPDATE totals SET duration = duration + COALESCE(NEW.duration, 0) - COALESCE(OLD.duration, 0) WHERE id = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS videos_after_update_status AFTER UPDATE OF status ON videos
+WHEN NEW.status != OLD.status
+BEGIN
+    UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+    INSERT INTO status_counts (status, count)
+        SELECT NEW.status, 0 WHERE NOT EXISTS (SELECT 1 FROM status_counts WHERE status = NEW.status);
+    UPDATE status_counts SET count = count + 1 WHERE status = NEW.status;
+END;
+"""
+
+
+def hash_prompt(prompt: str) -> str:
+    """Stable hash of a prompt, insensitive to case and whitespace."""
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class VideoIndex:
+    """
+    Indexed metadata store for generated videos.
+
+    Every write is a single transaction, and the aggregate tables are kept in
+    sync by triggers, so get_stats() costs the same with ten videos or ten million.
+    """
+
+    def __init__(self, db_path: Path = INDEX_DB_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            isolation_level=None  # Transactions are managed explicitly
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        """Add columns and replace triggers changed after an index database was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        if not columns:
+            return
+        for column in ("structure", "settings"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+        totals = {row[1] for row in self._conn.execute("PRAGMA table_info(totals)")}
+        if totals and "duration" not in totals:
+            self._conn.execute("ALTER TABLE totals ADD COLUMN duration REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE totals SET duration = (SELECT COALESCE(SUM(duration), 0) FROM videos)")
+        # Recreated by the schema script
+        for (name,) in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%INSERT OR IGNORE INTO status_counts%'"
+        ).fetchall():
+            self._conn.execute(f"DROP TRIGGER {name}")
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        """Run a single write statement in its own transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+                return cursor.rowcount
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_job(
+        self,
+        video_id: str,
+        prompt: str,
+        quality: Optional[str] = None,
+        format: Optional[str] = None,
+        status: str = "processing"
+    ):
+        """Register a newly submitted job."""
+        now = time.time()
+        self._write(
+            """
+            INSERT INTO videos (video_id, prompt, prompt_hash, quality, format,
+                                status, created_at, accessed_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                status = excluded.status, updated_at = excluded.updated_at
+            """,
+            (video_id, prompt, hash_prompt(prompt), quality, format,
+             status, now, now, now)
+        )
+
+    def update_status(self, video_id: str, status: str):
+        """Update the pipeline status of a job."""
+        self._write(
+            "UPDATE videos SET status = ?, updated_at = ? WHERE video_id = ?",
+            (status, time.time(), video_id)
+        )
+
+    def record_result(
+        self,
+        video_id: str,
+        success: bool,
+        structure_hash: Optional[str] = None,
+        size_bytes: int = 0,
+        duration: Optional[float] = None,
+        has_audio: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+        error: Optional[str] = None
+    ):
+        """Record the final outcome of a job."""
+        self._write(
+            """
+            UPDATE videos SET
+                status = ?, structure_hash = COALESCE(?, structure_hash),
+                bytes = ?, duration = ?, has_audio = ?, timings = ?,
+                error = ?, updated_at = ?
+            WHERE video_id = ?
+            """,
+            ("completed" if success else "failed", structure_hash,
+             size_bytes or 0, duration, int(has_audio),
+             json.dumps(timings) if timings else None,
+             error, time.time(), video_id)
+        )
+
+    def save_job_spec(self, video_id: str, structure: Dict[str, Any], settings: Dict[str, Any]):
+        """Keep what is needed to re-render a job after its video is evicted."""
+        self._write(
+            "UPDATE videos SET structure = ?, settings = ?, updated_at = ? WHERE video_id = ?",
+            (json.dumps(structure), json.dumps(settings), time.time(), video_id)
+        )
+
+    def least_recently_accessed(self, limit: int = 100, accessed_before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Completed videos ordered from least to most recently accessed."""
+        sql = "SELECT video_id, bytes, accessed_at FROM videos WHERE status = 'completed'"
+        params: tuple = ()
+        if accessed_before is not None:
+            sql += " AND accessed_at < ?"
+            params = (accessed_before,)
+        sql += " ORDER BY accessed_at ASC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def finished_jobs_between(self, since: float, until: float) -> List[Dict[str, Any]]:
+        """Jobs that reached a terminal status within [since, until)."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT video_id, status, updated_at FROM videos
+                WHERE updated_at >= ? AND updated_at < ?
+                  AND status IN ('completed', 'failed', 'evicted')
+                """,
+                (since, until)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_evicted(self, video_id: str) -> bool:
+        """Record that a completed video's file was removed; its spec is kept."""
+        return self._write(
+            """
+            UPDATE videos SET status = 'evicted', bytes = 0, updated_at = ?
+            WHERE video_id = ? AND status = 'completed'
+            """,
+            (time.time(), video_id)
+        ) > 0
+
+    def record_regeneration_failure(self, video_id: str, error: Optional[str]):
+        """Return a video whose re-render failed to evicted, so it can be regenerated again; the error is kept."""
+        self._write(
+            """
+            UPDATE videos SET status = 'evicted', bytes = 0, error = ?, updated_at = ?
+            WHERE video_id = ?
+            """,
+            (error, time.time(), video_id)
+        )
+
+    def touch(self, video_id: str):
+        """Mark a video as accessed now."""
+        self._write(
+            "UPDATE videos SET accessed_at = ? WHERE video_id = ?",
+            (time.time(), video_id)
+        )
+
+    def delete(self, video_id: str) -> bool:
+        return self._write("DELETE FROM videos WHERE video_id = ?", (video_id,)) > 0
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find_by_prompt_hash(self, prompt_hash: str, status: str = "completed") -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM videos WHERE prompt_hash = ? AND status = ? ORDER BY created_at DESC",
+                (prompt_hash, status)
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_marker(self, name: str) -> Optional[float]:
+        """A value saved with set_marker, or None if it was never set."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM markers WHERE name = ?", (name,)).fetchone()
+        return row["value"] if row else None
+
+    def set_marker(self, name: str, value: float):
+        self._write(
+            "INSERT INTO markers (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, value)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregate statistics, read from the trigger-maintained tables."""
+        with self._lock:
+            totals = self._conn.execute(
+                "SELECT videos, bytes, duration FROM totals WHERE id = 0"
+            ).fetchone()
+            statuses = self._conn.execute(
+                "SELECT status, count FROM status_counts WHERE count > 0"
+            ).fetchall()
+        return {
+            "total_videos": totals["videos"],
+            "total_bytes": totals["bytes"],
+            "total_duration": totals["duration"],
+            "by_status": {row["status"]: row["count"] for row in statuses}
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        data["has_audio"] = bool(data.get("has_audio"))
+        for column in ("timings", "structure", "settings"):
+            if data.get(column):
+                data[column] = json.loads(data[column])
+        return data
+
+
+_index: Optional[VideoIndex] = None
+
+
+def get_video_index() -> VideoIndex:
+    """Return the process-wide video index."""
+    global _index
+    if _index is None:
+        _index = VideoIndex()
+    return _index
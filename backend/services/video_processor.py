@@ -3,10 +3,12 @@ Video Processor Service for Flowchart Video Generator.
 Handles video post-processing, combining video with audio, and format conversions.
 """
 import os
+import asyncio
 import logging
+import tempfile
 import subprocess
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass
 
 try:
@@ -21,6 +23,11 @@ try:
 except ImportError:
     FFMPEG_AVAILABLE = False
 
+from services.storage import get_storage, COPY_CHUNK_SIZE
+from services.audio_pcm import LoudnessStats, loudnorm_options
+from services.subtitles import container_language
+from config import AUDIO_OUTPUT_SAMPLE_RATE
+
 logger = logging.getLogger(__name__)
 
 
@@ -40,6 +47,7 @@ class VideoProcessor:
     def __init__(self):
         self.temp_dir = Path("temp")
         self.temp_dir.mkdir(exist_ok=True)
+        self.storage = get_storage()
         
         # Check available tools
         self.moviepy_available = MOVIEPY_AVAILABLE
@@ -193,6 +201,304 @@ class VideoProcessor:
                 error_message=f"FFmpeg processing failed: {e}"
             )
     
+    async def add_audio_tracks(
+        self,
+        video_path: str,
+        tracks: List[Dict[str, Any]],
+        primary_language: Optional[str] = None,
+        storage_key: Optional[str] = None,
+        output_path: Optional[str] = None
+    ) -> ProcessingResult:
+        """
+        Add alternate audio tracks (e.g. other narration languages) to a video.
+        
+        The video stream and the existing (primary) audio track are copied, not
+        re-encoded; it is tagged with primary_language and made the default
+        track. Each new track is mixed from its clips, brought to the
+        loudness target with loudnorm and encoded in the same ffmpeg pass;
+        with the track's measured 'loudness' stats loudnorm runs in linear
+        mode (one constant gain), otherwise in dynamic mode. The
+        result is muxed as fragmented MP4 and streamed from ffmpeg straight
+        into artifact storage (a multipart upload on S3), so no second local
+        copy is written.
+        
+        Args:
+            video_path: Rendered video, with or without a primary audio track
+            tracks: Dicts with a 'language' tag, 'clips' as (start_time_seconds, clip_path)
+                pairs and optionally the mixed track's 'loudness' (LoudnessStats)
+            primary_language: Language tag of the existing audio track, e.g. 'en'
+            storage_key: Key the multi-track video is stored under
+            output_path: Local file to write instead of storing it, e.g. for a chapter
+        """
+        try:
+            video_file = Path(video_path)
+            
+            if not video_file.exists():
+                return ProcessingResult(
+                    success=False,
+                    error_message=f"Video file not found: {video_path}"
+                )
+            if not self.ffmpeg_available:
+                return ProcessingResult(
+                    success=False,
+                    error_message="FFmpeg is required to add audio tracks"
+                )
+            if (storage_key is None) == (output_path is None):
+                return ProcessingResult(
+                    success=False,
+                    error_message="Either a storage key or an output path is required"
+                )
+            
+            loop = asyncio.get_event_loop()
+            probe = await loop.run_in_executor(None, ffmpeg.probe, str(video_file))
+            has_audio = any(stream.get('codec_type') == 'audio' for stream in probe.get('streams', []))
+            
+            video = ffmpeg.input(str(video_file))
+            streams = [video.video] + ([video.audio] if has_audio else [])
+            # The more specific c:a:0 wins for the primary track
+            options: Dict[str, Any] = {'c:v': 'copy', 'c:a': 'aac'}
+            if has_audio:
+                options['c:a:0'] = 'copy'
+                options['metadata:s:a:0'] = f"language={container_language(primary_language)}"
+                options['disposition:a:0'] = 'default'
+            
+            for track in tracks:
+                if not track.get('clips'):
+                    continue
+                index = len(streams) - 1
+                streams.append(self._normalized(self._narration_stream(track['clips']), track.get('loudness')))
+                options[f'metadata:s:a:{index}'] = f"language={container_language(track.get('language'))}"
+                options[f'disposition:a:{index}'] = 'default' if index == 0 else '0'
+            
+            if output_path is not None:
+                output = ffmpeg.output(*streams, str(output_path), movflags='+faststart', **options)
+                await loop.run_in_executor(
+                    None, lambda: ffmpeg.run(output, overwrite_output=True, quiet=True)
+                )
+                size = Path(output_path).stat().st_size
+            else:
+                # A plain MP4 needs a seekable output for its index; fragments don't
+                output = ffmpeg.output(
+                    *streams, 'pipe:', format='mp4', movflags='frag_keyframe+empty_moov+default_base_moof', **options
+                )
+                size = await loop.run_in_executor(None, self._stream_to_storage, output, storage_key)
+            
+            return ProcessingResult(
+                success=True,
+                output_path=output_path or storage_key,
+                file_size_mb=size / (1024 * 1024)
+            )
+            
+        except Exception as e:
+            logger.error(f"Adding audio tracks failed: {e}")
+            return ProcessingResult(
+                success=False,
+                error_message=f"Adding audio tracks failed: {e}"
+            )
+    
+    def _stream_to_storage(self, output, storage_key: str) -> int:
+        """Run an ffmpeg output writing to stdout, storing what it writes as it comes. Blocking."""
+        command = ffmpeg.compile(output.global_args('-hide_banner', '-loglevel', 'error'), overwrite_output=True)
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+            try:
+                # Nothing is kept if ffmpeg or the upload fails: the writer aborts
+                with self.storage.open_writer(storage_key) as writer:
+                    while True:
+                        chunk = process.stdout.read(COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        writer.write(chunk)
+                    if process.wait() != 0:
+                        errors.seek(0)
+                        raise RuntimeError(errors.read().decode(errors='replace').strip())
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+        return writer.bytes_written
+    
+    @staticmethod
+    def _normalized(stream, stats: Optional[LoudnessStats] = None):
+        """An audio stream brought to the loudness target (loudnorm resamples, so resample back)."""
+        return stream.filter('loudnorm', **loudnorm_options(stats)).filter('aresample', AUDIO_OUTPUT_SAMPLE_RATE)
+    
+    def _narration_stream(self, clips: List[Tuple[float, str]]):
+        """Mix clips into one ffmpeg audio stream, each delayed to its start time."""
+        delayed = []
+        for start_time, clip_path in clips:
+            delay_ms = int(round(start_time * 1000))
+            delayed.append(ffmpeg.input(str(clip_path)).audio.filter('adelay', f"{delay_ms}|{delay_ms}"))
+        if len(delayed) == 1:
+            return delayed[0]
+        return ffmpeg.filter(delayed, 'amix', inputs=len(delayed), normalize=0, dropout_transition=0)
+    
+    async def concatenate_chapters(
+        self,
+        chapters: List[Tuple[str, str]],
+        output_path: str
+    ) -> ProcessingResult:
+        """
+        Join videos end to end into one MP4 with a chapter marker per input.
+        
+        Streams are copied, not re-encoded, so the inputs must share codecs
+        and stream layout (as renders with the same settings do). Chapters
+        without audio (e.g. whose narration failed) first get silent tracks
+        matching the others, since the concat demuxer takes the stream layout
+        from the first input and would drop or misalign the audio.
+        
+        Args:
+            chapters: (title, video_path) pairs in playback order
+            output_path: Where the joined video is written
+        """
+        try:
+            output_file = Path(output_path)
+            
+            if not chapters:
+                return ProcessingResult(
+                    success=False,
+                    error_message="No chapters to join"
+                )
+            missing = [path for _, path in chapters if not Path(path).exists()]
+            if missing:
+                return ProcessingResult(
+                    success=False,
+                    error_message=f"Video file not found: {missing[0]}"
+                )
+            if not self.ffmpeg_available:
+                return ProcessingResult(
+                    success=False,
+                    error_message="FFmpeg is required to join chapters"
+                )
+            
+            loop = asyncio.get_event_loop()
+            durations = []
+            audio_streams = []
+            for _, path in chapters:
+                probe = await loop.run_in_executor(None, ffmpeg.probe, str(path))
+                durations.append(float(probe['format']['duration']))
+                audio_streams.append([s for s in probe.get('streams', []) if s.get('codec_type') == 'audio'])
+            
+            reference = next((streams for streams in audio_streams if streams), None)
+            padded = []
+            if reference is not None:
+                chapters = list(chapters)
+                for i, ((title, path), streams) in enumerate(zip(chapters, audio_streams)):
+                    if not streams:
+                        silent_path = output_file.with_name(f"{output_file.stem}_silent_{i:04d}.mp4")
+                        await loop.run_in_executor(None, self._add_silent_audio, Path(path), silent_path, reference)
+                        chapters[i] = (title, str(silent_path))
+                        padded.append(silent_path)
+            
+            # ffmpeg-python cannot add an input without streams (the chapter
+            # metadata), so the command line is built directly
+            list_file = output_file.with_suffix(".ffconcat")
+            metadata_file = output_file.with_suffix(".ffmetadata")
+            list_file.write_text(
+                "ffconcat version 1.0\n"
+                + "".join(f"file '{self._concat_quote(Path(path).resolve())}'\n" for _, path in chapters)
+            )
+            metadata = [";FFMETADATA1"]
+            start = 0.0
+            for (title, _), duration in zip(chapters, durations):
+                metadata += [
+                    "[CHAPTER]",
+                    "TIMEBASE=1/1000",
+                    f"START={int(round(start * 1000))}",
+                    f"END={int(round((start + duration) * 1000))}",
+                    f"title={self._metadata_escape(title)}"
+                ]
+                start += duration
+            metadata_file.write_text("\n".join(metadata) + "\n")
+            
+            command = [
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "concat", "-safe", "0", "-i", str(list_file),
+                "-i", str(metadata_file),
+                "-map", "0", "-map_metadata", "1", "-map_chapters", "1",
+                "-c", "copy", "-movflags", "+faststart",
+                str(output_file)
+            ]
+            result = await loop.run_in_executor(
+                None, lambda: subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+            )
+            list_file.unlink(missing_ok=True)
+            metadata_file.unlink(missing_ok=True)
+            for path in padded:
+                path.unlink(missing_ok=True)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode(errors="replace").strip())
+            
+            return ProcessingResult(
+                success=True,
+                output_path=str(output_file),
+                duration=start,
+                file_size_mb=output_file.stat().st_size / (1024 * 1024)
+            )
+            
+        except Exception as e:
+            logger.error(f"Joining chapters failed: {e}")
+            return ProcessingResult(
+                success=False,
+                error_message=f"Joining chapters failed: {e}"
+            )
+    
+    @staticmethod
+    def _add_silent_audio(video_path: Path, output_path: Path, reference: List[Dict[str, Any]]):
+        """Copy a video, adding one silent AAC track per reference audio stream with its rate and channels."""
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(video_path)]
+        for stream in reference:
+            layout = stream.get('channel_layout') or ('stereo' if stream.get('channels') == 2 else 'mono')
+            command += ["-f", "lavfi", "-i", f"anullsrc=r={stream.get('sample_rate', AUDIO_OUTPUT_SAMPLE_RATE)}:cl={layout}"]
+        command += ["-map", "0:v"]
+        for index, stream in enumerate(reference):
+            command += ["-map", f"{index + 1}:a"]
+            language = (stream.get('tags') or {}).get('language')
+            if language:
+                command += [f"-metadata:s:a:{index}", f"language={language}"]
+        command += ["-c:v", "copy", "-c:a", "aac", "-shortest", str(output_path)]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"Adding silent audio failed: {result.stderr.decode(errors='replace').strip()}")
+    
+    @staticmethod
+    def _concat_quote(path: Path) -> str:
+        return str(path).replace("'", "'\\''")
+    
+    @staticmethod
+    def _metadata_escape(text: str) -> str:
+        """Escape a value for ffmpeg's FFMETADATA format."""
+        for char in ("\\", "=", ";", "#", "\n"):
+            text = text.replace(char, "\\" + char)
+        return text
+    
+    async def publish(self, output_path: str, storage_key: str) -> ProcessingResult:
+        """Move a processed file into artifact storage under the given key."""
+        try:
+            output_file = Path(output_path)
+            if not output_file.exists():
+                return ProcessingResult(
+                    success=False,
+                    error_message=f"Output file not found: {output_path}"
+                )
+            
+            loop = asyncio.get_event_loop()
+            size = await loop.run_in_executor(None, self.storage.put_file, storage_key, output_file)
+            
+            return ProcessingResult(
+                success=True,
+                output_path=storage_key,
+                file_size_mb=size / (1024 * 1024)
+            )
+            
+        except Exception as e:
+            logger.error(f"Publishing to storage failed: {e}")
+            return ProcessingResult(
+                success=False,
+                error_message=str(e)
+            )
+    
     async def convert_format(
         self,
         input_path: str,
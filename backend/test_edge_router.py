@@ -0,0 +1,165 @@
+"""
+Tests for routing flowchart edges as orthogonal polylines around node boxes.
+"""
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.edge_router import node_box, route_edges, _label_box
+from services.layout import layered_layout
+from services.prompt_parser import FlowchartConnection, FlowchartNode, FlowchartStructure, NodeType
+
+
+def _chart(nodes, edges) -> FlowchartStructure:
+    """Nodes as (id, type, (x, y)) and edges as (from, to, label)."""
+    return FlowchartStructure(
+        nodes=[FlowchartNode(node_id, node_type, node_id.upper(), position) for node_id, node_type, position in nodes],
+        connections=[FlowchartConnection(a, b, label) for a, b, label in edges]
+    )
+
+
+def _overlaps(a, b) -> bool:
+    """Whether two boxes share interior (touching edges don't count)."""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _segment_box(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1]))
+
+
+def _assert_orthogonal(route):
+    assert len(route) >= 2
+    for a, b in zip(route, route[1:]):
+        assert a != b
+        assert a[0] == b[0] or a[1] == b[1]
+    # Corners always turn: no two consecutive segments on one line
+    for a, b, c in zip(route, route[1:], route[2:]):
+        assert not (a[0] == b[0] == c[0] or a[1] == b[1] == c[1])
+
+
+def _assert_avoids_nodes(chart):
+    boxes = [node_box(node) for node in chart.nodes]
+    for edge in chart.connections:
+        for a, b in zip(edge.route, edge.route[1:]):
+            assert not any(_overlaps(_segment_box(a, b), box) for box in boxes), (edge.from_node, edge.to_node, a, b)
+
+
+def _on_border(point, box) -> bool:
+    x, y = point
+    x0, y0, x1, y1 = box
+    inside = x0 <= x <= x1 and y0 <= y <= y1
+    return inside and (x in (x0, x1) or y in (y0, y1))
+
+
+def test_straight_edge_leaves_bottom_and_enters_top():
+    chart = route_edges(_chart(
+        [("a", NodeType.PROCESS, (0.0, 2.0)), ("b", NodeType.PROCESS, (0.0, -2.0))],
+        [("a", "b", "")]
+    ))
+    assert chart.connections[0].route == [(0.0, 1.5), (0.0, -1.5)]
+
+
+def test_routes_are_orthogonal_and_end_on_their_nodes():
+    chart = _chart(
+        [
+            ("s", NodeType.START, (0.0, 0.0)), ("d", NodeType.DECISION, (0.0, 0.0)),
+            ("p", NodeType.PROCESS, (0.0, 0.0)), ("q", NodeType.PROCESS, (0.0, 0.0)),
+            ("e", NodeType.END, (0.0, 0.0))
+        ],
+        [("s", "d", ""), ("d", "p", "yes"), ("d", "q", "no"), ("p", "e", ""), ("q", "e", ""), ("q", "d", "retry")]
+    )
+    layered_layout(chart)
+    route_edges(chart)
+    nodes = chart.node_index()
+    for edge in chart.connections:
+        _assert_orthogonal(edge.route)
+        assert _on_border(edge.route[0], node_box(nodes[edge.from_node]))
+        assert _on_border(edge.route[-1], node_box(nodes[edge.to_node]))
+    _assert_avoids_nodes(chart)
+
+
+def test_edge_detours_around_a_node_in_the_way():
+    chart = route_edges(_chart(
+        [
+            ("a", NodeType.PROCESS, (0.0, 3.0)),
+            ("blocker", NodeType.PROCESS, (0.0, 0.0)),
+            ("b", NodeType.PROCESS, (0.0, -3.0))
+        ],
+        [("a", "b", "")]
+    ))
+    route = chart.connections[0].route
+    _assert_orthogonal(route)
+    assert len(route) > 2
+    _assert_avoids_nodes(chart)
+
+
+def test_edges_sharing_a_side_get_separate_ports():
+    chart = route_edges(_chart(
+        [
+            ("a", NodeType.PROCESS, (0.0, 2.0)),
+            ("left", NodeType.PROCESS, (-3.0, -2.0)),
+            ("right", NodeType.PROCESS, (3.0, -2.0))
+        ],
+        [("a", "right", ""), ("a", "left", "")]
+    ))
+    to_right, to_left = (edge.route[0] for edge in chart.connections)
+    assert to_right[1] == to_left[1] == 1.5
+    # Spread along the bottom side, ordered by where the other end lies
+    assert to_left[0] < 0.0 < to_right[0]
+
+
+def test_self_loop_leaves_right_and_returns_on_top():
+    chart = route_edges(_chart([("a", NodeType.PROCESS, (0.0, 0.0))], [("a", "a", "again")]))
+    route = chart.connections[0].route
+    _assert_orthogonal(route)
+    box = node_box(chart.nodes[0])
+    assert route[0][0] == box[2] and route[-1][1] == box[3]
+
+
+def test_labels_avoid_nodes_edges_and_each_other():
+    chart = _chart(
+        [
+            ("s", NodeType.START, (0.0, 0.0)), ("d", NodeType.DECISION, (0.0, 0.0)),
+            ("p", NodeType.PROCESS, (0.0, 0.0)), ("q", NodeType.PROCESS, (0.0, 0.0))
+        ],
+        [("s", "d", ""), ("d", "p", "no"), ("d", "q", "yes"), ("q", "d", "retry"), ("p", "q", "then")]
+    )
+    layered_layout(chart)
+    route_edges(chart)
+    labelled = [edge for edge in chart.connections if edge.label]
+    boxes = [node_box(node) for node in chart.nodes]
+    labels = [_label_box(edge.label, edge.label_position) for edge in labelled]
+    for i, label in enumerate(labels):
+        assert not any(_overlaps(label, box) for box in boxes)
+        assert not any(_overlaps(label, other) for other in labels[i + 1:])
+        for edge in chart.connections:
+            for a, b in zip(edge.route, edge.route[1:]):
+                assert not _overlaps(label, _segment_box(a, b))
+
+
+def test_keep_existing_leaves_given_routes_and_labels():
+    chart = _chart(
+        [("a", NodeType.PROCESS, (0.0, 2.0)), ("b", NodeType.PROCESS, (0.0, -2.0))],
+        [("a", "b", "go"), ("b", "a", "")]
+    )
+    given = [(1.0, 2.0), (2.0, 2.0), (2.0, -2.0), (1.0, -2.0)]
+    chart.connections[0].route = list(given)
+    chart.connections[0].label_position = (2.5, 0.0)
+    route_edges(chart, keep_existing=True)
+    assert chart.connections[0].route == given
+    assert chart.connections[0].label_position == (2.5, 0.0)
+    # The edge without a route is routed
+    _assert_orthogonal(chart.connections[1].route)
+
+    # Without keep_existing every edge is routed again and its label re-placed
+    route_edges(chart)
+    assert chart.connections[0].route == [(0.0, 1.5), (0.0, -1.5)]
+    assert chart.connections[0].label_position != (2.5, 0.0)
+
+
+def test_edges_to_unknown_nodes_are_ignored():
+    chart = _chart([("a", NodeType.PROCESS, (0.0, 0.0))], [("a", "ghost", "")])
+    route_edges(chart)
+    assert chart.connections[0].route == []
@@ -0,0 +1,141 @@
+"""
+Tests for the API's handling of evicted videos.
+The index and storage are swapped for ones in a temporary directory, and
+re-rendering is replaced by a recorder, so no video is rendered.
+"""
+import sys
+import uuid
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+import main
+from services.manim_generator import VideoResult
+from services.quota_manager import DiskQuotaManager
+from services.storage import LocalStorage, video_key
+from services.video_index import VideoIndex
+
+# The real re-render task; the fixture swaps it for a recorder
+_regenerate_video_background = main.regenerate_video_background
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """The app with its own index and storage; returns the client and the re-render calls."""
+    index = VideoIndex(tmp_path / "index.db")
+    storage = LocalStorage(tmp_path / "videos")
+    regenerated = []
+
+    async def regenerate(video_id):
+        regenerated.append(video_id)
+
+    monkeypatch.setattr(main, "video_index", index)
+    monkeypatch.setattr(main, "storage", storage)
+    monkeypatch.setattr(main, "generation_status", {})
+    monkeypatch.setattr(main, "regenerate_video_background", regenerate)
+    # Without lifespan: no cleanup loop or model warm-up
+    yield TestClient(main.app), index, storage, regenerated
+    index.close()
+
+
+def _completed_video(index: VideoIndex, storage: LocalStorage, size: int = 1000) -> str:
+    """A finished job as the generation task leaves it: file stored, spec saved, status completed."""
+    video_id = str(uuid.uuid4())
+    index.record_job(video_id, "Start, then stop", "low_quality", "mp4")
+    index.save_job_spec(video_id, {"title": "Chart", "nodes": [], "connections": []}, {"include_audio": False})
+    with storage.open_writer(video_key(video_id)) as writer:
+        writer.write(b"v" * size)
+    index.record_result(video_id, success=True, size_bytes=size, duration=4.0)
+    main.generation_status[video_id] = "completed"
+    return video_id
+
+
+def _status(client: TestClient, video_id: str) -> dict:
+    response = client.get(f"/api/video-status/{video_id}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_poll_after_eviction_schedules_regeneration(api):
+    client, index, storage, regenerated = api
+    video_id = _completed_video(index, storage)
+    assert _status(client, video_id)["status"] == "completed"
+
+    quota = DiskQuotaManager(index, storage, quota_bytes=1, max_idle_days=None, on_evicted=main.note_evicted)
+    assert quota.enforce()["evicted"] == 1
+    assert main.generation_status[video_id] == "evicted"
+    assert not storage.exists(video_key(video_id))
+
+    body = _status(client, video_id)
+    assert body["status"] == "regenerating"
+    assert body["video_url"] is None
+    assert regenerated == [video_id]
+    assert index.get(video_id)["status"] == "regenerating"
+
+    # Further polls wait for the queued re-render instead of queueing another
+    assert _status(client, video_id)["status"] == "regenerating"
+    assert regenerated == [video_id]
+
+
+def test_poll_after_eviction_by_another_worker(api):
+    client, index, storage, regenerated = api
+    video_id = _completed_video(index, storage)
+
+    # Another worker's quota run: this worker's memory still says completed
+    DiskQuotaManager(index, storage, quota_bytes=1, max_idle_days=None).enforce()
+    assert main.generation_status[video_id] == "completed"
+
+    assert _status(client, video_id)["status"] == "regenerating"
+    assert regenerated == [video_id]
+
+
+def test_lost_video_is_regenerated_on_download(api):
+    client, index, storage, regenerated = api
+    video_id = _completed_video(index, storage)
+    storage.delete(video_key(video_id))
+
+    response = client.get(f"/api/videos/{video_id}")
+    assert response.status_code == 202
+    assert response.json()["status"] == "regenerating"
+    assert regenerated == [video_id]
+    assert index.get(video_id)["status"] == "regenerating"
+
+
+def test_missing_video_without_spec_is_reported_failed(api):
+    client, index, storage, regenerated = api
+    video_id = str(uuid.uuid4())
+    index.record_job(video_id, "Start, then stop")
+    index.record_result(video_id, success=True, size_bytes=10)
+    main.generation_status[video_id] = "completed"
+
+    assert _status(client, video_id)["status"] == "failed"
+    assert regenerated == []
+
+
+class _FailingGenerator:
+    """Stands in for the Manim generator: every render fails."""
+
+    async def generate_video(self, flowchart, video_id):
+        return VideoResult(success=False, error_message="render crashed")
+
+
+def test_failed_regeneration_returns_to_evicted(api, monkeypatch):
+    client, index, storage, regenerated = api
+    video_id = _completed_video(index, storage)
+    DiskQuotaManager(index, storage, quota_bytes=1, max_idle_days=None, on_evicted=main.note_evicted).enforce()
+    assert _status(client, video_id)["status"] == "regenerating"
+
+    monkeypatch.setattr(main, "manim_generator", _FailingGenerator())
+    asyncio.run(_regenerate_video_background(video_id))
+    assert main.generation_status[video_id] == "evicted"
+    record = index.get(video_id)
+    assert (record["status"], record["error"]) == ("evicted", "render crashed")
+
+    # The spec is kept, so the next poll queues another attempt
+    assert _status(client, video_id)["status"] == "regenerating"
+    assert regenerated == [video_id, video_id]
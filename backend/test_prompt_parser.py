@@ -0,0 +1,58 @@
+"""
+Tests for splitting natural-language prompts into flowchart steps.
+"""
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.prompt_parser import PromptParser, _split_steps
+
+
+def _steps(prompt: str) -> list:
+    return PromptParser()._extract_steps(PromptParser()._clean_prompt(prompt))
+
+
+def test_arrows_bullets_and_dashes_separate_steps():
+    assert _steps("Open the app -> sign in → load the dashboard") == [
+        "open the app", "sign in", "load the dashboard"
+    ]
+    assert _steps("• collect data • clean it - train the follow-up model") == [
+        "collect data", "clean it", "train the follow-up model"
+    ]
+
+
+def test_numbered_list_markers_separate_steps():
+    assert _steps("1. mix the flour 2. bake for 20 min. 3. serve") == [
+        "mix the flour", "bake for 20 min.", "serve"
+    ]
+    assert _steps("1) mix 2) bake 3) serve") == ["mix", "bake", "serve"]
+    # A list keeps the delimiter it started with
+    assert _split_steps("1. mix 2) bake") == ["", " mix 2) bake"]
+
+
+def test_number_ending_a_step_is_kept():
+    assert _steps("start the job -> wait 5. then retry -> done") == [
+        "start the job", "wait 5. then retry", "done"
+    ]
+    assert _split_steps("start → wait 5.") == ["start ", " wait 5."]
+
+
+def test_number_outside_the_list_sequence_is_kept():
+    assert _steps("1) fetch 2) retry up to 3. times 3) report") == [
+        "fetch", "retry up to 3. times", "report"
+    ]
+
+
+def test_list_may_start_at_any_number_at_the_prompt_start():
+    assert [part.strip() for part in _split_steps("2. a 3. b")] == ["", "a", "b"]
+    # Elsewhere only a list starting at 1 counts
+    assert _split_steps("check in 2) then go") == ["check in 2) then go"]
+
+
+def test_structure_keeps_numbers_in_node_text():
+    flowchart = PromptParser().parse_prompt("Start the server -> wait 5. -> check health -> done")
+    texts = [node.text for node in flowchart.nodes]
+    assert "Wait 5." in texts
+    assert "" not in texts
@@ -0,0 +1,125 @@
+"""
+Tests for evicting stored videos under the disk quota.
+The index and storage live in a temporary directory.
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.quota_manager import DiskQuotaManager
+from services.storage import LocalStorage, video_key
+from services.video_index import VideoIndex
+
+DAY = 86400
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VideoIndex(tmp_path / "index.db")
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(tmp_path / "videos")
+
+
+def _stored_video(index: VideoIndex, storage: LocalStorage, video_id: str, size: int, accessed_at: float):
+    """A completed job with its file stored and its spec saved, last accessed at accessed_at."""
+    index.record_job(video_id, f"Prompt for {video_id}")
+    index.save_job_spec(video_id, {"title": video_id, "nodes": [], "connections": []}, {})
+    with storage.open_writer(video_key(video_id)) as writer:
+        writer.write(b"v" * size)
+    index.record_result(video_id, success=True, size_bytes=size)
+    index._write("UPDATE videos SET accessed_at = ? WHERE video_id = ?", (accessed_at, video_id))
+
+
+def test_under_quota_nothing_is_evicted(index, storage):
+    now = time.time()
+    for i in range(3):
+        _stored_video(index, storage, f"v{i}", 100, now - i)
+    quota = DiskQuotaManager(index, storage, quota_bytes=300, max_idle_days=None)
+    assert quota.enforce() == {"evicted": 0, "bytes_freed": 0}
+    assert all(storage.exists(video_key(f"v{i}")) for i in range(3))
+
+
+def test_least_recently_accessed_are_evicted_down_to_the_low_watermark(index, storage):
+    now = time.time()
+    for i in range(4):
+        _stored_video(index, storage, f"v{i}", 100, now - 100 + i)
+    evicted = []
+    quota = DiskQuotaManager(
+        index, storage, quota_bytes=250, low_watermark=0.5, max_idle_days=None, on_evicted=evicted.append
+    )
+
+    # 400 bytes against a 250-byte quota: evict the oldest until at most 125 remain
+    assert quota.enforce() == {"evicted": 3, "bytes_freed": 300}
+    assert evicted == ["v0", "v1", "v2"]
+    assert [index.get(f"v{i}")["status"] for i in range(4)] == ["evicted"] * 3 + ["completed"]
+    assert [storage.exists(video_key(f"v{i}")) for i in range(4)] == [False, False, False, True]
+    assert index.get_stats()["total_bytes"] == 100
+    assert quota.get_stats()["total_evicted"] == 3
+
+    # The saved spec survives eviction, so the video can be rendered again
+    assert index.get("v0")["structure"] == {"title": "v0", "nodes": [], "connections": []}
+
+
+def test_idle_videos_are_evicted_even_under_quota(index, storage):
+    now = time.time()
+    _stored_video(index, storage, "stale", 100, now - 3 * DAY)
+    _stored_video(index, storage, "fresh", 100, now)
+    quota = DiskQuotaManager(index, storage, quota_bytes=10_000, max_idle_days=2)
+    assert quota.enforce() == {"evicted": 1, "bytes_freed": 100}
+    assert index.get("stale")["status"] == "evicted"
+    assert index.get("fresh")["status"] == "completed"
+
+
+def test_only_completed_videos_are_evicted(index, storage):
+    now = time.time()
+    _stored_video(index, storage, "done", 100, now - 10)
+    _stored_video(index, storage, "busy", 100, now - 20)
+    index.update_status("busy", "regenerating")
+    evicted = []
+    quota = DiskQuotaManager(index, storage, quota_bytes=50, max_idle_days=None, on_evicted=evicted.append)
+    quota.enforce()
+    assert evicted == ["done"]
+    assert index.get("busy")["status"] == "regenerating"
+    assert storage.exists(video_key("busy"))
+
+
+def test_failing_callback_does_not_stop_eviction(index, storage):
+    now = time.time()
+    for i in range(2):
+        _stored_video(index, storage, f"v{i}", 100, now - 10 + i)
+
+    def fail(video_id):
+        raise RuntimeError("status store unavailable")
+
+    quota = DiskQuotaManager(index, storage, quota_bytes=50, max_idle_days=None, on_evicted=fail)
+    assert quota.enforce()["evicted"] == 2
+    assert index.get_stats()["total_bytes"] == 0
+
+
+def test_failed_regeneration_can_be_evicted_again_once_rendered(index, storage):
+    now = time.time()
+    _stored_video(index, storage, "v", 100, now - 10)
+    quota = DiskQuotaManager(index, storage, quota_bytes=50, max_idle_days=None)
+    quota.enforce()
+
+    # A re-render that fails puts the video back to evicted, not failed
+    index.update_status("v", "regenerating")
+    index.record_regeneration_failure("v", "render crashed")
+    record = index.get("v")
+    assert (record["status"], record["error"]) == ("evicted", "render crashed")
+    assert quota.enforce()["evicted"] == 0
+
+    # A later successful re-render counts against the quota again
+    _stored_video(index, storage, "v", 100, now)
+    assert quota.enforce() == {"evicted": 1, "bytes_freed": 100}
+    assert not storage.exists(video_key("v"))
@@ -0,0 +1,160 @@
+"""
+Tests for the scene pre-flight checks run before a job takes a render slot.
+"""
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.edge_router import route_edges
+from services.prompt_parser import FlowchartConnection, FlowchartNode, FlowchartStructure, NodeType
+from services.scene_preflight import check_scene_data
+
+FRAME = (14.0, 8.0)
+
+
+def _scene(**changes) -> dict:
+    """Scene data for start -> check -> end, in the shape _build_scene_data writes."""
+    scene = {
+        "version": 1,
+        "title": "Deploy",
+        "title_cue": [1.0, 1.0, None],
+        "nodes": [["start", "Start", 0.0, 2.5], ["decision", "Tests pass?", 0.0, 0.0], ["end", "Done", 0.0, -2.5]],
+        "edges": [
+            [0, 1, "", [[0.0, 1.7], [0.0, 0.5]], None],
+            [1, 2, "yes", [[0.0, -0.5], [0.0, -1.7]], [0.5, -1.1]]
+        ],
+        "cues": [[0, 0.8, 0.3, None], [1, 0.8, 0.3, None], [2, 0.8, 0.3, None]],
+        "camera": {"follow": False, "margin": 1.0},
+        "timing": {"title_fade": 1.0, "edge_reveal": 0.5, "edge_hold": 0.2, "final_hold": 2.0, "fade_out": 1.0}
+    }
+    scene.update(copy.deepcopy(changes))
+    return scene
+
+
+def _check(scene: dict, **kwargs):
+    return check_scene_data(scene, frame=FRAME, **kwargs)
+
+
+def test_valid_scene_passes():
+    report = _check(_scene())
+    assert report.ok
+    assert report.errors == [] and report.warnings == []
+    assert report.elapsed >= 0
+
+
+def test_missing_sections_are_reported():
+    scene = _scene()
+    del scene["cues"]
+    assert _check(scene).errors == ["Malformed scene data: missing 'cues'"]
+
+
+def test_route_ending_in_a_zero_length_segment_is_an_error():
+    scene = _scene()
+    scene["edges"][0][3] = [[0.0, 1.7], [0.0, 0.5], [0.0, 0.5]]
+    assert _check(scene).errors == ["Zero-length arrow tips: edge 0"]
+
+    # A repeated point before the last segment still leaves the tip a direction
+    scene["edges"][0][3] = [[0.0, 1.7], [0.0, 1.7], [0.0, 0.5]]
+    assert _check(scene).ok
+
+
+@pytest.mark.parametrize("route", [[], [[0.0, 1.7]], [[0.0, 1.7], [0.0, float("nan")]], [[0.0, 1.7], [0.0]]])
+def test_malformed_routes_are_errors(route):
+    scene = _scene()
+    scene["edges"][0][3] = route
+    assert _check(scene).errors == ["Edges with a malformed route or label position: edge 0"]
+
+
+def test_labelled_edge_needs_a_label_position():
+    scene = _scene()
+    scene["edges"][1][4] = None
+    assert _check(scene).errors == ["Edges with a malformed route or label position: edge 1 label"]
+
+
+def test_dangling_indices_and_bad_positions():
+    scene = _scene()
+    scene["edges"].append([0, 7, "", [[0.0, 0.0], [1.0, 0.0]], None])
+    scene["cues"].append([9, 0.8, 0.3, None])
+    scene["nodes"][1][2] = float("inf")
+    assert _check(scene).errors == [
+        "Nodes with non-finite positions: node 1",
+        "References to missing nodes: edge 2, cue for node 9"
+    ]
+
+
+def test_text_limits():
+    scene = _scene(title="x" * 11)
+    scene["nodes"][0][1] = "bad\0text"
+    scene["nodes"][1][1] = None
+    assert _check(scene, max_text_length=10).errors == [
+        "Texts longer than 10 characters: title (11)",
+        "Texts that are not strings or contain NUL characters: node 0, node 1"
+    ]
+
+
+def test_node_count_limits():
+    assert _check(_scene(), max_nodes=2).errors[0] == "Flowchart has 3 nodes (max 2)"
+    assert _check(_scene(nodes=[], edges=[], cues=[])).errors == ["Flowchart has no nodes"]
+
+
+def test_problems_are_summarized_after_a_few_examples():
+    scene = _scene()
+    scene["cues"] = [[i % 3, 0.0, 0.3, None] for i in range(5)]
+    assert _check(scene).errors == ["Non-positive run times or holds: node 0, node 1, node 2 and 2 more"]
+
+
+def test_timing_and_camera_values():
+    scene = _scene(title_cue=[1.0, -1.0, None])
+    scene["timing"]["fade_out"] = 0
+    scene["camera"]["margin"] = 5.0
+    assert _check(scene).errors == [
+        "Invalid camera-follow margin: 5.0",
+        "Non-positive run times or holds: title, scene timing"
+    ]
+
+
+def test_narration_clips_are_checked_only_when_asked(tmp_path):
+    clip = tmp_path / "title.m4a"
+    clip.write_bytes(b"clip")
+    scene = _scene(title_cue=[1.0, 1.0, str(clip)])
+    scene["cues"][0][3] = str(tmp_path / "missing.m4a")
+    assert _check(scene).errors == [f"Missing narration clips: node 0 ({tmp_path / 'missing.m4a'})"]
+    assert _check(scene, check_clips=False).ok
+
+
+def test_nodes_outside_the_frame_warn_unless_the_camera_follows():
+    scene = _scene()
+    scene["nodes"][2][3] = -10.0
+    report = _check(scene)
+    assert report.ok
+    assert report.warnings == ["Nodes outside the frame: node 2 at (0, -10)"]
+
+    scene["camera"]["follow"] = True
+    assert _check(scene).warnings == []
+
+
+def _chart(route) -> FlowchartStructure:
+    return FlowchartStructure(
+        nodes=[
+            FlowchartNode("a", NodeType.PROCESS, "A", (0.0, 2.0)),
+            FlowchartNode("b", NodeType.PROCESS, "B", (0.0, -2.0))
+        ],
+        connections=[FlowchartConnection("a", "b", route=route)]
+    )
+
+
+def test_kept_routes_lose_repeated_points():
+    chart = route_edges(_chart([(0.0, 1.5), (0.0, 0.0), (0.0, -1.5), (0.0, -1.5)]), keep_existing=True)
+    assert chart.connections[0].route == [(0.0, 1.5), (0.0, -1.5)]
+
+
+def test_kept_routes_collapsing_to_one_point_are_rerouted():
+    chart = route_edges(_chart([(0.0, 1.5), (0.0, 1.5)]), keep_existing=True)
+    route = chart.connections[0].route
+    assert route[0] == (0.0, 1.5) and route[-1] == (0.0, -1.5)
+    assert len(route) >= 2 and route[-2] != route[-1]
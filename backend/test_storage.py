@@ -0,0 +1,162 @@
+"""
+Tests for the artifact storage backends.
+LocalStorage runs against a temporary directory; S3Storage against a local
+S3-compatible stub (moto's server mode), the same way it talks to MinIO.
+"""
+import os
+import sys
+import socket
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.storage import LocalStorage, S3Storage, _S3MultipartWriter, video_key
+
+PART_SIZE = _S3MultipartWriter.MIN_PART_SIZE
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """A local S3 stub on a free port, with throwaway credentials."""
+    server_module = pytest.importorskip("moto.server")
+    pytest.importorskip("boto3")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    port = _free_port()
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(s3_endpoint, request):
+    bucket = f"test-{request.node.name.replace('_', '-')[:40].lower()}"
+    storage = S3Storage(bucket=bucket, endpoint_url=s3_endpoint, prefix="videos/", part_size=PART_SIZE)
+    storage.client.create_bucket(Bucket=bucket)
+    return storage
+
+
+def _open_uploads(storage: S3Storage):
+    return storage.client.list_multipart_uploads(Bucket=storage.bucket).get("Uploads", [])
+
+
+def _objects(storage: S3Storage):
+    return [o["Key"] for o in storage.client.list_objects_v2(Bucket=storage.bucket).get("Contents", [])]
+
+
+# LocalStorage
+
+def test_local_writer_commits_atomically(tmp_path):
+    storage = LocalStorage(tmp_path)
+    with storage.open_writer("a.mp4") as writer:
+        writer.write(b"abc")
+        writer.write(b"def")
+        assert not storage.exists("a.mp4")
+    assert storage.size("a.mp4") == 6
+    assert (tmp_path / "a.mp4").read_bytes() == b"abcdef"
+    assert storage.local_path("a.mp4") == (tmp_path / "a.mp4").resolve()
+    assert storage.presigned_url("a.mp4") is None
+
+
+def test_local_writer_aborts_on_error(tmp_path):
+    storage = LocalStorage(tmp_path)
+    with pytest.raises(RuntimeError):
+        with storage.open_writer("a.mp4") as writer:
+            writer.write(b"partial")
+            raise RuntimeError("mux failed")
+    assert not storage.exists("a.mp4")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_local_put_file_moves_and_delete(tmp_path):
+    storage = LocalStorage(tmp_path / "store")
+    source = tmp_path / "render.mp4"
+    source.write_bytes(b"x" * 100)
+    assert storage.put_file(video_key("job"), source) == 100
+    assert not source.exists()
+    assert storage.size("job.mp4") == 100
+    assert storage.delete("job.mp4") is True
+    assert storage.delete("job.mp4") is False
+    assert storage.size("job.mp4") is None
+
+
+def test_local_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(tmp_path)
+    with pytest.raises(ValueError):
+        storage.open_writer("../escape.mp4")
+
+
+# S3Storage
+
+def test_s3_small_artifact_uses_single_put(s3):
+    with s3.open_writer("small.mp4") as writer:
+        writer.write(b"tiny video")
+    assert writer._upload_id is None
+    assert s3.size("small.mp4") == len(b"tiny video")
+    assert _objects(s3) == ["videos/small.mp4"]
+    assert _open_uploads(s3) == []
+
+
+def test_s3_multipart_upload_commits_all_parts(s3):
+    data = os.urandom(2 * PART_SIZE + 1234)
+    with s3.open_writer("big.mp4") as writer:
+        # Write in uneven chunks so parts fill across write boundaries
+        for start in range(0, len(data), 1_000_003):
+            writer.write(data[start:start + 1_000_003])
+    assert len(writer._parts) >= 2
+    assert s3.size("big.mp4") == len(data)
+    body = s3.client.get_object(Bucket=s3.bucket, Key="videos/big.mp4")["Body"].read()
+    assert body == data
+    assert _open_uploads(s3) == []
+
+
+def test_s3_multipart_upload_aborted_partway_leaves_nothing(s3):
+    with pytest.raises(RuntimeError):
+        with s3.open_writer("aborted.mp4") as writer:
+            writer.write(os.urandom(PART_SIZE + 10))
+            # One part is already uploaded when the mux fails
+            assert writer._upload_id is not None and len(writer._parts) == 1
+            raise RuntimeError("ffmpeg exited with status 1")
+    assert not s3.exists("aborted.mp4")
+    assert _objects(s3) == []
+    assert _open_uploads(s3) == []
+
+
+def test_s3_put_file_and_delete(s3, tmp_path):
+    source = tmp_path / "render.mp4"
+    source.write_bytes(b"y" * 4096)
+    assert s3.put_file("job.mp4", source) == 4096
+    assert not source.exists()
+    assert s3.exists("job.mp4")
+    assert s3.delete("job.mp4") is True
+    assert s3.size("job.mp4") is None
+
+
+def test_s3_presigned_url_downloads_the_artifact(s3):
+    with s3.open_writer("signed.mp4") as writer:
+        writer.write(b"signed bytes")
+    url = s3.presigned_url("signed.mp4", expires_in=60)
+    assert "X-Amz-Signature=" in url and "X-Amz-Expires=60" in url
+    with urllib.request.urlopen(url) as response:
+        assert response.read() == b"signed bytes"
+        assert response.headers["Content-Type"] == "video/mp4"
+
+
+def test_s3_subtitles_are_stored_and_served_as_webvtt(s3):
+    with s3.open_writer("job.en.vtt") as writer:
+        writer.write(b"WEBVTT\n")
+    head = s3.client.head_object(Bucket=s3.bucket, Key="videos/job.en.vtt")
+    assert head["ContentType"] == "text/vtt"
+    with urllib.request.urlopen(s3.presigned_url("job.en.vtt", expires_in=60)) as response:
+        assert response.headers["Content-Type"] == "text/vtt"
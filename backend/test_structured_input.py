@@ -0,0 +1,222 @@
+"""
+Tests for the Mermaid, Graphviz DOT and JSON flowchart parsers.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.prompt_parser import NodeType
+from services.structured_input import (
+    StructuredInputError, parse_dot, parse_json_structure, parse_mermaid, parse_structured
+)
+
+
+def _nodes(flowchart) -> list:
+    return [(node.id, node.type, node.text) for node in flowchart.nodes]
+
+
+def _edges(flowchart) -> list:
+    return [(edge.from_node, edge.to_node, edge.label) for edge in flowchart.connections]
+
+
+def _assert_laid_out(flowchart):
+    """Every node placed, every edge routed, derived fields filled in."""
+    assert len({node.position for node in flowchart.nodes}) == len(flowchart.nodes)
+    assert all(edge.route for edge in flowchart.connections)
+    assert all(node.color and node.narration for node in flowchart.nodes)
+    assert flowchart.estimated_duration > 0
+
+
+# Mermaid
+
+def test_mermaid_shapes_labels_and_title():
+    flowchart = parse_mermaid(
+        "---\n"
+        "title: Login\n"
+        "---\n"
+        "flowchart TD\n"
+        "  A([Start]) --> B{Valid?}\n"
+        "  B -->|yes| C[Dashboard]\n"
+        "  B -- no --> D[/Show error/]\n"
+        "  %% a comment\n"
+        "  C & D --> E((Done))\n"
+    )
+    assert flowchart.title == "Login"
+    assert _nodes(flowchart) == [
+        ("A", NodeType.START, "Start"),
+        ("B", NodeType.DECISION, "Valid?"),
+        ("C", NodeType.PROCESS, "Dashboard"),
+        ("D", NodeType.INPUT_OUTPUT, "Show error"),
+        ("E", NodeType.END, "Done")
+    ]
+    assert _edges(flowchart) == [
+        ("A", "B", ""), ("B", "C", "yes"), ("B", "D", "no"), ("C", "E", ""), ("D", "E", "")
+    ]
+    _assert_laid_out(flowchart)
+
+
+def test_mermaid_chained_links_and_bare_ids():
+    flowchart = parse_mermaid("graph LR; a --> b --> c")
+    assert _nodes(flowchart) == [
+        ("a", NodeType.PROCESS, "a"), ("b", NodeType.PROCESS, "b"), ("c", NodeType.PROCESS, "c")
+    ]
+    assert _edges(flowchart) == [("a", "b", ""), ("b", "c", "")]
+
+
+@pytest.mark.parametrize("source", [
+    "A --> B",
+    "flowchart TD\n  A --> ",
+    "flowchart TD\n  %% only a comment"
+])
+def test_mermaid_invalid_definitions(source):
+    with pytest.raises(StructuredInputError):
+        parse_mermaid(source)
+
+
+# Graphviz DOT
+
+def test_dot_shapes_labels_and_title():
+    flowchart = parse_dot(
+        'digraph deploy {\n'
+        '  label="Deploy";\n'
+        '  node [shape=box];\n'
+        '  start [shape=ellipse, label="Start"];\n'
+        '  check [shape=diamond label="Tests pass?"];\n'
+        '  start -> build -> check;  // chained\n'
+        '  check -> ship [label=yes];\n'
+        '  check -> {fix; start} [label=no];\n'
+        '  ship -> done;\n'
+        '  done [shape=oval label="Done"]\n'
+        '}'
+    )
+    assert flowchart.title == "Deploy"
+    assert _nodes(flowchart) == [
+        # Mentioning start again inside the subgraph keeps its shape
+        ("start", NodeType.END, "Start"),
+        ("build", NodeType.PROCESS, "build"),
+        ("check", NodeType.DECISION, "Tests pass?"),
+        ("ship", NodeType.PROCESS, "ship"),
+        ("fix", NodeType.PROCESS, "fix"),
+        ("done", NodeType.END, "Done")
+    ]
+    assert _edges(flowchart) == [
+        ("start", "build", ""), ("build", "check", ""), ("check", "ship", "yes"),
+        ("check", "fix", "no"), ("check", "start", "no"), ("ship", "done", "")
+    ]
+    _assert_laid_out(flowchart)
+
+
+def test_dot_terminal_without_incoming_edges_is_a_start_node():
+    flowchart = parse_dot('graph { a [shape=circle]; a -- b }')
+    assert _nodes(flowchart)[0] == ("a", NodeType.START, "a")
+    assert _edges(flowchart) == [("a", "b", "")]
+
+
+@pytest.mark.parametrize("source", [
+    "flowchart TD; A --> B",
+    "digraph { a -> }",
+    "digraph { a -> b } extra",
+    "digraph { a ? b }",
+    "digraph { }"
+])
+def test_dot_invalid_definitions(source):
+    with pytest.raises(StructuredInputError):
+        parse_dot(source)
+
+
+# JSON
+
+def _json_payload(**changes) -> dict:
+    payload = {
+        "title": "Checkout",
+        "nodes": [
+            {"id": "a", "type": "start", "text": "Start"},
+            {"id": "b", "type": "decision", "text": "Paid?"},
+            {"id": "c", "type": "end", "text": "Ship"}
+        ],
+        "connections": [
+            {"from_node": "a", "to_node": "b"},
+            {"from_node": "b", "to_node": "c", "label": "yes"}
+        ]
+    }
+    payload.update(changes)
+    return payload
+
+
+def test_json_structure_is_laid_out_without_positions():
+    flowchart = parse_json_structure(_json_payload())
+    assert flowchart.title == "Checkout"
+    assert _nodes(flowchart) == [
+        ("a", NodeType.START, "Start"), ("b", NodeType.DECISION, "Paid?"), ("c", NodeType.END, "Ship")
+    ]
+    assert _edges(flowchart) == [("a", "b", ""), ("b", "c", "yes")]
+    _assert_laid_out(flowchart)
+
+
+def test_json_structure_keeps_given_positions_and_colors():
+    payload = _json_payload()
+    for i, node in enumerate(payload["nodes"]):
+        node["position"] = [i * 3.0, 1.0]
+    payload["nodes"][1]["color"] = "#123456"
+    flowchart = parse_structured("json", payload)
+    assert [node.position for node in flowchart.nodes] == [(0.0, 1.0), (3.0, 1.0), (6.0, 1.0)]
+    assert flowchart.nodes[1].color == "#123456"
+
+
+def test_json_structure_round_trips_through_to_dict():
+    flowchart = parse_json_structure(_json_payload())
+    assert parse_json_structure(flowchart.to_dict()).to_dict() == flowchart.to_dict()
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"connections": [{"from_node": ["a"], "to_node": "a"}]}, "'from_node' must be a string"),
+    ({"connections": [{"from_node": "a", "to_node": {"id": "b"}}]}, "'to_node' must be a string"),
+    ({"connections": [{"from_node": "a", "to_node": "x"}]}, "unknown node"),
+    ({"connections": [{"from_node": "a"}]}, "Invalid flowchart structure"),
+    ({"nodes": [{"id": "a", "type": "start", "text": "Start", "color": 5}]}, "'color' must be a string"),
+    ({"nodes": [{"id": "a", "type": "start", "text": 7}]}, "'text' must be a string"),
+    ({"nodes": [{"id": "a", "type": "blob", "text": "Start"}]}, "Invalid flowchart structure"),
+    ({"nodes": [{"id": "a", "type": "start", "text": "A"}, {"id": "a", "type": "end", "text": "B"}]},
+     "unique"),
+    ({"estimated_duration": "x"}, "'estimated_duration'"),
+    ({"estimated_duration": True}, "'estimated_duration'"),
+    ({"estimated_duration": float("inf")}, "'estimated_duration'"),
+    ({"title": ["Checkout"]}, "'title' must be a string"),
+    ({"nodes": []}, "non-empty 'nodes' list")
+])
+def test_json_structure_invalid_values(changes, message):
+    with pytest.raises(StructuredInputError, match=message):
+        parse_json_structure(_json_payload(**changes))
+
+
+def test_json_structure_mixed_positions_are_rejected():
+    payload = _json_payload()
+    payload["nodes"][0]["position"] = [0, 0]
+    with pytest.raises(StructuredInputError, match="every node or for none"):
+        parse_json_structure(payload)
+
+
+def test_json_string_input():
+    assert _nodes(parse_structured("json", '{"nodes": [{"id": "a", "type": "process", "text": "Only"}]}')) == [
+        ("a", NodeType.PROCESS, "Only")
+    ]
+    with pytest.raises(StructuredInputError, match="Invalid JSON"):
+        parse_structured("json", "{nodes: []}")
+
+
+def test_invalid_structure_is_a_bad_request():
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    # Without lifespan: no cleanup loop or model warm-up
+    response = TestClient(main.app).post("/api/preview", json={
+        "input_format": "json",
+        "structure": {"nodes": [{"id": "a", "type": "start", "text": "A"}],
+                      "connections": [{"from_node": ["a"], "to_node": "a"}]}
+    })
+    assert response.status_code == 400
+    assert "'from_node' must be a string" in response.json()["error"]
@@ -0,0 +1,398 @@
+"""
+Tests for the pooled TTS engine clients.
+GTTSEngine runs against a local stand-in for the Google Translate TTS endpoint,
+GoogleCloudTTSEngine against a local gRPC TextToSpeech server, and
+AzureTTSEngine against an in-process stand-in for the Speech SDK (the SDK
+talks to the service over its own websocket protocol).
+"""
+import io
+import sys
+import json
+import time
+import wave
+import base64
+import threading
+import urllib.parse
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services import tts_engines
+from services.tts_engines import GTTSEngine, AzureTTSEngine
+
+
+class StubTTSHandler(BaseHTTPRequestHandler):
+    """
+    Answers batchexecute requests like the real endpoint.
+
+    The "audio" of each chunk is the chunk text itself, so the bytes returned
+    by fetch_mp3 show which chunks were fetched and in what order. Behaviour
+    is set on the server: delay (seconds, or a function of the chunk text),
+    failures (number of 503 answers before succeeding) and empty (answer
+    without audio).
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        rpc = json.loads(form["f.req"][0])
+        chunk = json.loads(rpc[0][0][1])[0]
+
+        server = self.server
+        with server.lock:
+            server.chunks.append(chunk)
+            fail = server.failures > 0
+            if fail:
+                server.failures -= 1
+        if fail:
+            self._send(503, b"")
+            return
+
+        delay = server.delay(chunk) if callable(server.delay) else server.delay
+        time.sleep(delay)
+
+        if server.empty:
+            body = b")]}'\n\n[]\n"
+        else:
+            # Same compact JSON layout as the real response, which the engine's parser expects
+            audio = base64.b64encode(chunk.encode("utf-8")).decode("ascii")
+            inner = json.dumps([audio], separators=(",", ":"))
+            rpc = [["wrb.fr", GTTSEngine.RPC_ID, inner, None, None, None, "generic"]]
+            body = (")]}'\n\n" + json.dumps(rpc, separators=(",", ":")) + "\n").encode("utf-8")
+        self._send(200, body)
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(delay=0.0, failures: int = 0, empty: bool = False) -> ThreadingHTTPServer:
+    """Serve StubTTSHandler on a free local port in a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTTSHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.chunks = []
+    server.delay = delay
+    server.failures = failures
+    server.empty = empty
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stub_server():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gtts(stub_server):
+    engine = GTTSEngine(base_url=f"http://127.0.0.1:{stub_server.server_address[1]}", concurrency=4)
+    yield engine
+    engine.close()
+
+
+# Chunking
+
+def test_chunks_respect_the_character_limit():
+    text = ("word " * 70).strip() + ". " + "x" * 250
+    chunks = GTTSEngine.chunk_text(text)
+    assert all(0 < len(chunk) <= GTTSEngine.MAX_CHUNK_CHARS for chunk in chunks)
+    # Words are never split; an unbroken run is cut at exactly the limit
+    assert chunks[0].endswith("word") and len(chunks[0]) > GTTSEngine.MAX_CHUNK_CHARS - 5
+    assert chunks[-3:] == ["x" * 100, "x" * 100, "x" * 50]
+    assert " ".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_chunks_prefer_sentence_boundaries():
+    chunks = GTTSEngine.chunk_text("Start here. Then validate, and store!  Done?")
+    assert chunks == ["Start here.", "Then validate,", "and store!", "Done?"]
+
+
+def test_text_of_exactly_the_limit_is_one_chunk():
+    assert GTTSEngine.chunk_text("a" * GTTSEngine.MAX_CHUNK_CHARS) == ["a" * GTTSEngine.MAX_CHUNK_CHARS]
+    assert GTTSEngine.chunk_text("a" * (GTTSEngine.MAX_CHUNK_CHARS + 1)) == ["a" * 100, "a"]
+
+
+# Fetching
+
+def test_concurrent_chunks_are_reassembled_in_order(gtts, stub_server):
+    text = " ".join(f"Sentence number {i} of the narration." for i in range(12))
+    chunks = GTTSEngine.chunk_text(text)
+    # Earlier chunks answer last, so completion order is the reverse of text order
+    stub_server.delay = lambda chunk: 0.02 * (len(chunks) - chunks.index(chunk))
+
+    assert gtts.fetch_mp3(text) == "".join(chunks).encode("utf-8")
+    assert sorted(stub_server.chunks) == sorted(chunks)
+
+
+def test_server_errors_are_retried(gtts, stub_server):
+    stub_server.failures = 2
+    assert gtts.fetch_mp3("Retry me.") == b"Retry me."
+    assert stub_server.chunks == ["Retry me."] * 3
+
+
+def test_retries_are_bounded():
+    server = start_stub_server(failures=10)
+    engine = GTTSEngine(base_url=f"http://127.0.0.1:{server.server_address[1]}", max_retries=1)
+    try:
+        with pytest.raises(requests.exceptions.RetryError):
+            engine.fetch_mp3("Never answers.")
+        assert len(server.chunks) == 2
+    finally:
+        engine.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_response_without_audio_raises(gtts, stub_server):
+    stub_server.empty = True
+    with pytest.raises(RuntimeError, match="No audio"):
+        gtts.fetch_mp3("Silent.")
+
+
+def test_empty_text_is_rejected(gtts):
+    with pytest.raises(ValueError):
+        gtts.fetch_mp3("   ")
+
+
+def _wav(seconds: float = 0.1, rate: int = 24000) -> bytes:
+    """A silent 16-bit mono WAV file, as LINEAR16 and Riff*Pcm responses carry."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class _InFlight:
+    """Counts concurrent calls and remembers the peak."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+def _synthesize_concurrently(engine, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        return list(pool.map(engine.synthesize, texts))
+
+
+# Google Cloud
+
+@pytest.fixture
+def google_stub():
+    """A TextToSpeech gRPC server on a free local port; "fail" is rejected as invalid input."""
+    grpc = pytest.importorskip("grpc")
+    texttospeech = pytest.importorskip("google.cloud.texttospeech")
+    if not tts_engines.GOOGLE_CLOUD_TTS_AVAILABLE:
+        pytest.skip("google-cloud-texttospeech is not installed")
+
+    state = SimpleNamespace(peers=set(), in_flight=_InFlight(), texts=[])
+
+    def synthesize_speech(request, context):
+        state.peers.add(context.peer())
+        state.texts.append(request.input.text)
+        with state.in_flight:
+            time.sleep(0.05)
+            if request.input.text == "fail":
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Unsupported input")
+            return texttospeech.SynthesizeSpeechResponse(audio_content=_wav())
+
+    handler = grpc.method_handlers_generic_handler(
+        "google.cloud.texttospeech.v1.TextToSpeech",
+        {
+            "SynthesizeSpeech": grpc.unary_unary_rpc_method_handler(
+                synthesize_speech,
+                request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+                response_serializer=texttospeech.SynthesizeSpeechResponse.serialize
+            )
+        }
+    )
+    server = grpc.server(ThreadPoolExecutor(max_workers=16))
+    server.add_generic_rpc_handlers((handler,))
+    state.endpoint = f"127.0.0.1:{server.add_insecure_port('127.0.0.1:0')}"
+    server.start()
+    yield state
+    server.stop(None)
+
+
+def test_google_reuses_one_channel(google_stub):
+    engine = tts_engines.GoogleCloudTTSEngine(endpoint=google_stub.endpoint, insecure=True, max_concurrency=4)
+    try:
+        for _ in range(3):
+            audio = engine.synthesize("Hello.")
+            assert audio.duration == pytest.approx(0.1, abs=0.01)
+        _synthesize_concurrently(engine, ["Hello."] * 6)
+    finally:
+        engine.close()
+    assert len(google_stub.texts) == 9
+    assert len(google_stub.peers) == 1
+
+
+def test_google_concurrency_limit(google_stub):
+    engine = tts_engines.GoogleCloudTTSEngine(endpoint=google_stub.endpoint, insecure=True, max_concurrency=2)
+    try:
+        _synthesize_concurrently(engine, ["Hello."] * 8)
+    finally:
+        engine.close()
+    assert google_stub.in_flight.peak == 2
+
+
+def test_google_failures_update_stats(google_stub):
+    exceptions = pytest.importorskip("google.api_core.exceptions")
+    engine = tts_engines.GoogleCloudTTSEngine(endpoint=google_stub.endpoint, insecure=True)
+    try:
+        engine.synthesize("Hello.")
+        with pytest.raises(exceptions.InvalidArgument):
+            engine.synthesize("fail")
+    finally:
+        engine.close()
+    stats = engine.stats.snapshot()
+    assert stats["calls"] == 2 and stats["failures"] == 1
+
+
+# Azure
+
+class _FakeSpeechSDK:
+    """
+    The parts of azure.cognitiveservices.speech the engine uses.
+
+    Records every synthesizer and connection created, and how many
+    synthesis calls run at once; "fail" is cancelled like a rejected request.
+    """
+
+    class ResultReason:
+        SynthesizingAudioCompleted = "SynthesizingAudioCompleted"
+        Canceled = "Canceled"
+
+    class SpeechSynthesisOutputFormat:
+        Riff24Khz16BitMonoPcm = "Riff24Khz16BitMonoPcm"
+
+    def __init__(self):
+        sdk = self
+        self.synthesizers = []
+        self.connections = []
+        self.in_flight = _InFlight()
+
+        class SpeechConfig:
+            def __init__(self, subscription=None, region=None, endpoint=None):
+                self.subscription = subscription
+                self.speech_synthesis_voice_name = None
+                self.output_format = None
+
+            def set_speech_synthesis_output_format(self, output_format):
+                self.output_format = output_format
+
+        class SpeechSynthesizer:
+            def __init__(self, speech_config, audio_config):
+                assert audio_config is None  # Audio stays in memory
+                self.voice = speech_config.speech_synthesis_voice_name
+                sdk.synthesizers.append(self)
+
+            def speak_text_async(self, text):
+                def get():
+                    with sdk.in_flight:
+                        time.sleep(0.05)
+                    if text == "fail":
+                        return SimpleNamespace(reason=sdk.ResultReason.Canceled, audio_data=b"")
+                    return SimpleNamespace(reason=sdk.ResultReason.SynthesizingAudioCompleted, audio_data=_wav())
+                return SimpleNamespace(get=get)
+
+        class Connection:
+            def __init__(self, synthesizer):
+                self.synthesizer = synthesizer
+                self.opened = self.closed = False
+
+            @classmethod
+            def from_speech_synthesizer(cls, synthesizer):
+                connection = cls(synthesizer)
+                sdk.connections.append(connection)
+                return connection
+
+            def open(self, for_continuous_recognition):
+                self.opened = True
+
+            def close(self):
+                self.closed = True
+
+        self.SpeechConfig = SpeechConfig
+        self.SpeechSynthesizer = SpeechSynthesizer
+        self.Connection = Connection
+
+
+@pytest.fixture
+def speech_sdk(monkeypatch):
+    sdk = _FakeSpeechSDK()
+    monkeypatch.setattr(tts_engines, "speechsdk", sdk, raising=False)
+    monkeypatch.setattr(tts_engines, "AZURE_SPEECH_AVAILABLE", True)
+    return sdk
+
+
+def test_azure_reuses_pooled_synthesizers(speech_sdk):
+    engine = AzureTTSEngine(speech_key="key", region="westus", max_concurrency=2)
+    for _ in range(3):
+        audio = engine.synthesize("Hello.")
+        assert audio.duration == pytest.approx(0.1, abs=0.01)
+    assert len(speech_sdk.synthesizers) == 1
+    assert speech_sdk.connections[0].opened
+
+    # Concurrent calls need at most one synthesizer per slot, then reuse them
+    _synthesize_concurrently(engine, ["Hello."] * 6)
+    _synthesize_concurrently(engine, ["Hello."] * 6)
+    assert len(speech_sdk.synthesizers) == 2
+
+    # Pools are per voice
+    engine.synthesize("Hallo.", {"voice": "de-DE-KatjaNeural"})
+    assert [s.voice for s in speech_sdk.synthesizers][-1] == "de-DE-KatjaNeural"
+
+    engine.close()
+    assert all(connection.closed for connection in speech_sdk.connections)
+
+
+def test_azure_concurrency_limit(speech_sdk):
+    engine = AzureTTSEngine(speech_key="key", region="westus", max_concurrency=2)
+    _synthesize_concurrently(engine, ["Hello."] * 8)
+    engine.close()
+    assert speech_sdk.in_flight.peak == 2
+
+
+def test_azure_failures_update_stats(speech_sdk):
+    engine = AzureTTSEngine(speech_key="key", region="westus")
+    engine.synthesize("Hello.")
+    with pytest.raises(RuntimeError, match="Azure TTS failed"):
+        engine.synthesize("fail")
+    engine.close()
+    stats = engine.stats.snapshot()
+    assert stats["calls"] == 2 and stats["failures"] == 1
+    # The synthesizer goes back to the pool after a failed call
+    assert len(speech_sdk.synthesizers) == 1
@@ -0,0 +1,72 @@
+"""
+Tests for the SQLite video index and its trigger-maintained totals.
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from services.video_index import VideoIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VideoIndex(tmp_path / "index.db")
+    yield index
+    index.close()
+
+
+def test_totals_follow_inserts_updates_and_deletes(index):
+    index.record_job("a", "First")
+    index.record_job("b", "Second")
+    index.record_result("a", success=True, size_bytes=300, duration=12.5)
+    index.record_result("b", success=False, error="render crashed")
+    assert index.get_stats() == {
+        "total_videos": 2, "total_bytes": 300, "total_duration": 12.5,
+        "by_status": {"completed": 1, "failed": 1}
+    }
+
+    assert index.mark_evicted("a") is True
+    assert index.mark_evicted("a") is False
+    index.delete("b")
+    stats = index.get_stats()
+    assert (stats["total_videos"], stats["total_bytes"], stats["total_duration"]) == (1, 0, 12.5)
+    assert stats["by_status"] == {"evicted": 1}
+
+
+def test_job_registered_again_takes_the_new_status(index):
+    index.record_job("a", "Prompt")
+    index.record_result("a", success=True, size_bytes=10)
+    index.record_job("a", "Prompt")
+    assert index.get("a")["status"] == "processing"
+    assert index.get_stats()["by_status"] == {"processing": 1}
+
+
+def test_old_status_triggers_are_replaced(tmp_path):
+    path = tmp_path / "index.db"
+    VideoIndex(path).close()
+    # A database created before the triggers stopped relying on OR IGNORE
+    with sqlite3.connect(str(path)) as conn:
+        conn.executescript("""
+            DROP TRIGGER videos_after_update_status;
+            CREATE TRIGGER videos_after_update_status AFTER UPDATE OF status ON videos
+            WHEN NEW.status != OLD.status
+            BEGIN
+                UPDATE status_counts SET count = count - 1 WHERE status = OLD.status;
+                INSERT OR IGNORE INTO status_counts (status, count) VALUES (NEW.status, 0);
+                UPDATE status_counts SET count = count + 1 WHERE status = NEW.status;
+            END;
+        """)
+
+    index = VideoIndex(path)
+    try:
+        index.record_job("a", "Prompt")
+        index.update_status("a", "completed")
+        index.record_job("a", "Prompt")
+        assert index.get("a")["status"] == "processing"
+    finally:
+        index.close()
@@ -2,14 +2,13 @@
 Utility functions for the Flowchart Video Generator API.
 """
 import uuid
-import json
-import asyncio
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from config import VIDEOS_DIR, TEMP_DIR, LOGS_DIR
+from services.video_index import get_video_index
 
 logger = logging.getLogger(__name__)
 
@@ -41,28 +40,33 @@ def format_success_response(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 def save_generation_log(video_id: str, data: Dict[str, Any]):
-    """Save generation log for debugging."""
+    """Record the outcome of a generation job in the video index."""
     try:
-        log_file = LOGS_DIR / f"{video_id}.json"
-        with open(log_file, 'w') as f:
-            json.dump({
-                "video_id": video_id,
-                "timestamp": datetime.now().isoformat(),
-                **data
-            }, f, indent=2)
+        get_video_index().record_result(
+            video_id,
+            success=data.get("success", False),
+            structure_hash=data.get("structure_hash"),
+            size_bytes=data.get("bytes", 0),
+            duration=data.get("duration"),
+            has_audio=data.get("has_audio", False),
+            timings=data.get("timings"),
+            error=data.get("error")
+        )
     except Exception as e:
         logger.error(f"Failed to save generation log: {e}")
 
 def get_system_stats() -> Dict[str, Any]:
-    """Get basic system statistics."""
+    """Get basic system statistics from the video index (constant time)."""
     try:
-        videos_count = len(list(VIDEOS_DIR.glob("*.mp4")))
-        temp_files_count = len(list(TEMP_DIR.glob("*")))
+        index_stats = get_video_index().get_stats()
         
         return {
-            "videos_generated": videos_count,
-            "temp_files": temp_files_count,
+            "videos_generated": index_stats["by_status"].get("completed", 0),
+            "total_videos": index_stats["total_videos"],
+            "videos_by_status": index_stats["by_status"],
+            "video_seconds": index_stats["total_duration"],
             "disk_usage": {
+                "video_bytes": index_stats["total_bytes"],
                 "videos_dir_exists": VIDEOS_DIR.exists(),
                 "temp_dir_exists": TEMP_DIR.exists(),
                 "logs_dir_exists": LOGS_DIR.exists()
@@ -92,31 +96,6 @@ def validate_prompt_complexity(prompt: str) -> Dict[str, Any]:
         "estimated_duration": max(10, words * 2)  # Rough estimate in seconds
     }
 
-async def async_cleanup_task():
-    """Async cleanup task for background processing."""
-    try:
-        # Clean up old temp files
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        
-        for temp_file in TEMP_DIR.glob("*"):
-            if temp_file.is_file():
-                file_time = datetime.fromtimestamp(temp_file.stat().st_mtime)
-                if file_time < cutoff_time:
-                    temp_file.unlink()
-                    logger.info(f"Cleaned up old temp file: {temp_file}")
-        
-        # Clean up old log files
-        log_cutoff = datetime.now() - timedelta(days=7)
-        for log_file in LOGS_DIR.glob("*.json"):
-            if log_file.is_file():
-                file_time = datetime.fromtimestamp(log_file.stat().st_mtime)
-                if file_time < log_cutoff:
-                    log_file.unlink()
-                    logger.info(f"Cleaned up old log file: {log_file}")
-                    
-    except Exception as e:
-        logger.error(f"Cleanup task failed: {e}")
-
 def simple_validate_prompt(prompt: str) -> str:
     """Simple prompt validation and cleaning."""
     if not prompt or not prompt.strip():